@@ -15,16 +15,24 @@ setting `load_stream=False`. Additional `kwargs` are passed to the `AmiraHeader`
 call.
 
 There is a `read` method which (if data streams have not yet been read) will read
-the data streams.
+the data streams. Passing `workers=N` reads and decodes all data streams of an
+`AmiraMesh` file in a pool of `N` threads and records the aggregate throughput in the
+`meta` block.
+
+On Python 3.5+ files may also be opened from `asyncio` code with `await ahds.aopen(fn)`
+(see the `aio` module).
 
 An `AmiraFile` object may be printed to view the hierarchy of entities above or
 passed to `repr` to view the instatiation call that represents it.
 
 """
 
+import io
 import sys
+import time
+from multiprocessing.pool import ThreadPool
 
-from .core import Block
+from .core import Block, write_tree
 from .data_stream import set_data_stream
 from .header import AmiraHeader
 
@@ -42,7 +50,7 @@ WIDTH = _get_terminal_size().columns
 
 class AmiraFile(Block):
     """Main entry point for working with Amira files"""
-    __slots__ = ('_fn', '_load_streams', '_meta' '_header', '_data_streams')
+    __slots__ = ('_fn', '_load_streams', '_meta' '_header', '_data_streams', '_workers')
 
     def __init__(self, fn, load_streams=True, *args, **kwargs):
         """Initialise a new AmiraFile object given the Amira file.
@@ -55,15 +63,25 @@ class AmiraFile(Block):
             af = AmiraFile('file.am')
             print(af)
 
+        The following are keyword-only (``mmap`` and ``cache`` are passed on to AmiraHeader):
+
         :param str fn: Amira file name
         :param bool load_streams: whether (default) or not to load data streams
+        :param bool mmap: whether or not (default) to memory-map uncompressed binary data streams
+        :param cache: ``True`` to cache the parsed header in a sidecar next to the file, the name of
+            a cache directory or ``None`` (default) for no caching
+        :param int workers: the number of threads used to read and decode the data streams; ``None`` (default)
+            defers decoding of each stream until its data is first accessed
         """
+        # keyword-only (Python2 compatible) so that positional args still go to AmiraHeader
+        workers = kwargs.pop('workers', None)
         super(AmiraFile, self).__init__(fn)
         self._fn = fn
         self._load_streams = load_streams
         self._streams_loaded = False
+        self._workers = workers
         # the header contains a lot of information relied on for reading streams
-        self._header = AmiraHeader(fn, load_streams=load_streams, *args, **kwargs)
+        self._header = AmiraHeader(fn, load_streams, *args, **kwargs)
         # meta block
         super(AmiraFile, self).add_attr('meta', Block('meta'))
         self.meta.add_attr('file', self._fn)
@@ -78,14 +96,21 @@ class AmiraFile(Block):
             self.read()
             self._streams_loaded = True
 
-    def read(self):
-        """Read the data streams if they are not read yet"""
+    def read(self, workers=None):
+        """Read the data streams if they are not read yet
+
+        :param int workers: the number of threads used to read and decode the data streams of an AmiraMesh file
+            (defaults to the value passed on initialisation)
+        """
+        if workers is None:
+            workers = self._workers
         if not self._streams_loaded:
             if self._header.filetype == "AmiraMesh":
+                # stream data is only read and decoded when first accessed through the data attribute
                 for ds in self._header._data_streams_block_list:
-                    ds.read()
-                    ds.add_attr('data', ds.get_data())
                     self.data_streams.add_attr(ds)
+                if workers:
+                    self._decode_streams(workers)
             elif self._header.filetype == "HyperSurface":
                 block = set_data_stream('Data', self._header)
                 block.read()
@@ -93,18 +118,49 @@ class AmiraFile(Block):
             self._load_streams = self._header.load_streams = True
             self._streams_loaded = True
 
+    def _decode_streams(self, workers):
+        """Read and decode all data streams concurrently in a pool of ``workers`` threads
+
+        Each stream is decoded by a single thread so the order of attributes on ``data_streams`` is unaffected.
+        The aggregate throughput is recorded in the ``meta`` block.
+        """
+        streams = self._header._data_streams_block_list
+        start = time.time()
+        # locate all streams before starting the pool so that the data section is scanned only once
+        self._header.data_stream_offsets
+        pool = ThreadPool(workers)
+        try:
+            decoded_bytes = sum(pool.map(lambda ds: ds.data.nbytes, streams))
+        finally:
+            pool.close()
+            pool.join()
+        decode_time = time.time() - start
+        self.meta.add_attr('decoded_bytes', decoded_bytes)
+        self.meta.add_attr('decode_time', decode_time)
+        self.meta.add_attr('decode_throughput', decoded_bytes / decode_time if decode_time > 0 else float('inf'))
+
     def __repr__(self):
         return "AmiraFile('{}', read={})".format(self._fn, self._read)
 
     def __str__(self, prefix="", index=None):
+        f = io.StringIO()
+        self.write(f, prefix=prefix, index=index)
+        return f.getvalue()
+
+    def write(self, f, max_depth=None, max_items=None, prefix="", index=None):
+        """Write the hierarchy of the file as a tree to the file-like object ``f`` (see :py:func:`ahds.core.write_tree`)"""
         width = 140
-        string = ""
-        string += '*' * width + '\n'
-        string += "AMIRA (R) HEADER AND DATA STREAMS\n"
-        string += "-" * width + "\n"
-        string += super(AmiraFile, self).__str__(prefix=prefix, index=index)
-        string += "*" * width
-        return string
+        f.write(u'*' * width + u'\n')
+        f.write(u"AMIRA (R) HEADER AND DATA STREAMS\n")
+        f.write(u"-" * width + u"\n")
+        write_tree(self, f, max_depth=max_depth, max_items=max_items, prefix=prefix, index=index)
+        f.write(u"*" * width)
 
 
 __all__ = ['AmiraFile', 'AmiraHeader']
+
+# the asyncio interface uses syntax which is unavailable in Python2
+if sys.version_info[:2] >= (3, 5):
+    from .aio import AsyncAmiraFile, aopen
+
+    __all__ += ['AsyncAmiraFile', 'aopen']
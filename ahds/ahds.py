@@ -8,36 +8,71 @@ The `ahds` command calls this script which performs the following tasks:
 * parse command-line arguments
 * run the command
 
+With ``--files`` the headers of many files (or all Amira (R) files in directories) are parsed in a pool of
+``--jobs`` processes and the blocks at the ``--path`` expressions of each file are displayed as soon as the file
+has been parsed e.g. ``ahds --files a.am b.am --jobs 8 --path Parameters.BoundingBox``.
+
+With ``--format ndjson`` the matches are written to stdout as newline-delimited JSON for use in pipelines: one
+record per matched path or, without paths, one record per file.
+
 """
 
 from __future__ import print_function
 
 import argparse
+import io
+import json
 import os
 import sys
 
 from . import AmiraFile, WIDTH
-from .core import _str
+from .batch import extract_paths
+from .core import Block, _dict, _json_default, _str
+from .query import PathSyntaxError, compile_path
 
 
 def parse_args():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(prog='ahds', description='Python tool to read and display Amira files')
-    parser.add_argument('file', nargs='+', help='a valid Amira file with an optional block path')
+    parser.add_argument('file', nargs='*', help='a valid Amira file with optional block paths e.g. header.Parameters.Materials.*.Color')
+    parser.add_argument('-f', '--files', nargs='+', default=None,
+                        help="display the headers of these files and directories instead; see --path and --jobs")
+    parser.add_argument('-p', '--path', nargs='+', default=None,
+                        help="with --files: block paths relative to the header e.g. Parameters.BoundingBox "
+                             "[default: the whole header]")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="with --files: the number of processes parsing headers [default: one per CPU]")
     parser.add_argument('-s', '--load-streams', default=False, action='store_true',
                         help="whether to load data streams or not [default: False]")
     parser.add_argument('-d', '--debug', default=False, action='store_true',
                         help="display debugging information [default: False]")
     parser.add_argument('-l', '--literal', default=False, action='store_true',
                         help="display the literal header [default: False]")
+    parser.add_argument('--format', default='text', choices=['text', 'ndjson'],
+                        help="display trees as text (on stderr) or write newline-delimited JSON records (on stdout) "
+                             "[default: text]")
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help="do not expand blocks below this depth [default: no limit]")
+    parser.add_argument('--max-items', type=int, default=None,
+                        help="display at most this number of attributes and items per block [default: no limit]")
 
     args = parser.parse_args()
+    if args.files is None:
+        if not args.file:
+            parser.error("a file or --files is required")
+        if args.path is not None or args.jobs is not None:
+            parser.error("--path and --jobs apply to --files only")
+    elif args.file:
+        parser.error("block paths must be given with --path when using --files")
     return args
 
 
 def main():
     args = parse_args()
 
+    if args.files is not None:
+        return main_files(args)
+
     _file, _paths = set_file_and_paths(args)
 
     af = get_amira_file(_file, args)
@@ -46,34 +81,161 @@ def main():
         print(get_literal(af, args), file=sys.stderr)
     if args.debug:
         print(get_debug(af, args), file=sys.stderr)
+    if args.format == 'ndjson':
+        write_ndjson_paths(_paths, af, sys.stdout)
+        return os.EX_OK
     # always show paths
-    print(get_paths(_paths, af), file=sys.stderr)
+    write_paths(_paths, af, sys.stderr, max_depth=args.max_depth, max_items=args.max_items)
+    print(file=sys.stderr)
     return os.EX_OK
 
 
+def main_files(args):
+    """Display the paths of the headers of many files parsed in a pool of processes"""
+    ndjson = args.format == 'ndjson'
+    try:
+        # JSON records are converted to built-in types in the worker processes
+        results = extract_paths(args.files, args.path, processes=args.jobs, chunksize=1, to_dict=ndjson)
+    except PathSyntaxError as e:
+        print("""Invalid path: {}""".format(e), file=sys.stderr)
+        return os.EX_USAGE
+    status = os.EX_OK
+    for result in results:
+        if ndjson:
+            write_ndjson_records(result, sys.stdout)
+            sys.stdout.flush()
+        else:
+            write_records(result, args.path, sys.stderr, max_depth=args.max_depth, max_items=args.max_items)
+            sys.stderr.flush()
+        if result.error is not None:
+            status = os.EX_DATAERR
+    return status
+
+
 def get_amira_file(_file, args):
     af = AmiraFile(_file, load_streams=args.load_streams, debug=args.debug)
     return af
 
 
-def get_paths(_paths, af):
+def write_paths(_paths, af, f, max_depth=None, max_items=None):
+    """Write the blocks at the given paths (or the whole file) as trees to the file-like object ``f``
+
+    Paths are path expressions (see :py:mod:`ahds.query`) which may match several blocks or values e.g.
+    ``header.Parameters.Materials.*.Color``; each match is displayed under its concrete path. Trees are written
+    while they are walked so that even huge headers are displayed in linear time (see
+    :py:func:`ahds.core.write_tree`).
+
+    :param list _paths: path expressions e.g. ``header.Parameters.Materials`` or ``None`` for the whole file
+    :param af: an :py:class:`ahds.AmiraFile`
+    :param f: a file-like object accepting text
+    :param int max_depth: the depth below which blocks are not expanded
+    :param int max_items: the number of attributes and items displayed per block
+    """
     if _paths:
-        string = ""
         for _path in _paths:
-            _path_list = _path.split('.')
-            current_block = af  # the AmiraFile object
-            for block in _path_list:
-                current_block = getattr(current_block, block, None)
-            if current_block is None:
-                print("""Path '{}' not found.""".format(_path))
-            else:
-                string += u'*' * WIDTH + u'\n'
-                string += u"ahds: Displaying path '{}'\n".format(_path)
-                string += u"-" * WIDTH + "\n"
-                string += _str(current_block)
+            try:
+                query = compile_path(_path)
+            except PathSyntaxError as e:
+                print("""Invalid path '{}': {}""".format(_path, e), file=sys.stderr)
+                continue
+            found = False
+            for path, value in query.iter(af):
+                found = True
+                f.write(u'*' * WIDTH + u'\n')
+                f.write(u"ahds: Displaying path '{}'\n".format(path))
+                f.write(u"-" * WIDTH + u"\n")
+                if isinstance(value, Block):
+                    value.write(f, max_depth=max_depth, max_items=max_items)
+                else:
+                    f.write(_str(value))
+            if not found:
+                print("""Path '{}' not found.""".format(_path), file=sys.stderr)
     else:
-        string = _str(af)
-    return string
+        af.write(f, max_depth=max_depth, max_items=max_items)
+
+
+def write_records(result, _paths, f, max_depth=None, max_items=None):
+    """Write the matches of path expressions in the header of one file (see :py:func:`ahds.batch.extract_paths`)
+
+    :param result: an :py:class:`ahds.batch.PathRecords`
+    :param list _paths: the path expressions which were extracted or ``None`` for the whole header
+    :param f: a file-like object accepting text
+    :param int max_depth: the depth below which blocks are not expanded
+    :param int max_items: the number of attributes and items displayed per block
+    """
+    f.write(u'*' * WIDTH + u'\n')
+    f.write(u"ahds: Displaying file '{}'\n".format(result.filename))
+    f.write(u"-" * WIDTH + u"\n")
+    if result.error is not None:
+        f.write(u"Error: {}\n".format(result.error))
+        return
+    for record in result.records:
+        if isinstance(record.value, Block):
+            if record.path:
+                f.write(u"{}:\n".format(record.path))
+            record.value.write(f, max_depth=max_depth, max_items=max_items)
+        else:
+            f.write(u"{}: {}\n".format(record.path, _str(record.value)))
+    if _paths:
+        found = set(record.query for record in result.records)
+        for _path in _paths:
+            if _path not in found:
+                f.write(u"Path '{}' not found.\n".format(_path))
+
+
+def _write_json_record(f, record):
+    f.write(_str(json.dumps(record, default=_json_default)) + u'\n')
+
+
+def write_ndjson_paths(_paths, af, f):
+    """Write the matches of the given paths (or the whole file) as newline-delimited JSON to ``f``
+
+    Each line is an object with the ``file``, the path expression (``query``), the concrete ``path`` of the match
+    and its ``value`` with Blocks converted as by :py:meth:`ahds.core.Block.to_dict`. Without paths a single
+    record holds the whole file. Invalid paths result in a record with an ``error``; paths which match nothing
+    result in no records.
+
+    :param list _paths: path expressions e.g. ``header.Parameters.Materials.*.Color`` or ``None`` for the whole file
+    :param af: an :py:class:`ahds.AmiraFile`
+    :param f: a file-like object accepting text
+    """
+    filename = af.meta.file
+    if not _paths:
+        _write_json_record(f, _dict([('file', filename), ('query', None), ('path', ''), ('value', af)]))
+        return
+    for _path in _paths:
+        try:
+            query = compile_path(_path)
+        except PathSyntaxError as e:
+            _write_json_record(f, _dict([('file', filename), ('query', _path), ('error', str(e))]))
+            continue
+        for path, value in query.iter(af):
+            _write_json_record(f, _dict([('file', filename), ('query', _path), ('path', path), ('value', value)]))
+
+
+def write_ndjson_records(result, f):
+    """Write the matches of path expressions in the header of one file as newline-delimited JSON to ``f``
+
+    Records are those of :py:func:`write_ndjson_paths`; a file which could not be read results in a single
+    record with an ``error``.
+
+    :param result: an :py:class:`ahds.batch.PathRecords`
+    :param f: a file-like object accepting text
+    """
+    if result.error is not None:
+        _write_json_record(f, _dict([('file', result.filename), ('error', result.error)]))
+        return
+    for record in result.records:
+        _write_json_record(f, _dict([
+            ('file', result.filename), ('query', record.query), ('path', record.path), ('value', record.value)
+        ]))
+
+
+def get_paths(_paths, af, max_depth=None, max_items=None):
+    """The blocks at the given paths (or the whole file) as a string (see :py:func:`write_paths`)"""
+    f = io.StringIO()
+    write_paths(_paths, af, f, max_depth=max_depth, max_items=max_items)
+    return f.getvalue()
 
 
 def get_debug(af, args):
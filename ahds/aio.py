@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+aio
+===
+
+``asyncio`` interface to Amira (R) files (Python 3.5+ only).
+
+Header parsing, stream reads and decoding are blocking operations which are run on an executor so that the
+event loop stays responsive. Every blocking call is submitted through :py:meth:`AsyncAmiraFile._run` which
+optionally waits on a shared :py:class:`asyncio.Semaphore`: sharing one semaphore between many files bounds
+the number of operations in flight (backpressure) independently of the size of the executor.
+
+Usage:
+
+::
+
+    >>> import asyncio
+    >>> import ahds
+    >>> async def main():
+    ...     af = await ahds.aopen('file.am')
+    ...     labels = await af.streams['Labels']
+    ...     print(af.header.Lattice.length, labels.shape)
+    >>> asyncio.get_event_loop().run_until_complete(main())
+
+"""
+import asyncio
+import collections
+import functools
+
+from . import AmiraFile
+
+
+class AsyncDataStream(object):
+    """Awaitable accessor to the data of a single data stream
+
+    Awaiting the object itself is the same as awaiting :py:meth:`data`.
+    """
+
+    def __init__(self, amira_file, stream):
+        self._amira_file = amira_file
+        self._stream = stream
+        # the decode in flight (if any) which concurrent awaits share
+        self._pending = None
+        # incremented by unload; decodes started before then are not kept
+        self._generation = 0
+
+    @property
+    def name(self):
+        return self._stream.name
+
+    @property
+    def stream(self):
+        """The underlying :py:class:`ahds.data_stream.AmiraMeshDataStream`"""
+        return self._stream
+
+    async def data(self):
+        """The decoded stream data; read and decoded on the executor on first access
+
+        Concurrent awaits share a single decode.
+        """
+        if self._stream.is_loaded:
+            return self._stream.data
+        pending = self._pending
+        if pending is None:
+            pending = self._pending = asyncio.ensure_future(self._decode())
+        try:
+            # a cancelled await must not cancel the decode for the others
+            return await asyncio.shield(pending)
+        finally:
+            if pending.done() and self._pending is pending:
+                self._pending = None
+
+    async def _decode(self):
+        """Read and decode the stream on the executor; the data is only kept if the stream was not unloaded since"""
+        generation = self._generation
+        data = await self._amira_file._run(self._stream._read_data)
+        if generation == self._generation:
+            self._stream._data = data
+        elif self._pending is None:
+            # no decode has been started since the unload: release what this one read
+            self._stream.unload()
+        return data
+
+    def unload(self):
+        """Release the stream data (see :py:meth:`ahds.data_stream.AmiraDataStream.unload`)
+
+        A decode in flight still completes for those awaiting it but its data is discarded.
+        """
+        self._generation += 1
+        self._pending = None
+        self._stream.unload()
+
+    async def read_region(self, x=None, y=None, z=None):
+        """Read a sub-volume of the stream on the executor (see
+        :py:meth:`ahds.data_stream.AmiraMeshDataStream.read_region`)"""
+        return await self._amira_file._run(functools.partial(self._stream.read_region, x=x, y=y, z=z))
+
+    def __await__(self):
+        return self.data().__await__()
+
+    def __repr__(self):
+        return "AsyncDataStream('{}')".format(self.name)
+
+
+class AsyncAmiraFile(object):
+    """Asynchronous wrapper around :py:class:`ahds.AmiraFile`
+
+    Create instances with :py:meth:`open` or :py:func:`aopen` rather than directly.
+    """
+
+    def __init__(self, amira_file, executor=None, semaphore=None):
+        """
+        :param amira_file: an :py:class:`ahds.AmiraFile`
+        :param executor: a :py:class:`concurrent.futures.Executor` or ``None`` (default) for the default
+            executor of the event loop
+        :param semaphore: an :py:class:`asyncio.Semaphore` bounding the number of blocking operations in flight
+        """
+        self._amira_file = amira_file
+        self._executor = executor
+        self._semaphore = semaphore
+        # an ordered mapping of stream name to awaitable accessor
+        self._streams = collections.OrderedDict()
+        if amira_file.header.filetype == 'AmiraMesh':
+            for stream in amira_file.header._data_streams_block_list:
+                self._streams[stream.name] = AsyncDataStream(self, stream)
+
+    @classmethod
+    async def open(cls, fn, executor=None, semaphore=None, *args, **kwargs):
+        """Parse the header of the file on the executor
+
+        :param str fn: Amira file name
+        :param executor: a :py:class:`concurrent.futures.Executor` or ``None`` (default) for the default
+            executor of the event loop
+        :param semaphore: an :py:class:`asyncio.Semaphore` bounding the number of blocking operations in flight
+        :return AsyncAmiraFile af: the opened file; stream data is only read when awaited
+
+        Additional args/kwargs are passed to :py:class:`ahds.AmiraFile`.
+        """
+        def _open():
+            amira_file = AmiraFile(fn, *args, **kwargs)
+            if amira_file.header.filetype == 'AmiraMesh':
+                # locate all streams now so that concurrent reads do not each scan the file
+                amira_file.header.data_stream_offsets
+            return amira_file
+
+        amira_file = await _run_in_executor(_open, executor, semaphore)
+        return cls(amira_file, executor=executor, semaphore=semaphore)
+
+    async def _run(self, func):
+        """Run the blocking callable ``func`` on the executor"""
+        return await _run_in_executor(func, self._executor, self._semaphore)
+
+    @property
+    def amira_file(self):
+        """The underlying :py:class:`ahds.AmiraFile`"""
+        return self._amira_file
+
+    @property
+    def header(self):
+        return self._amira_file.header
+
+    @property
+    def meta(self):
+        return self._amira_file.meta
+
+    @property
+    def data_streams(self):
+        return self._amira_file.data_streams
+
+    @property
+    def streams(self):
+        """An ordered mapping of stream name to :py:class:`AsyncDataStream` for AmiraMesh files"""
+        return self._streams
+
+    async def load(self):
+        """Read and decode all data streams concurrently
+
+        :return OrderedDict data: the decoded data keyed by stream name (in stream order)
+        """
+        data = await asyncio.gather(*[stream.data() for stream in self._streams.values()])
+        return collections.OrderedDict(zip(self._streams.keys(), data))
+
+    def __repr__(self):
+        return "AsyncAmiraFile('{}')".format(self._amira_file.meta.file)
+
+
+async def _run_in_executor(func, executor, semaphore):
+    loop = asyncio.get_event_loop()
+    if semaphore is None:
+        return await loop.run_in_executor(executor, func)
+    async with semaphore:
+        return await loop.run_in_executor(executor, func)
+
+
+async def aopen(fn, executor=None, semaphore=None, *args, **kwargs):
+    """Open an Amira (R) file without blocking the event loop (see :py:meth:`AsyncAmiraFile.open`)"""
+    return await AsyncAmiraFile.open(fn, executor, semaphore, *args, **kwargs)
+
+
+__all__ = ['AsyncAmiraFile', 'AsyncDataStream', 'aopen']
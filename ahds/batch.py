@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+batch
+=====
+
+Scan the headers of many Amira (R) files in a pool of processes.
+
+Parsing a header is bound by the (single-threaded) grammar so inventories of large collections of files
+are parsed in parallel processes. Only the header of each file is read; data streams are neither located
+nor read. Each file results in a compact, picklable :py:class:`HeaderSummary` (or, for path expressions,
+:py:class:`PathRecords`) which is yielded as soon as it is available.
+
+Usage:
+
+::
+
+    >>> from ahds.batch import scan_headers, extract_paths
+    >>> for summary in scan_headers(['/path/to/segmentations'], processes=8):
+    ...     print(summary.filename, summary.filetype, summary.arrays)
+    >>> for result in extract_paths(['/path/to/segmentations'], ['Parameters.BoundingBox'], processes=8):
+    ...     print(result.filename, [record.value for record in result.records])
+
+"""
+from __future__ import print_function
+
+import collections
+import multiprocessing
+import os
+
+import numpy
+
+from .core import Block, _to_builtin
+from .header import AmiraHeader
+from .query import Record, compile_path, extract
+
+# extensions of files picked up when scanning directories
+AMIRA_EXTENSIONS = ('.am', '.surf')
+
+HeaderSummary = collections.namedtuple('HeaderSummary', [
+    'filename',  # the file name
+    'filetype',  # e.g. AmiraMesh or HyperSurface
+    'format',  # e.g. BINARY or ASCII
+    'endian',  # BIG, LITTLE or None
+    'version',  # the file format version
+    'header_length',  # the number of bytes in the header
+    'arrays',  # tuple of (name, dimensions) of array declarations e.g. ('Lattice', (284, 284, 284))
+    'streams',  # tuple of (name, type, dimension, format) of data streams
+    'materials',  # tuple of material names
+    'error',  # None or a description of why the header could not be read
+])
+
+PathRecords = collections.namedtuple('PathRecords', [
+    'filename',  # the file name
+    'records',  # tuple of ahds.query.Record of the matches of all path expressions in the header
+    'error',  # None or a description of why the header could not be read
+])
+
+
+def iter_amira_files(paths, extensions=AMIRA_EXTENSIONS):
+    """Expand files and directory trees into the names of Amira (R) files
+
+    Files named explicitly are always included; files found in directories are only included if their
+    extension is one of ``extensions``.
+
+    :param list paths: file and directory names
+    :param tuple extensions: extensions of files to include from directories
+    :return generator filenames: the file names in the order in which they are found
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for fn in sorted(files):
+                    if os.path.splitext(fn)[1].lower() in extensions:
+                        yield os.path.join(root, fn)
+        else:
+            yield path
+
+
+def summarise_header(header):
+    """Create a :py:class:`HeaderSummary` of a header
+
+    :param header: an :py:class:`ahds.header.AmiraHeader`
+    :return HeaderSummary summary: the summary
+    """
+    arrays = list()
+    for name, value in header._attr_items():
+        if isinstance(value, Block) and 'length' in value._attrs:
+            arrays.append((name, tuple(numpy.atleast_1d(value.length).tolist())))
+    streams = tuple(
+        (ds.name, ds.type, ds.dimension, ds.format) for ds in header._data_streams_block_list
+    )
+    materials = tuple()
+    if 'Materials' in header.Parameters._attrs:
+        materials = tuple(material.name for material in header.Parameters.Materials)
+    return HeaderSummary(
+        filename=header.filename,
+        filetype=header.filetype,
+        format=header.format,
+        endian=header.endian,
+        version=header.version,
+        header_length=len(header),
+        arrays=tuple(arrays),
+        streams=streams,
+        materials=materials,
+        error=None,
+    )
+
+
+def scan_header(fn, cache=None):
+    """Parse the header of a single file into a :py:class:`HeaderSummary`
+
+    Errors are reported in the ``error`` field of the summary instead of being raised so that a single
+    unreadable file does not abort a batch.
+
+    :param str fn: file name
+    :param cache: passed on to :py:class:`ahds.header.AmiraHeader`
+    :return HeaderSummary summary: the summary
+    """
+    try:
+        header = AmiraHeader(fn, load_streams=False, cache=cache, verbose=False)
+        return summarise_header(header)
+    except Exception as e:
+        return HeaderSummary(fn, None, None, None, None, None, (), (), (), "{}: {}".format(type(e).__name__, e))
+
+
+def _scan_header(args):
+    """Pool worker; module level so that it can be pickled"""
+    return scan_header(*args)
+
+
+def _imap_unordered(func, tasks, processes, chunksize):
+    """Apply ``func`` to ``tasks`` in a pool of processes and yield the results as they complete"""
+    if processes == 1:
+        for task in tasks:
+            yield func(task)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(func, tasks, chunksize=chunksize):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def scan_headers(paths, processes=None, extensions=AMIRA_EXTENSIONS, cache=None, chunksize=16):
+    """Scan the headers of files and directory trees in a pool of processes
+
+    Summaries are yielded as soon as they are complete so their order is not that of ``paths``.
+
+    :param list paths: file and directory names (see :py:func:`iter_amira_files`)
+    :param int processes: the number of processes; ``None`` (default) uses one per CPU and ``1`` scans in
+        the current process
+    :param tuple extensions: extensions of files to include from directories
+    :param cache: passed on to :py:class:`ahds.header.AmiraHeader`
+    :param int chunksize: the number of files sent to a process at a time
+    :return generator summaries: a :py:class:`HeaderSummary` for each file
+    """
+    tasks = ((fn, cache) for fn in iter_amira_files(paths, extensions=extensions))
+    return _imap_unordered(_scan_header, tasks, processes, chunksize)
+
+
+def extract_header_paths(fn, expressions=None, cache=None, to_dict=False):
+    """Apply path expressions (see :py:mod:`ahds.query`) to the header of a single file
+
+    Errors are reported in the ``error`` field of the result instead of being raised so that a single
+    unreadable file does not abort a batch.
+
+    :param str fn: file name
+    :param list expressions: path expressions relative to the header e.g. ``Parameters.BoundingBox``; ``None``
+        (default) results in a single record of the whole header with an empty path
+    :param cache: passed on to :py:class:`ahds.header.AmiraHeader`
+    :param bool to_dict: convert Blocks (see :py:meth:`ahds.core.Block.to_dict`) and NumPy values in the values of
+        records to built-in types e.g. so that they are serialised in the worker processes [default: False]
+    :return PathRecords result: the records of all matches
+    """
+    try:
+        header = AmiraHeader(fn, load_streams=False, cache=cache, verbose=False)
+        if expressions is None:
+            records = [Record(None, '', header)]
+        else:
+            records = extract(header, expressions)
+        if to_dict:
+            records = [record._replace(
+                value=record.value.to_dict() if isinstance(record.value, Block) else _to_builtin(record.value)
+            ) for record in records]
+        return PathRecords(fn, tuple(records), None)
+    except Exception as e:
+        return PathRecords(fn, (), "{}: {}".format(type(e).__name__, e))
+
+
+def _extract_header_paths(args):
+    """Pool worker; module level so that it can be pickled"""
+    return extract_header_paths(*args)
+
+
+def extract_paths(paths, expressions=None, processes=None, extensions=AMIRA_EXTENSIONS, cache=None, chunksize=16,
+                  to_dict=False):
+    """Apply path expressions to the headers of files and directory trees in a pool of processes
+
+    Results are yielded as soon as they are complete so their order is not that of ``paths``.
+
+    :param list paths: file and directory names (see :py:func:`iter_amira_files`)
+    :param list expressions: path expressions relative to the header (see :py:func:`extract_header_paths`)
+    :param int processes: the number of processes; ``None`` (default) uses one per CPU and ``1`` extracts in
+        the current process
+    :param tuple extensions: extensions of files to include from directories
+    :param cache: passed on to :py:class:`ahds.header.AmiraHeader`
+    :param int chunksize: the number of files sent to a process at a time
+    :param bool to_dict: convert the values of records to built-in types in the worker processes (see
+        :py:func:`extract_header_paths`)
+    :return generator results: a :py:class:`PathRecords` for each file
+    :raises ahds.query.PathSyntaxError: if any of the expressions is invalid
+    """
+    if expressions is not None:
+        # invalid expressions are reported once here rather than for every file
+        expressions = [compile_path(expression).expression for expression in expressions]
+    tasks = ((fn, expressions, cache, to_dict) for fn in iter_amira_files(paths, extensions=extensions))
+    return _imap_unordered(_extract_header_paths, tasks, processes, chunksize)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+cache
+=====
+
+Persistent sidecar cache of parsed Amira (R) headers.
+
+Parsing a header with the grammar and scanning the data section for data streams has to be
+repeated every time a file is opened. When caching is enabled (see the `cache` argument of
+:py:class:`ahds.header.AmiraHeader`) the results are stored in a sidecar file so that reopening an
+unchanged file skips both steps. The sidecar is either written next to the file
+(``<file>.ahdsidx``) or into a cache directory.
+
+A sidecar is only used if the path, size and modification time of the file as well as a hash of the
+header bytes match those recorded in the sidecar. Sidecars are plain JSON (NumPy arrays, tuples and
+dictionaries with non-string keys are tagged) so that reading a sidecar written by someone else can never
+execute code.
+
+"""
+from __future__ import print_function
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+SIDECAR_EXTENSION = '.ahdsidx'
+
+# bump whenever the structure of the cached entry changes
+_CACHE_VERSION = 3
+
+# os.replace is unavailable in Python2; os.rename overwrites atomically on POSIX
+_replace = getattr(os, 'replace', os.rename)
+
+
+def sidecar_path(fn, cache):
+    """The path of the sidecar file for the given Amira (R) file
+
+    :param str fn: file name
+    :param cache: ``True`` for a sidecar next to the file or the name of a cache directory
+    :return str path: the sidecar file name
+    """
+    if cache is True:
+        return fn + SIDECAR_EXTENSION
+    # sidecars in a cache directory are named by the absolute path of the file
+    name = hashlib.sha1(os.path.abspath(fn).encode('utf-8')).hexdigest() + SIDECAR_EXTENSION
+    return os.path.join(cache, name)
+
+
+def _file_key(fn):
+    stat = os.stat(fn)
+    return {'path': os.path.abspath(fn), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _encode(value):
+    """Convert a value of the parsed header to JSON-compatible types; other types are tagged"""
+    if isinstance(value, np.ndarray):
+        return {'__ndarray__': value.tolist(), 'dtype': str(value.dtype)}
+    if isinstance(value, tuple):
+        return {'__tuple__': [_encode(item) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return dict((key, _encode(item)) for key, item in value.items())
+        return {'__items__': [[_encode(key), _encode(item)] for key, item in value.items()]}
+    return value
+
+
+def _decode(value):
+    """The ``object_hook`` reversing :py:func:`_encode`"""
+    if '__ndarray__' in value:
+        return np.array(value['__ndarray__'], dtype=value['dtype'])
+    if '__tuple__' in value:
+        return tuple(value['__tuple__'])
+    if '__items__' in value:
+        return dict((_hashable(key), item) for key, item in value['__items__'])
+    return value
+
+
+def _hashable(key):
+    # lists cannot be dictionary keys; keys which were tuples are decoded already
+    if isinstance(key, list):
+        return tuple(key)
+    return key
+
+
+def _header_hash(fn, length):
+    with open(fn, 'rb') as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+def load_sidecar(fn, cache):
+    """Load the cached header of the file if there is a valid sidecar
+
+    :param str fn: file name
+    :param cache: ``True`` for a sidecar next to the file or the name of a cache directory
+    :return dict entry: the cached entry or ``None`` if there is no sidecar or it is stale
+    """
+    try:
+        with open(sidecar_path(fn, cache), 'r') as f:
+            entry = json.load(f, object_hook=_decode)
+    except (IOError, OSError, ValueError, TypeError, KeyError):
+        return None
+    try:
+        if entry['version'] != _CACHE_VERSION:
+            return None
+        if entry['key'] != _file_key(fn):
+            return None
+        if entry['header_hash'] != _header_hash(fn, entry['header_length']):
+            return None
+    except (KeyError, TypeError, IOError, OSError):
+        return None
+    return entry
+
+
+def save_sidecar(fn, cache, literal_data, parsed_data, header_length, file_format, data_stream_offsets=None,
+                 data_stream_formats=None):
+    """Write the parsed header and located data streams of the file to its sidecar
+
+    Failure to write the sidecar (e.g. due to a read-only directory) is silently ignored.
+
+    :param str fn: file name
+    :param cache: ``True`` for a sidecar next to the file or the name of a cache directory
+    :param str literal_data: the literal header
+    :param list parsed_data: the header as parsed by the grammar
+    :param int header_length: the length of the header
+    :param str file_format: the file format
+    :param dict data_stream_offsets: ``(offset, length)`` of each data stream keyed by stream index
+    :param dict data_stream_formats: the encoding (``HxZip``, ``HxByteRLE`` or ``None``) of each data stream
+    """
+    path = sidecar_path(fn, cache)
+    try:
+        entry = {
+            'version': _CACHE_VERSION,
+            'key': _file_key(fn),
+            'header_hash': _header_hash(fn, header_length),
+            'literal_data': literal_data,
+            'parsed_data': parsed_data,
+            'header_length': header_length,
+            'file_format': file_format,
+            'data_stream_offsets': data_stream_offsets,
+            'data_stream_formats': data_stream_formats,
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # write to a temporary file first so that readers never see a partial sidecar
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=SIDECAR_EXTENSION)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(_encode(entry), f)
+            _replace(tmp, path)
+        except Exception:
+            os.remove(tmp)
+            raise
+    except (IOError, OSError):
+        pass
@@ -16,8 +16,11 @@ from __future__ import print_function
 
 import functools as ft
 import inspect
+import io
+import json
 import sys
 import warnings
+import weakref
 
 import numpy as np
 
@@ -110,15 +113,36 @@ def deprecated(description):
     return outer_wrapper
 
 
+# the keys of attributes by which blocks (e.g. materials) are indexed
+_id_keys = ('Id', 'id')
+
+
+def _block_id(block, keys=_id_keys):
+    """The value of the first of ``keys`` which the block has as an attribute or ``None``"""
+    for key in keys:
+        value = block._attrs.get(key)
+        if value is not None:
+            try:
+                hash(value)
+            except TypeError:
+                return None
+            return value
+    return None
+
+
 @ft.total_ordering
 class Block(object):
     """Data content block for atomic entities"""
-    __slots__ = ('_name', '_attrs', '_is_parent', '__dict__', '__weakref__')
+    __slots__ = ('_name', '_attrs', '_is_parent', '_id_index', '_parents', '__dict__', '__weakref__')
 
     def __init__(self, name):
         self._name = name
         self._attrs = _dict()
         self._is_parent = False
+        self._id_index = None  # {Id: block} of Block attributes; built on first lookup
+        # weak references to the blocks which index this block by Id; their indexes are invalidated when its Id
+        # changes since blocks may be given an Id after being added
+        self._parents = None
 
     @property
     def name(self):
@@ -154,8 +178,12 @@ class Block(object):
         if isinstance(attr, Block):
             self._attrs[attr.name] = attr
             self._is_parent = True
+            self._id_index = None
+            attr._add_parent(self)
         else:
             self._attrs[attr] = value
+            if attr in _id_keys:
+                self._invalidate_parent_indexes()
 
     def __setattr__(self, key, value):
         """Guard against unintentional modification of _attrs"""
@@ -188,16 +216,90 @@ class Block(object):
                 del self._attrs[name]
             except KeyError:
                 raise AttributeError('''no attribute '{}' found'''.format(name))
+            self._id_index = None
+            if name in _id_keys or new_name in _id_keys:
+                self._invalidate_parent_indexes()
 
     def rename_attr(self, attr, new_name):
         self.move_attr(new_name, attr)
 
     def __getattr__(self, name):
+        if name == '_attrs':
+            # not yet set e.g. while unpickling; looking it up would recurse
+            raise AttributeError('''attribute {} not found'''.format(name))
         try:
             return self._attrs[name]
         except KeyError:
             raise AttributeError('''attribute {} not found'''.format(name))
 
+    def _build_id_index(self):
+        """Map the Id of each Block attribute to the first Block with that Id"""
+        index = _dict()
+        for block in self._children():
+            block_id = _block_id(block, keys=('Id',))
+            if block_id is not None and block_id not in index:
+                index[block_id] = block
+        return index
+
+    def _get_id_index(self):
+        """The index by Id; rebuilt only if blocks were added or the Id of one of them has changed since it was
+        built"""
+        if self._id_index is None:
+            self._id_index = self._build_id_index()
+        return self._id_index
+
+    def _add_parent(self, parent):
+        """Record a block which may index this block by Id"""
+        if self._parents is None:
+            self._parents = list()
+        for ref in self._parents:
+            if ref() is parent:
+                return
+        self._parents.append(weakref.ref(parent))
+
+    def _invalidate_parent_indexes(self):
+        """Invalidate the indexes by Id of the blocks holding this block after its Id has changed"""
+        if self._parents:
+            parents = [ref for ref in self._parents if ref() is not None]
+            for ref in parents:
+                ref()._id_index = None
+            self._parents = parents
+
+    def _children(self):
+        """The blocks which this block may index by Id"""
+        return [value for value in _dict_iter_values(self._attrs) if isinstance(value, Block)]
+
+    def __getstate__(self):
+        """Pickle all slots except the weak references to parents"""
+        slots = dict()
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if name in ('__dict__', '__weakref__', '_parents'):
+                    continue
+                try:
+                    slots[name] = object.__getattribute__(self, name)
+                except AttributeError:
+                    pass
+        return getattr(self, '__dict__', None) or None, slots
+
+    def __setstate__(self, state):
+        instance_dict, slots = state
+        if instance_dict:
+            self.__dict__.update(instance_dict)
+        for name, value in _dict_iter_items(slots):
+            object.__setattr__(self, name, value)
+        try:
+            object.__getattribute__(self, '_parents')
+        except AttributeError:
+            self._parents = None
+        # children are unpickled first; restore their references to this block
+        for child in self._children():
+            child._add_parent(self)
+
+    def _attr_items(self):
+        """The (name, value) pairs of this block's attributes in the order they are displayed"""
+        return list(_dict_iter_items(self._attrs))
+
     def __str__(self, prefix="", index=None):
         """Compile the hierarchy of Blocks into a tree
 
@@ -205,54 +307,25 @@ class Block(object):
         :param int index: applies for list items [default: None]
         :returns str string: formatted string of attributes
         """
-        # the root Block will have an empty prefix
-        # but the prefix will be updated calls for __str__ for nested Blocks
-        # we use the format() function to pass a format_spec which does alignment
-        string = ''
-        if index is not None:
-            string += "{} {} [is_parent? {:<5}]\n".format(
-                format(prefix + "+[{}]-{}".format(index, self.name), '<55'),
-                format(type(self).__name__, '>50'),
-                str(self.is_parent)
-            )
-        else:
-            name = format(prefix + "+-{}".format(self.name), '<55')
-            if len(name) > 55:
-                name = name[:52] + '...'
-            string += "{} {} [is_parent? {:<5}]\n".format(
-                name,
-                format(type(self).__name__, '>50'),
-                str(self.is_parent)
-            )
-        for attr in self._attrs:
-            # check if the attribute is Block or non-Block
-            if isinstance(self._attrs[attr], Block):
-                # if it is a Block then the prefix will change by having extra '| ' before it
-                # string += 'something\n'
-                string += self._attrs[attr].__str__(prefix=prefix + "|  ")
-            else:
-                # if it is not a Block then we construct the repr. manually
-                val = self._attrs[attr]
-                # don't print the whole array for large arrays
-                if isinstance(val, (np.ndarray,)):
-                    # we construct a tuple for the first array element (0,...,0) and the last
-                    # one (-1,...,-1); however, we have to do this independent of the dimensions
-                    # we use a tuple constructed using shape - 1 in both cases
-                    start = tuple([0] * (len(val.shape) - 1))
-                    end = tuple([-1] * (len(val.shape) - 1))
-                    if start == end:
-                        string += prefix + "|  +-{}: {}\n".format(attr, val[start])
-                    else:
-                        string += prefix + "|  +-{}: {},...,{}\n".format(attr, val[start], val[end])
-                else:
-                    if isinstance(self._attrs[attr], str):
-                        if len(self._attrs[attr]) > 55:
-                            string += prefix + "|  +-{}: {}\n".format(attr, self._attrs[attr][:52] + '...')
-                        else:
-                            string += prefix + "|  +-{}: {}\n".format(attr, self._attrs[attr])
-                    else:
-                        string += prefix + "|  +-{}: {}\n".format(attr, self._attrs[attr])
-        return string
+        f = io.StringIO()
+        write_tree(self, f, prefix=prefix, index=index)
+        return f.getvalue()
+
+    def write(self, f, max_depth=None, max_items=None):
+        """Write the hierarchy of Blocks as a tree to the file-like object ``f`` (see :py:func:`write_tree`)"""
+        write_tree(self, f, max_depth=max_depth, max_items=max_items)
+
+    def to_dict(self):
+        """The hierarchy of Blocks as nested dictionaries of built-in types (see :py:func:`block_to_dict`)"""
+        return block_to_dict(self)
+
+    def to_json(self, **kwargs):
+        """The hierarchy of Blocks as a JSON document (see :py:func:`block_to_dict`)
+
+        Keyword arguments are passed on to :py:func:`json.dumps`.
+        """
+        kwargs.setdefault('default', _json_default)
+        return json.dumps(self.to_dict(), **kwargs)
 
     def __getitem__(self, index):
         try:
@@ -260,13 +333,8 @@ class Block(object):
         except AssertionError:
             raise ValueError('index must be an integer or long')
         if self.name == 'Materials':
-            for attr in self.attrs():
-                block = getattr(self, attr)
-                if hasattr(block, 'Id'):
-                    if getattr(block, 'Id') == index:
-                        return block
-                    else:
-                        continue
+            # constant time lookup of the material with this Id
+            return self._get_id_index().get(index)
         return
 
     def __contains__(self, item):
@@ -294,17 +362,88 @@ class Block(object):
 
 
 class ListBlock(Block):
-    """Data content block for sequence entities"""
-    __slots__ = ('_list', '_material_dict')
+    """Data content block for sequence entities
+
+    Blocks in the list are indexed by name (see :py:attr:`material_dict`) and, together with Block attributes,
+    by ``Id`` (see :py:attr:`id_dict`). The indexes are built on first lookup and then kept up to date by the
+    methods which change the list so that lookups take constant time.
+    """
+    __slots__ = ('_list', '_material_dict', '_name_index')
 
     def __init__(self, *args, **kwargs):
         super(ListBlock, self).__init__(*args, **kwargs)
+        self._name_index = None  # {name: block} of list items; built on first lookup
         self._list = list()  # separate attribute for ease of management
-        self._material_dict = dict()  # a dictionary used by Materials to extract material by material name
+        self._material_dict = None  # explicitly assigned dictionary of materials by name (see material_dict)
 
     def items(self):
         return self._list
 
+    def _build_id_index(self):
+        """Map each Id (or id) of Block attributes and list items to the first Block with that Id"""
+        index = _dict()
+        for block in self._children():
+            block_id = _block_id(block)
+            if block_id is not None and block_id not in index:
+                index[block_id] = block
+        return index
+
+    def _children(self):
+        return super(ListBlock, self)._children() + self._list
+
+    def _get_name_index(self):
+        if self._name_index is None:
+            index = _dict()
+            for block in self._list:
+                index[block.name] = block
+            self._name_index = index
+        return self._name_index
+
+    def _index_item(self, item, at_end=True):
+        """Add an item which has just been added to the list to the indexes
+
+        The first item with an Id and the last item with a name are indexed; if an item inserted before the end
+        of the list clashes with an indexed one the index is rebuilt on the next lookup.
+        """
+        if self._name_index is not None:
+            if at_end or item.name not in self._name_index:
+                self._name_index[item.name] = item
+            else:
+                self._name_index = None
+        item._add_parent(self)
+        if self._id_index is not None:
+            block_id = _block_id(item)
+            if block_id is not None:
+                if block_id not in self._id_index:
+                    self._id_index[block_id] = item
+                elif not at_end:
+                    self._id_index = None
+
+    def _unindex_item(self, item):
+        """Remove an item which has just been removed from the list from the indexes"""
+        if self._name_index is not None and self._name_index.get(item.name) is item:
+            # another item may have the same name
+            self._name_index = None
+        if self._id_index is not None:
+            block_id = _block_id(item)
+            if block_id is not None and self._id_index.get(block_id) is item:
+                self._id_index = None
+
+    def _reset_indexes(self):
+        self._name_index = None
+        self._id_index = None
+        for item in self._list:
+            item._add_parent(self)
+
+    @property
+    def id_dict(self):
+        """A dictionary of the Block attributes and list items (e.g. materials) indexed by ``Id`` (or ``id``)
+
+        Where several blocks have the same Id the first is indexed. This dictionary is maintained by the
+        ListBlock and should not be modified.
+        """
+        return self._get_id_index()
+
     @property
     def ids(self):
         ids = list()
@@ -328,9 +467,15 @@ class ListBlock(Block):
     def material_dict(self):
         """A convenience dictionary of materials indexed by material name
 
-        If this is not a Materials ListBlock (name = 'Material') then it should return None
+        For a Materials ListBlock this is the index of list items by name which is maintained by the ListBlock
+        (unless a dictionary has been assigned explicitly); other ListBlocks have a dictionary of their own which
+        is initially empty.
         """
-        # todo: testcase: name == 'Materials' ? dictionary of material blocks : None
+        if self._material_dict is not None:
+            return self._material_dict
+        if self.name == 'Materials':
+            return self._get_name_index()
+        self._material_dict = dict()
         return self._material_dict
 
     @material_dict.setter
@@ -370,6 +515,9 @@ class ListBlock(Block):
                     assert all(map(lambda x: isinstance(x, Block), value))
                 except AssertionError:
                     raise ValueError("list contains non-Block class/subclass")
+            super(ListBlock, self).__setattr__(key, value)
+            self._reset_indexes()
+            return
         super(ListBlock, self).__setattr__(key, value)
 
     @property
@@ -384,20 +532,6 @@ class ListBlock(Block):
             else:
                 return False
 
-    def __str__(self, prefix="", index=None):
-        """Convert the ListBlock into a string
-
-        :param str prefix: prefix to signify depth in the tree
-        :param int index: applies for list items [default: None]
-        :returns str string: formatted string of attributes
-        """
-        # first we use the superclass to populate everything else
-        string = super(ListBlock, self).__str__(prefix=prefix, index=index)
-        # now we stringify the list-blocks
-        for index, block in enumerate(self.items()):
-            string += block.__str__(prefix=prefix + "|  ", index=index)
-        return string
-
     def __len__(self):
         return len(self._list)
 
@@ -407,10 +541,19 @@ class ListBlock(Block):
         except AssertionError:
             raise ValueError('value must be a Block class/subclass')
         try:
-            self._list[key] = value
+            replaced = self._list[key]
         except IndexError:
             self._list.append(value)
+            self._index_item(value)
             # raise ValueError("index {} does not exist".format(key))
+            return
+        self._list[key] = value
+        if isinstance(replaced, list):
+            # a slice was assigned
+            self._reset_indexes()
+        else:
+            self._unindex_item(replaced)
+            self._index_item(value, at_end=False)
 
     def __getitem__(self, item):
         try:
@@ -428,9 +571,14 @@ class ListBlock(Block):
 
     def __delitem__(self, key):
         try:
+            removed = self._list[key]
             del self._list[key]
         except KeyError:
             raise IndexError("missing item at index'{}'".format(key))
+        if isinstance(removed, list):
+            self._reset_indexes()
+        else:
+            self._unindex_item(removed)
 
     # Mutable sequences should provide methods append(), count(), index(), extend(), insert(), pop(), remove(),
     # reverse() and sort(), like Python standard list objects.
@@ -440,6 +588,7 @@ class ListBlock(Block):
         except AssertionError:
             raise ValueError('item must be a Block class/subclass')
         self._list.append(item)
+        self._index_item(item)
 
     def count(self, item, *args):
         try:
@@ -461,26 +610,181 @@ class ListBlock(Block):
         except AssertionError:
             raise ValueError('item must be a Block class/subclass')
         self._list.extend(item)
+        for block in item:
+            self._index_item(block)
 
     def insert(self, index, item):
         try:
             assert isinstance(item, Block)
         except AssertionError:
             raise ValueError('item must be a Block class/subclass')
+        at_end = index >= len(self._list)
         self._list.insert(index, item)
+        self._index_item(item, at_end=at_end)
 
     def pop(self, *args):
-        return self._list.pop(*args)
+        item = self._list.pop(*args)
+        self._unindex_item(item)
+        return item
 
     def remove(self, item):
         try:
             assert isinstance(item, Block)
         except AssertionError:
             raise ValueError('item must be a Block class/subclass')
-        return self._list.remove(item)
+        # Blocks compare equal by name so find the item which is actually removed
+        removed = self._list[self._list.index(item)]
+        self._list.remove(item)
+        self._unindex_item(removed)
 
     def reverse(self):
         self._list.reverse()
+        # the order decides which of several items with the same name or Id is indexed
+        self._reset_indexes()
 
     def sort(self, **kwargs):
-        return self._list.sort(**kwargs)
+        self._list.sort(**kwargs)
+        self._reset_indexes()
+
+
+def _block_line(block, prefix, index):
+    """The line introducing a block in the tree"""
+    # we use the format() function to pass a format_spec which does alignment
+    if index is not None:
+        return u"{} {} [is_parent? {:<5}]\n".format(
+            format(prefix + "+[{}]-{}".format(index, block.name), '<55'),
+            format(type(block).__name__, '>50'),
+            str(block.is_parent)
+        )
+    name = format(prefix + "+-{}".format(block.name), '<55')
+    if len(name) > 55:
+        name = name[:52] + '...'
+    return u"{} {} [is_parent? {:<5}]\n".format(
+        name,
+        format(type(block).__name__, '>50'),
+        str(block.is_parent)
+    )
+
+
+def _value_line(attr, val, prefix):
+    """The line displaying a (non-Block) attribute in the tree"""
+    # don't print the whole array for large arrays
+    if isinstance(val, (np.ndarray,)):
+        # we construct a tuple for the first array element (0,...,0) and the last
+        # one (-1,...,-1); however, we have to do this independent of the dimensions
+        # we use a tuple constructed using shape - 1 in both cases
+        start = tuple([0] * (len(val.shape) - 1))
+        end = tuple([-1] * (len(val.shape) - 1))
+        if start == end:
+            return prefix + u"|  +-{}: {}\n".format(attr, val[start])
+        return prefix + u"|  +-{}: {},...,{}\n".format(attr, val[start], val[end])
+    if isinstance(val, str) and len(val) > 55:
+        return prefix + u"|  +-{}: {}\n".format(attr, val[:52] + '...')
+    return prefix + u"|  +-{}: {}\n".format(attr, val)
+
+
+def _tree_entries(block, depth, max_depth, max_items):
+    """Generate the entries of a block in the tree: its attributes followed by its list items
+
+    :return generator entries: tuples ``(name, value, index)`` where ``index`` is the list index of list items
+        (otherwise ``None``) or ``(None, count, None)`` for ``count`` entries which are not displayed
+    """
+    attr_items = block._attr_items()
+    list_items = block._list if isinstance(block, ListBlock) else []
+    total = len(attr_items) + len(list_items)
+    limit = total
+    if max_depth is not None and depth >= max_depth:
+        limit = 0
+    elif max_items is not None:
+        limit = min(total, max_items)
+    for name, value in attr_items[:limit]:
+        yield name, value, None
+    for index in xrange(max(0, min(len(list_items), limit - len(attr_items)))):
+        yield None, list_items[index], index
+    if limit < total:
+        yield None, total - limit, None
+
+
+def write_tree(block, f, max_depth=None, max_items=None, prefix="", index=None):
+    """Write the hierarchy of Blocks below ``block`` as a tree to the file-like object ``f``
+
+    The tree is written line by line while it is walked (without recursion) so that time and memory are linear
+    in the size of the output. Large trees may be truncated: blocks below ``max_depth`` are not expanded and at
+    most ``max_items`` attributes and list items are displayed per block; omitted entries are summarised as
+    ``+-... (<n> more)``.
+
+    :param block: a :py:class:`Block`
+    :param f: a file-like object with a ``write`` method accepting text
+    :param int max_depth: the depth below which blocks are not expanded; ``None`` (default) for no limit
+    :param int max_items: the number of entries displayed per block; ``None`` (default) for no limit
+    :param str prefix: prefix to signify depth in the tree
+    :param int index: applies for list items [default: None]
+    """
+    write = f.write
+    write(_block_line(block, prefix, index))
+    # a stack of the entries still to be written for each open block
+    stack = [(_tree_entries(block, 0, max_depth, max_items), prefix)]
+    while stack:
+        entries, prefix = stack[-1]
+        for name, value, index in entries:
+            if isinstance(value, Block):
+                # descend; the remaining entries of this block follow once the child is written
+                child_prefix = prefix + "|  "
+                write(_block_line(value, child_prefix, index))
+                stack.append((_tree_entries(value, len(stack), max_depth, max_items), child_prefix))
+                break
+            elif name is None:
+                write(prefix + u"|  +-... ({} more)\n".format(value))
+            else:
+                write(_value_line(name, value, prefix))
+        else:
+            stack.pop()
+
+
+def _to_builtin(value):
+    """Convert NumPy values to built-in types; arrays are converted by NumPy in a single call"""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
+
+
+def _json_default(value):
+    """Serialise Blocks and NumPy values which :py:mod:`json` cannot serialise itself"""
+    if isinstance(value, Block):
+        return block_to_dict(value)
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError("{} is not JSON serializable".format(type(value).__name__))
+
+
+def block_to_dict(block):
+    """Convert the hierarchy of Blocks below ``block`` into nested dictionaries
+
+    Each Block becomes a dictionary of its attributes in the order in which they are displayed; the items of a
+    :py:class:`ListBlock` are added as a list of dictionaries under ``items``, each with the name of the item as
+    ``name`` (neither can be the name of an attribute). NumPy arrays and scalars are converted to lists and
+    built-in numbers with :py:meth:`numpy.ndarray.tolist` so that the result can be serialised e.g. with
+    :py:func:`json.dumps`. The tree is walked without recursion.
+
+    :param block: a :py:class:`Block`
+    :return dict data: the attributes and items of ``block``
+    """
+    data = _dict()
+    stack = [(block, data)]
+    while stack:
+        block, block_data = stack.pop()
+        for name, value in block._attr_items():
+            if isinstance(value, Block):
+                block_data[name] = _dict()
+                stack.append((value, block_data[name]))
+            else:
+                block_data[name] = _to_builtin(value)
+        if isinstance(block, ListBlock):
+            items = list()
+            for item in block._list:
+                item_data = _dict()
+                item_data['name'] = item.name
+                items.append(item_data)
+                stack.append((item, item_data))
+            block_data['items'] = items
+    return data
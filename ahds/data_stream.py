@@ -18,16 +18,22 @@ Both classes inherit from `AmiraDataStream` class, which handles common function
 """
 from __future__ import print_function
 
+import bisect
+import collections
+import itertools
+import mmap
+import multiprocessing
 import re
 import sys
 # todo: remove as soon as DataStreams class is removed
 import warnings
 import zlib
+from multiprocessing.pool import ThreadPool
 
 import numpy as np
 
 
-from .core import _dict_iter_keys, _dict_iter_values, ListBlock, deprecated
+from .core import _dict_iter_items, _dict_iter_keys, _dict_iter_values, ListBlock, deprecated, xrange
 from .grammar import _hyper_surface_file
 
 # definition of numpy data types with dedicated endianess and number of bits
@@ -132,16 +138,83 @@ _type_map = {
     'ascii': _np_char
 }
 
+# number of encoded bytes scanned at a time when locating HxByteRLE runs without the C-ext.
+_rle_scan_chunk_size = 2 ** 20
+
+
+def _hxbyterle_runs(data):
+    """Locate the runs of an HxByteRLE stream
+
+    A control byte ``n > 127`` is followed by ``n & 0x7f`` literal bytes while a control byte ``n <= 127`` is
+    followed by a single byte repeated ``n`` times. The stream is scanned in place (see
+    :py:func:`byterle_run_offsets`) so that memory-mapped streams are not copied.
+
+    :param data: the encoded stream (any buffer e.g. ``bytes``, ``mmap`` or ``np.memmap``)
+    :return tuple runs: arrays of the control byte offsets, decoded run lengths and whether each run is literal
+    """
+    offsets = byterle_run_offsets(data)
+    controls = np.frombuffer(data, dtype=np.uint8)[offsets]
+    literal = controls > 127
+    lengths = np.where(literal, controls & 0x7f, controls).astype(np.int64)
+    return offsets, lengths, literal
+
+
+def hxbyterle_decode_numpy(data, output_size):
+    """Vectorised NumPy implementation of the HxByteRLE decoder
+
+    Runs are located by :py:func:`_hxbyterle_runs` after which every run is expanded at once: the first
+    payload byte of each run is repeated over the whole run with ``np.repeat`` and the payload of
+    literal runs is then copied over with boolean (fancy) indexing.
+
+    :param str data: a raw stream of data to be unpacked
+    :param int output_size: the number of items when ``data`` is uncompressed
+    :return np.array output: an array of ``np.uint8``
+    """
+    input_data = np.frombuffer(data, dtype=np.uint8)
+    offsets, lengths, literal = _hxbyterle_runs(data)
+    if int(lengths.sum()) != output_size:
+        raise ValueError("HxByteRLE stream decodes to {} bytes instead of {} bytes".format(
+            int(lengths.sum()), output_size))
+    if len(offsets) > 0:
+        # runs follow each other so only the payload of the last run may extend beyond the input; the value byte
+        # of a terminating empty run may be absent (as in the C decoder)
+        if literal[-1]:
+            payload_length = int(lengths[-1])
+        else:
+            payload_length = 1 if lengths[-1] > 0 else 0
+        if int(offsets[-1]) + 1 + payload_length > len(input_data):
+            raise ValueError("HxByteRLE stream is truncated in its last run")
+    if output_size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    # repeated runs: the byte after the control byte fills the whole run
+    values = offsets + 1
+    if values[-1] == len(input_data):
+        # the terminating empty run has no value byte; it is repeated zero times so any byte will do
+        values[-1] = offsets[-1]
+    output = np.repeat(input_data[values], lengths)
+    if literal.any():
+        # literal runs: the payload bytes appear in the same order in the input and the output
+        payload_lengths = np.where(literal, lengths, 1)
+        input_segments = np.empty(2 * len(offsets), dtype=np.int64)
+        input_segments[0::2] = 1  # the control bytes
+        input_segments[1::2] = payload_lengths
+        input_flags = np.zeros(2 * len(offsets), dtype=bool)
+        input_flags[1::2] = literal
+        input_mask = np.repeat(input_flags, input_segments)[:len(input_data)]
+        output[np.repeat(literal, lengths)] = input_data[input_mask]
+    return output
+
+
 # try to import native byterele_decoder binary and fallback to python implementation
 try:
     # if import failed for whatever reason
     if sys.version_info[0] > 2:
-        from ahds.decoders import byterle_decoder
+        from ahds.decoders import byterle_decoder, byterle_decoder_into, byterle_run_offsets
     else:
-        from .decoders import byterle_decoder
+        from .decoders import byterle_decoder, byterle_decoder_into, byterle_run_offsets
 except ImportError:
     def byterle_decoder(data, output_size):
-        """If the C-ext. failed to compile or is unimportable use this slower Python equivalent
+        """If the C-ext. failed to compile or is unimportable use the vectorised NumPy equivalent
 
         :param str data: a raw stream of data to be unpacked
         :param int output_size: the number of items when ``data`` is uncompressed
@@ -149,55 +222,191 @@ except ImportError:
         """
 
         from warnings import warn
-        warn("using pure-Python (instead of Python C-extension) implementation of byterle_decoder")
-
-        input_data = np.frombuffer(data, dtype=_np_ubytelittle, count=len(data))
-        output = np.zeros(output_size, dtype=np.uint8)
-        i = 0
-        count = True
-        repeat = False
-        no = None
-        j = 0
-        while i < len(input_data):
-            if count:
-                no = input_data[i]
-                if no > 127:
-                    no &= 0x7f  # 2's complement
-                    count = False
-                    repeat = True
-                    i += 1
-                    continue
-                else:
-                    i += 1
-                    count = False
-                    repeat = False
-                    continue
-            elif not count:
-                if repeat:
-                    # value = input_data[i:i + no]
-                    repeat = False
-                    count = True
-                    # output[j:j+no] = np.array(value)
-                    output[j:j + no] = input_data[i:i + no]
-                    i += no
-                    j += no
-                    continue
-                elif not repeat:
-                    # value = input_data[i]
-                    # output[j:j+no] = value
-                    output[j:j + no] = input_data[i]
-                    i += 1
-                    j += no
-                    count = True
-                    repeat = False
-                    continue
+        warn("using NumPy (instead of Python C-extension) implementation of byterle_decoder")
 
-        assert j == output_size
+        return hxbyterle_decode_numpy(data, output_size)
 
-        return output
 
-# define common alias for the selected byterle_decoder implementation
+    def byterle_decoder_into(data, output):
+        """NumPy equivalent of the C-ext. decoder which decodes into a preallocated buffer
+
+        :param data: a raw stream of data to be unpacked (any buffer)
+        :param output: a writable buffer of exactly the decoded size
+        :return int size: the number of bytes decoded
+        """
+        output = np.frombuffer(output, dtype=np.uint8)
+        output[:] = byterle_decoder(data, len(output))
+        return len(output)
+
+
+    def byterle_run_offsets(data):
+        """NumPy equivalent of the C-ext. function which locates the control bytes of an HxByteRLE stream
+
+        Each control byte gives the offset of the next so the runs are followed by pointer doubling over a chunk
+        of the stream at a time: after ``k`` rounds the first ``2 ** k`` runs of the chunk are known.
+
+        :param data: the encoded stream (any buffer e.g. ``bytes``, ``mmap`` or ``np.memmap``)
+        :return np.array offsets: the offsets of the control bytes as ``np.int64``
+        """
+        input_data = np.frombuffer(data, dtype=np.uint8)
+        offsets = [np.zeros(0, dtype=np.int64)]
+        position = 0
+        while position < len(input_data):
+            chunk = input_data[position:position + _rle_scan_chunk_size]
+            size = len(chunk)
+            run_sizes = np.where(chunk > 127, (chunk & 0x7f).astype(np.int64) + 1, 2)
+            # the offset of the run following each byte (were it a control byte); runs leaving the chunk end at size
+            jump = np.empty(size + 1, dtype=np.int64)
+            jump[:size] = np.minimum(np.arange(size) + run_sizes, size)
+            jump[size] = size
+            runs = np.zeros(1, dtype=np.int64)
+            while True:
+                following = jump[runs]
+                following = following[following < size]
+                runs = np.concatenate([runs, following])
+                if len(following) < len(runs) - len(following):
+                    # the chain has left the chunk
+                    break
+                jump = jump[jump]
+            offsets.append(runs + position)
+            position += int(runs[-1] + run_sizes[runs[-1]])
+        return np.concatenate(offsets)
+
+# define common aliases for the selected byterle_decoder implementation
 hxbyterle_decode = byterle_decoder
+hxbyterle_decode_into = byterle_decoder_into
+
+# NumPy type characters of the types which may be stored in ASCII streams
+_ascii_typecodes = 'bBhHiIlLqQfd'
+
+# try to import the native ASCII parser and fallback to the NumPy implementation
+try:
+    if sys.version_info[0] > 2:
+        from ahds.decoders import ascii_decoder_into, ascii_token_count
+    else:
+        from .decoders import ascii_decoder_into, ascii_token_count
+except ImportError:
+    # the whitespace separating values in ASCII streams (the same as bytes.split())
+    _ascii_whitespace = np.zeros(256, dtype=bool)
+    _ascii_whitespace[list(bytearray(b' \t\n\r\x0b\x0c'))] = True
+
+
+    def ascii_token_count(data):
+        """NumPy equivalent of the C-ext. function which counts the whitespace separated tokens in a buffer
+
+        :param data: a raw ASCII stream (any buffer)
+        :return int count: the number of tokens
+        """
+        is_token = ~_ascii_whitespace[np.frombuffer(data, dtype=np.uint8)]
+        if len(is_token) == 0:
+            return 0
+        return int(is_token[0]) + int(np.count_nonzero(is_token[1:] & ~is_token[:-1]))
+
+
+    def ascii_decoder_into(data, output, typecode):
+        """NumPy equivalent of the C-ext. parser of whitespace separated numbers
+
+        :param data: a raw ASCII stream (any buffer)
+        :param output: a writable buffer with items of type ``typecode``
+        :param str typecode: the NumPy type character of the items of ``output`` e.g. ``'f'``
+        :return int count: the number of values parsed
+        """
+        if typecode not in _ascii_typecodes:
+            raise ValueError("unsupported type code for ASCII streams: '{}'".format(typecode))
+        output = np.frombuffer(output, dtype=np.dtype(typecode))
+        values = bytes(data).split()
+        if len(values) > len(output):
+            raise ValueError("ASCII stream has more than {} values".format(len(output)))
+        if output.dtype.kind == 'f':
+            output[:len(values)] = np.array(values, dtype=np.float64)
+        else:
+            parsed = np.array(values, dtype=np.int64)
+            info = np.iinfo(output.dtype)
+            if len(parsed) and (parsed.min() < info.min or parsed.max() > info.max):
+                raise ValueError("ASCII stream has values out of range for type '{}'".format(typecode))
+            output[:len(values)] = parsed
+        return len(values)
+
+# number of bytes of an ASCII stream parsed at a time by a single thread
+_ascii_chunk_size = 2 ** 22
+
+# any whitespace at which an ASCII stream may be split
+_ascii_separator = re.compile(b'[ \t\n\r\x0b\x0c]')
+
+
+def _ascii_chunk_bounds(data, chunk_size=_ascii_chunk_size):
+    """Split an ASCII stream at whitespace into chunks of at least ``chunk_size`` bytes
+
+    :return list bounds: the ``(start, end)`` offsets of the chunks
+    """
+    bounds = list()
+    start = 0
+    size = len(data)
+    while start < size:
+        end = size
+        if start + chunk_size < size:
+            m = _ascii_separator.search(data, start + chunk_size)
+            if m is not None:
+                end = m.start()
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def ascii_decode_into(data, output, workers=None, chunk_size=_ascii_chunk_size):
+    """Parse an ASCII data stream into a preallocated array
+
+    The stream is split at whitespace into chunks of about ``chunk_size`` bytes. The values in each chunk
+    are counted so that each chunk can then be parsed by a pool of threads straight into its own slice of
+    ``output`` (the native parser releases the GIL).
+
+    :param data: the raw ASCII stream (any buffer)
+    :param output: a contiguous, writable array of a numeric type whose size is the declared number of values
+    :param int workers: the number of threads; ``None`` (default) uses one per CPU for streams spanning several
+        chunks
+    :param int chunk_size: the approximate number of bytes parsed by a thread at a time
+    :return np.array output: the ``output`` array
+    :raises ValueError: unless the stream consists of exactly ``output.size`` valid values
+    """
+    typecode = output.dtype.char
+    if typecode not in _ascii_typecodes:
+        raise ValueError("unsupported type for ASCII streams: {}".format(output.dtype))
+    flat = output.reshape(-1)
+    bounds = _ascii_chunk_bounds(data, chunk_size) if workers != 1 else [(0, len(data))]
+    if len(bounds) <= 1:
+        count = ascii_decoder_into(data, flat, typecode)
+        if count != flat.size:
+            raise ValueError("ASCII stream has {} values instead of {}".format(count, flat.size))
+        return output
+    view = memoryview(data)
+    chunks = [view[start:end] for start, end in bounds]
+    pool = ThreadPool(min(workers or multiprocessing.cpu_count(), len(chunks)))
+    try:
+        counts = pool.map(ascii_token_count, chunks)
+        if sum(counts) != flat.size:
+            raise ValueError("ASCII stream has {} values instead of {}".format(sum(counts), flat.size))
+        tasks = list()
+        offset = 0
+        for chunk, count in zip(chunks, counts):
+            tasks.append((chunk, flat[offset:offset + count]))
+            offset += count
+        pool.map(lambda task: ascii_decoder_into(task[0], task[1], typecode), tasks)
+    finally:
+        pool.close()
+        pool.join()
+    return output
+
+
+def ascii_decode(data, dtype, count, workers=None):
+    """Parse an ASCII data stream of exactly ``count`` values (see :py:func:`ascii_decode_into`)
+
+    :param data: the raw ASCII stream (any buffer)
+    :param dtype: the NumPy type of the values
+    :param int count: the number of values declared in the header
+    :param int workers: the number of threads
+    :return np.array output: a 1D array of ``count`` values
+    """
+    return ascii_decode_into(data, np.empty(count, dtype=dtype), workers=workers)
 
 
 def hxzip_decode(data, output_size):
@@ -207,7 +416,256 @@ def hxzip_decode(data, output_size):
     :param int output_size: the number of items when ``data`` is uncompressed
     :return np.array output: an array of ``np.uint8``
     """
-    return np.frombuffer(zlib.decompress(data), dtype=_np_ubytelittle, count=output_size)
+    output = np.empty(output_size, dtype=np.uint8)
+    hxzip_decode_into(_iter_buffer_chunks(data), output)
+    return output
+
+
+# number of bytes read from the file or inflated at a time when streaming HxZip data
+_chunk_size = 2 ** 22
+
+
+def _iter_file_chunks(f, length, chunk_size=_chunk_size):
+    """Read ``length`` bytes from the file object in chunks"""
+    while length > 0:
+        chunk = f.read(min(chunk_size, length))
+        if not chunk:
+            break
+        length -= len(chunk)
+        yield chunk
+
+
+def _iter_buffer_chunks(data, chunk_size=_chunk_size):
+    """Split the buffer into chunks without copying it"""
+    view = memoryview(data)
+    for start in xrange(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+
+def hxzip_decode_into(chunks, output, chunk_size=_chunk_size):
+    """Inflate a zlib compressed stream incrementally into a preallocated array
+
+    At most ``chunk_size`` bytes are inflated at a time so that peak memory is about the size of ``output``
+    plus one chunk.
+
+    :param chunks: an iterable of chunks of compressed bytes
+    :param output: a writable ``np.uint8`` array of exactly the uncompressed size
+    :param int chunk_size: the maximum number of bytes inflated at a time
+    :return np.array output: the ``output`` array
+    """
+    decompressor = zlib.decompressobj()
+    output_size = len(output)
+    position = 0
+    for chunk in chunks:
+        while chunk and position < output_size:
+            inflated = decompressor.decompress(chunk, min(chunk_size, output_size - position))
+            output[position:position + len(inflated)] = np.frombuffer(inflated, dtype=np.uint8)
+            position += len(inflated)
+            chunk = decompressor.unconsumed_tail
+        if position == output_size:
+            break
+    if position != output_size:
+        raise ValueError("HxZip stream inflated to {} bytes instead of {} bytes".format(position, output_size))
+    return output
+
+
+# marks the beginning of a data stream in the data section of an AmiraMesh file
+_data_stream_marker = re.compile(b"\n@(?P<stream>\\d+)\n")
+
+
+def locate_data_streams(fn, offset, stream_sizes):
+    """Scan the data section of an AmiraMesh file once and locate every data stream
+
+    The scan starts at the end of the header and walks forward over the ``@<n>`` markers.
+    Whenever the byte count of a stream is known in advance (binary streams) the scan
+    jumps directly over the stream bytes so that stream content is never searched. Otherwise
+    the stream ends where the next marker begins.
+
+    :param str fn: file name
+    :param int offset: byte offset at which the data section begins (end of the header)
+    :param dict stream_sizes: byte count of each stream keyed by stream index; ``None`` if unknown
+    :return dict offsets: ``(offset, length)`` of each stream keyed by stream index
+    """
+    offsets = dict()
+    with open(fn, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            file_size = len(data)
+            pending = None  # (index, start) of a stream whose end is still unknown
+            position = offset
+            while True:
+                match = _data_stream_marker.search(data, position)
+                # ignore markers which do not belong to any declared stream
+                while match is not None and (
+                        int(match.group('stream')) not in stream_sizes or int(match.group('stream')) in offsets):
+                    match = _data_stream_marker.search(data, match.start() + 1)
+                if pending is not None:
+                    index, start = pending
+                    if match is None:  # this is the last stream
+                        end = file_size
+                        # strip the newline terminating the file but no newlines belonging to the stream
+                        if end > start and data[end - 1:end] == b'\n':
+                            end -= 1
+                    else:
+                        end = match.start()
+                    offsets[index] = (start, end - start)
+                    pending = None
+                if match is None:
+                    break
+                index = int(match.group('stream'))
+                start = match.end()
+                size = stream_sizes.get(index, None)
+                if size is not None and start + size <= file_size:
+                    offsets[index] = (start, size)
+                    position = start + size
+                else:
+                    pending = (index, start)
+                    position = start
+        finally:
+            data.close()
+    return offsets
+
+
+# number of bytes of inflated output between two HxZip checkpoints
+_checkpoint_interval = 2 ** 24
+
+
+class HxZipIndex(object):
+    """Random-access checkpoints into an HxZip (zlib compressed) data stream
+
+    A checkpoint records the number of compressed bytes consumed and the number of bytes inflated up to
+    that point together with a copy of the inflater state (which includes the 32 KiB deflate window).
+    Checkpoints are recorded every ``interval`` bytes of output while inflating so that later requests
+    for part of the stream resume from the nearest preceding checkpoint instead of the start of the stream.
+
+    NOTE: the inflater state cannot be serialised by the ``zlib`` module so the index only lives as long
+    as the data stream which holds it.
+    """
+
+    def __init__(self, interval=_checkpoint_interval):
+        self.interval = interval
+        # (compressed offset, inflated offset, inflater); the first checkpoint is the start of the stream
+        self._checkpoints = [(0, 0, None)]
+
+    def __len__(self):
+        return len(self._checkpoints)
+
+    def nearest(self, output_offset):
+        """The last checkpoint at or before ``output_offset`` of the inflated stream"""
+        positions = [checkpoint[1] for checkpoint in self._checkpoints]
+        return self._checkpoints[bisect.bisect_right(positions, output_offset) - 1]
+
+    def add(self, input_offset, output_offset, inflater):
+        """Record a checkpoint unless it is already covered"""
+        if output_offset > self._checkpoints[-1][1]:
+            self._checkpoints.append((input_offset, output_offset, inflater))
+
+    def inflate(self, f, offset, length, output, start=0, chunk_size=_chunk_size):
+        """Inflate the bytes ``[start, start + len(output))`` of the stream into ``output``
+
+        Inflation resumes from the nearest checkpoint and new checkpoints are recorded on the way.
+
+        :param f: file object open for reading in binary mode
+        :param int offset: the file offset of the compressed stream
+        :param int length: the number of compressed bytes
+        :param output: a writable ``np.uint8`` array for the requested bytes
+        :param int start: offset of the first requested byte in the inflated stream
+        :param int chunk_size: the maximum number of bytes read or inflated at a time
+        :return np.array output: the ``output`` array
+        """
+        input_offset, position, inflater = self.nearest(start)
+        inflater = zlib.decompressobj() if inflater is None else inflater.copy()
+        end = start + len(output)
+        next_checkpoint = (position // self.interval + 1) * self.interval
+        f.seek(offset + input_offset)
+        for chunk in _iter_file_chunks(f, length - input_offset, chunk_size):
+            chunk_end = input_offset + len(chunk)
+            while chunk and position < end:
+                inflated = inflater.decompress(chunk, min(chunk_size, end - position, next_checkpoint - position))
+                # only keep the inflated bytes which have been requested
+                first = max(position, start)
+                if position + len(inflated) > first:
+                    output[first - start:position + len(inflated) - start] = np.frombuffer(
+                        inflated, dtype=np.uint8)[first - position:]
+                position += len(inflated)
+                chunk = inflater.unconsumed_tail
+                if position == next_checkpoint:
+                    self.add(chunk_end - len(chunk), position, inflater.copy())
+                    next_checkpoint += self.interval
+            input_offset = chunk_end
+            if position >= end:
+                break
+        if position < end:
+            raise ValueError("HxZip stream inflated to {} bytes instead of at least {} bytes".format(position, end))
+        return output
+
+
+# number of bytes of decoded output between two HxByteRLE checkpoints
+_rle_checkpoint_interval = 2 ** 20
+
+
+def hxbyterle_checkpoints(data, interval=_rle_checkpoint_interval):
+    """Find run boundaries of an HxByteRLE stream roughly every ``interval`` bytes of decoded output
+
+    :param data: the encoded stream (any buffer e.g. ``bytes``, ``mmap`` or ``np.memmap``)
+    :param int interval: the number of decoded bytes between checkpoints
+    :return list checkpoints: ``(input offset, output offset)`` pairs including the start and end of the stream
+    """
+    offsets, lengths, literal = _hxbyterle_runs(data)
+    # input and output offsets at the end of each run
+    input_ends = np.minimum(offsets + 1 + np.where(literal, lengths, 1), len(data))
+    output_ends = np.cumsum(lengths)
+    # a checkpoint follows every run that crosses a multiple of the interval
+    crossings = np.flatnonzero(np.diff(np.concatenate([[0], output_ends // interval])) > 0)
+    checkpoints = [(0, 0)] + list(zip(input_ends[crossings].tolist(), output_ends[crossings].tolist()))
+    if len(offsets) and checkpoints[-1][1] != int(output_ends[-1]):
+        checkpoints.append((int(input_ends[-1]), int(output_ends[-1])))
+    return checkpoints
+
+
+class HxByteRLEIndex(object):
+    """Random-access checkpoints into an HxByteRLE data stream
+
+    Checkpoints are ``(input offset, output offset)`` pairs at run boundaries so that any range of the decoded
+    stream can be decoded from the encoded bytes between the two enclosing checkpoints.
+    """
+
+    def __init__(self, data, interval=_rle_checkpoint_interval):
+        self.interval = interval
+        self._checkpoints = hxbyterle_checkpoints(data, interval)
+
+    def __len__(self):
+        return len(self._checkpoints)
+
+    def span(self, start, end):
+        """The pair of checkpoints enclosing the range ``[start, end)`` of the decoded stream"""
+        positions = [checkpoint[1] for checkpoint in self._checkpoints]
+        first = bisect.bisect_right(positions, start) - 1
+        last = min(bisect.bisect_left(positions, end), len(positions) - 1)
+        return self._checkpoints[first], self._checkpoints[last]
+
+    def decode(self, f, offset, output, start=0):
+        """Decode the bytes ``[start, start + len(output))`` of the stream into ``output``
+
+        :param f: file object open for reading in binary mode
+        :param int offset: the file offset of the encoded stream
+        :param output: a writable ``np.uint8`` array for the requested bytes
+        :param int start: offset of the first requested byte in the decoded stream
+        :return np.array output: the ``output`` array
+        """
+        (input_start, output_start), (input_end, output_end) = self.span(start, start + len(output))
+        if output_end < start + len(output):
+            raise ValueError("HxByteRLE stream decodes to {} bytes instead of at least {} bytes".format(
+                output_end, start + len(output)))
+        f.seek(offset + input_start)
+        if output_start == start and output_end == start + len(output):
+            # the range is aligned on checkpoints: decode in place
+            hxbyterle_decode_into(f.read(input_end - input_start), output)
+        else:
+            decoded = np.empty(output_end - output_start, dtype=np.uint8)
+            hxbyterle_decode_into(f.read(input_end - input_start), decoded)
+            output[:] = decoded[start - output_start:start - output_start + len(output)]
+        return output
 
 
 def set_data_stream(name, header):
@@ -220,11 +678,12 @@ def set_data_stream(name, header):
 
 class AmiraDataStream(ListBlock):
     """"""
-    __slots__ = ('_stream_data', '_header')
+    __slots__ = ('_stream_data', '_header', '_data')
 
     def __init__(self, name, header):
         self._header = header  # contains metadata for extracting streams
         self._stream_data = None
+        self._data = None  # decoded data; only set on first access of the data property
         super(AmiraDataStream, self).__init__(name)
 
     @property
@@ -232,6 +691,40 @@ class AmiraDataStream(ListBlock):
         """Reports whether data streams are loaded or not"""
         return self._header.load_streams
 
+    @property
+    def data(self):
+        """The decoded stream data
+
+        The stream is located, read and decoded on first access only; thereafter the decoded data is reused
+        until :py:meth:`unload` is called.
+        """
+        if self._data is None:
+            self._data = self._read_data()
+        return self._data
+
+    def _read_data(self):
+        """Read (unless already read) and decode the stream data"""
+        if self._stream_data is None:
+            self.read()
+        return self.get_data()
+
+    @property
+    def is_loaded(self):
+        """Whether the stream data has been decoded"""
+        return self._data is not None
+
+    def unload(self):
+        """Release the memory held by the raw and decoded stream data"""
+        self._data = None
+        self._stream_data = None
+
+    def _attr_items(self):
+        """Decoded data is displayed as the ``data`` attribute once it has been decoded; never decodes the stream"""
+        items = super(AmiraDataStream, self)._attr_items()
+        if self._data is not None:
+            items.append(('data', self.data))
+        return items
+
     def get_data(self):
         """Decode and return the stream data in this stream"""
         try:
@@ -243,42 +736,214 @@ class AmiraDataStream(ListBlock):
 
 class AmiraMeshDataStream(AmiraDataStream):
     """Class that defines an AmiraMesh data stream"""
+    __slots__ = ('_index',)
+
+    def __init__(self, name, header):
+        self._index = None  # random-access index into compressed streams; survives unload()
+        super(AmiraMeshDataStream, self).__init__(name, header)
+
+    @property
+    def checkpoint_index(self):
+        """The random-access checkpoint index of a compressed binary stream (``None`` for other streams)
+
+        The index of an HxByteRLE stream is built by a pass over the control bytes of the stream on first access.
+        """
+        if self._index is None and self._header.format == 'BINARY':
+            if self.format == 'HxZip':
+                self._index = HxZipIndex()
+            elif self.format == 'HxByteRLE':
+                offset, length = self._header.data_stream_offsets[int(self.data_index)]
+                self._index = HxByteRLEIndex(
+                    np.memmap(self._header.filename, dtype=np.uint8, mode='r', offset=offset, shape=(length,)))
+        return self._index
+
+    @property
+    def stream_size(self):
+        """The number of bytes this data stream occupies in the file or ``None`` if it can only be found by scanning"""
+        if self._header.format != 'BINARY':
+            return None
+        if self.format is not None:
+            # compressed streams declare their byte count in the header
+            return self.data_length
+        if self.shape is None or self.type not in _type_map[True]:
+            return None
+        return int(np.prod(np.array(self.shape))) * self.dimension * _type_map[True][self.type].itemsize
 
     def read(self):
         """Extract the data streams from the AmiraMesh file"""
-        with open(self._header.filename, 'rb') as f:
-            # rewind the file pointer to the end of the header
-            f.seek(len(self._header))
-            start = int(self.data_index)  # this data streams index
-            end = start + 1
-            if self._header.data_stream_count == start:  # this is the last stream
-                data = f.read()
-                _regex = ".*?\n@{}\n(?P<stream>.*)\n".format(start).encode('ASCII')
-                regex = re.compile(_regex, re.S)
-                match = regex.match(data)
-                _stream_data = match.group('stream')
-                self._stream_data = _stream_data[:-1] if _stream_data[-1] == 10 else _stream_data
+        offset, length = self._header.data_stream_offsets[int(self.data_index)]
+        if self._header.mmap and self._header.format == 'BINARY' and self.format is None:
+            # uncompressed binary streams are mapped instead of being read into memory
+            self._stream_data = np.memmap(self._header.filename, dtype=np.uint8, mode='r', offset=offset,
+                                          shape=(length,))
+        else:
+            with open(self._header.filename, 'rb') as f:
+                f.seek(offset)
+                self._stream_data = f.read(length)
+
+    @property
+    def lattice_shape(self):
+        """The shape of the lattice as a tuple ordered ``(..., z, y, x)`` i.e. slowest changing index first"""
+        if isinstance(self.shape, tuple):
+            return self.shape
+        elif isinstance(self.shape, int):
+            return (self.shape,)
+        raise ValueError("data stream '{}' has no lattice shape".format(self.name))
+
+    def _region_index(self, x=None, y=None, z=None):
+        """Convert the x, y, z region arguments into an index over the lattice axes"""
+        shape = self.lattice_shape
+        index = [slice(None)] * len(shape)
+        for axis, value in ((1, x), (2, y), (3, z)):
+            if value is None:
+                continue
+            if axis > len(shape):
+                raise ValueError("lattice of shape {} has no '{}' axis".format(shape, 'xyz'[axis - 1]))
+            if isinstance(value, (int, np.integer)):
+                n = shape[-axis]
+                if not -n <= value < n:
+                    raise IndexError("index {} is out of bounds for '{}' axis of size {}".format(
+                        value, 'xyz'[axis - 1], n))
+                value = int(value) % n
+            elif not isinstance(value, slice):
+                raise TypeError("region arguments must be int or slice not {}".format(type(value)))
+            index[-axis] = value
+        return tuple(index)
+
+    def read_region(self, x=None, y=None, z=None):
+        """Read a sub-volume (slab or region of interest) of a lattice data stream
+
+        For uncompressed binary streams only the bytes covering the region are read from the file.
+        For HxZip and HxByteRLE streams only the slices covering the region are decoded, starting from the
+        nearest checkpoint of the stream's :py:attr:`checkpoint_index`. Other streams are decoded in full (once,
+        see :py:attr:`data`) and then sliced.
+
+        .. code:: python
+
+            slab = af.data_streams.Data.read_region(z=slice(100, 140))
+
+        :param x: ``int`` or ``slice`` along the fastest changing lattice axis
+        :param y: ``int`` or ``slice`` along the second lattice axis
+        :param z: ``int`` or ``slice`` along the third lattice axis
+        :return np.ndarray region: array indexed as ``[z, y, x]`` (with a trailing axis when ``dimension > 1``)
+        """
+        index = self._region_index(x=x, y=y, z=z)
+        if self._data is None and self._header.format == 'BINARY':
+            if self.format is None and not self._header.mmap:
+                return self._read_raw_region(index)
+            elif self.format in ('HxZip', 'HxByteRLE'):
+                return self._read_compressed_region(index)
+        return self.data[index]
+
+    def _read_compressed_region(self, index):
+        """Decode only the slices (along the slowest changing axis) which cover the region"""
+        shape = self.lattice_shape
+        dtype = _type_map[self._header.endian == 'LITTLE'][self.type]
+        # the range of slices and the selection within it
+        if isinstance(index[0], slice):
+            start, stop, step = index[0].indices(shape[0])
+            indices = xrange(start, stop, step)
+            if len(indices) == 0:
+                lo = hi = 0
+                selection = slice(0, 0)
             else:
-                data = f.read()
-                _regex = ".*?\n@{}\n(?P<stream>.*)\n@{}\n".format(start, end).encode('ASCII')
-                regex = re.compile(_regex, re.S)
-                match = regex.match(data)
-                self._stream_data = match.group('stream')
+                lo, hi = min(indices[0], indices[-1]), max(indices[0], indices[-1]) + 1
+                selection = slice(start - lo, stop - lo if stop - lo >= 0 else None, step)
+        else:
+            lo, hi = index[0], index[0] + 1
+            selection = 0
+        slice_size = int(np.prod(shape[1:])) * self.dimension * dtype.itemsize
+        output = np.empty((hi - lo) * slice_size, dtype=np.uint8)
+        if hi > lo:
+            offset, length = self._header.data_stream_offsets[int(self.data_index)]
+            with open(self._header.filename, 'rb') as f:
+                if self.format == 'HxZip':
+                    self.checkpoint_index.inflate(f, offset, length, output, start=lo * slice_size)
+                else:
+                    self.checkpoint_index.decode(f, offset, output, start=lo * slice_size)
+        region = output.view(dtype).reshape(((hi - lo),) + self.data_shape[1:])
+        return region[(selection,) + index[1:]]
+
+    def _read_raw_region(self, index):
+        """Read only the bytes covering the region from an uncompressed binary stream"""
+        shape = self.lattice_shape
+        dtype = _type_map[self._header.endian == 'LITTLE'][self.type]
+        item_size = dtype.itemsize * self.dimension
+        # the bounding box of the region and the selection within it
+        bounds = list()
+        selections = list()
+        for n, i in zip(shape, index):
+            if isinstance(i, slice):
+                start, stop, step = i.indices(n)
+                indices = xrange(start, stop, step)
+                if len(indices) == 0:
+                    bounds.append((0, 0))
+                    selections.append(None)
+                    continue
+                lo = min(indices[0], indices[-1])
+                bounds.append((lo, max(indices[0], indices[-1]) + 1))
+                selections.append(None if step == 1 else np.arange(start, stop, step) - lo)
+            else:
+                bounds.append((i, i + 1))
+                selections.append(0)
+        extent = tuple(hi - lo for lo, hi in bounds)
+        out_shape = extent + ((self.dimension,) if self.dimension > 1 else tuple())
+        if 0 in extent:
+            region = np.empty(out_shape, dtype=dtype)
+        else:
+            # byte strides of each lattice axis
+            strides = [item_size] * len(shape)
+            for axis in range(len(shape) - 2, -1, -1):
+                strides[axis] = strides[axis + 1] * shape[axis + 1]
+            # the innermost run of axes which can be read in one go
+            inner = len(shape) - 1
+            while inner > 0 and extent[inner] == shape[inner]:
+                inner -= 1
+            chunk = extent[inner] * strides[inner]
+            offset, length = self._header.data_stream_offsets[int(self.data_index)]
+            buffer_ = np.empty(int(np.prod(extent)) * item_size, dtype=np.uint8)
+            view = memoryview(buffer_)
+            position = 0
+            with open(self._header.filename, 'rb') as f:
+                for outer in itertools.product(*[xrange(lo, hi) for lo, hi in bounds[:inner]]):
+                    start = offset + bounds[inner][0] * strides[inner]
+                    for axis, i in enumerate(outer):
+                        start += i * strides[axis]
+                    f.seek(start)
+                    if f.readinto(view[position:position + chunk]) != chunk:
+                        raise ValueError("data stream '{}' is truncated".format(self.name))
+                    position += chunk
+            region = buffer_.view(dtype).reshape(out_shape)
+        # apply steps and integer indices from the last axis so that dropped axes do not shift the others
+        for axis in range(len(shape) - 1, -1, -1):
+            if selections[axis] is not None:
+                region = np.take(region, selections[axis], axis=axis)
+        return region
+
+    @property
+    def data_shape(self):
+        """The shape of the decoded data i.e. the lattice shape with a trailing axis if ``dimension > 1``"""
+        # take into account shape and dimension
+        if self.dimension > 1:
+            return self.lattice_shape + (self.dimension,)
+        return self.lattice_shape
+
+    def _read_data(self):
+        """Compressed binary HxZip streams are inflated straight from the file into the output array"""
+        if self._stream_data is None and self._header.format == 'BINARY' and self.format == 'HxZip':
+            dtype = _type_map[self._header.endian == 'LITTLE'][self.type]
+            output = np.empty(int(np.prod(self.data_shape)) * dtype.itemsize, dtype=np.uint8)
+            offset, length = self._header.data_stream_offsets[int(self.data_index)]
+            with open(self._header.filename, 'rb') as f:
+                # the checkpoint index is built on the way
+                self.checkpoint_index.inflate(f, offset, length, output)
+            return output.view(dtype).reshape(*self.data_shape)
+        return super(AmiraMeshDataStream, self)._read_data()
 
     def _decode(self, data):
         """Performs data stream decoding by introspecting the header information"""
         # determine the new output shape
-        # take into account shape and dimension
-        if isinstance(self.shape, tuple):
-            if self.dimension > 1:
-                new_shape = tuple(list(self.shape) + [self.dimension])
-            else:
-                new_shape = (self.shape, )
-        elif isinstance(self.shape, int):
-            if self.dimension > 1:
-                new_shape = tuple([self.shape, self.dimension])
-            else:
-                new_shape = (self.shape, )
+        new_shape = self.data_shape
         # first we handle binary files
         # NOTE ON HOW LATTICES ARE STORED
         # AmiraMesh files state the dimensions of the lattice as nx, ny, nz
@@ -291,149 +956,312 @@ class AmiraMeshDataStream(AmiraDataStream):
             # _type_map[endianness] uses endianness = True for endian == 'LITTLE'
             is_little_endian = self._header.endian == 'LITTLE'
             if self.format is None:
+                if isinstance(data, np.memmap):
+                    # zero-copy: reinterpret the mapped bytes
+                    return data.view(_type_map[is_little_endian][self.type]).reshape(*new_shape)
                 return np.frombuffer(
                     data,
                     dtype=_type_map[is_little_endian][self.type]
                 ).reshape(*new_shape)
             elif self.format == 'HxZip':
-                return np.frombuffer(
-                    zlib.decompress(data),
-                    dtype=_type_map[is_little_endian][self.type]
-                ).reshape(*new_shape)
+                dtype = _type_map[is_little_endian][self.type]
+                output = np.empty(int(np.prod(new_shape)) * dtype.itemsize, dtype=np.uint8)
+                hxzip_decode_into(_iter_buffer_chunks(data), output)
+                return output.view(dtype).reshape(*new_shape)
             elif self.format == 'HxByteRLE':
-                size = int(np.prod(np.array(self.shape)))
-                return hxbyterle_decode(
-                    data,
-                    size
-                ).reshape(*new_shape)
+                output = np.empty(int(np.prod(np.array(self.shape))), dtype=np.uint8)
+                hxbyterle_decode_into(data, output)
+                return output.reshape(*new_shape)
             else:
                 raise ValueError('unknown data stream format: \'{}\''.format(self.format))
         # explicit instead of assumption
         elif self._header.format == 'ASCII':
-            return np.fromstring(
-                data,
-                dtype=_type_map[self.type],
-                sep="\n \t"
-            ).reshape(*new_shape)
+            return ascii_decode(data, _type_map[self.type], int(np.prod(new_shape))).reshape(*new_shape)
         else:
             raise ValueError("unknown file format: {}".format(self._header.format))
 
 
+# HxSurface scanner: whitespace, keyword lines and runs of ASCII numbers
+_hxsurface_space = re.compile(b'[ \t\r\n]*')
+_hxsurface_key = re.compile(b'(?P<key>[A-Za-z]\\w*)(?:[ \t]+(?P<value>[^\r\n]*?))?[ \t\r]*(?:\n|$)')
+_hxsurface_ascii_numbers = re.compile(
+    b'(?:[ \t]*(?:[-+.0-9][-+.0-9eE]*(?:[ \t]+[-+.0-9][-+.0-9eE]*)*)?[ \t\r]*\n)*'
+    b'(?:[ \t]*[-+.0-9][-+.0-9eE]*(?:[ \t]+[-+.0-9][-+.0-9eE]*)*[ \t\r]*$)?'
+)
+
+# number of bytes per item of the binary HxSurface payloads: three floats per vertex and three ints per triangle
+_hxsurface_item_size = {'Vertices': 12, 'Triangles': 12}
+
+
+class _HxSurfaceScanner(object):
+    """Walk the body of an HxSurface file once keeping a position into a single buffer"""
+
+    def __init__(self, data, binary):
+        self.data = data
+        self.binary = binary
+        self.pos = 0
+
+    def skip_space(self):
+        self.pos = _hxsurface_space.match(self.data, self.pos).end()
+
+    def peek(self, char):
+        """Skip whitespace and report whether the next byte is ``char``"""
+        self.skip_space()
+        return self.data[self.pos:self.pos + 1] == char
+
+    def expect(self, char):
+        if not self.peek(char):
+            raise ValueError("expected '{}' at byte {} of HxSurface data".format(char.decode('ASCII'), self.pos))
+        self.pos += 1
+
+    def key(self):
+        """Read a keyword line such as ``Triangles 648``
+
+        :return tuple key: the keyword and its value (``None`` if absent) as strings
+        """
+        self.skip_space()
+        m = _hxsurface_key.match(self.data, self.pos)
+        if m is None:
+            raise ValueError("expected a keyword at byte {} of HxSurface data".format(self.pos))
+        self.pos = m.end()
+        value = m.group('value')
+        return m.group('key').decode('utf-8'), None if value is None else value.decode('utf-8')
+
+    def payload(self, key, count):
+        """Skip over the payload of ``count`` items following a keyword line
+
+        :return tuple range: the start and end offsets of the payload
+        """
+        start = self.pos
+        if self.binary:
+            if count == 0:
+                return start, start
+            if key not in _hxsurface_item_size:
+                raise ValueError("unsupported binary HxSurface section: {} {}".format(key, count))
+            end = start + count * _hxsurface_item_size[key]
+            if end > len(self.data):
+                raise ValueError("HxSurface data is truncated in section '{}'".format(key))
+        else:
+            end = _hxsurface_ascii_numbers.match(self.data, start).end()
+        self.pos = end
+        return start, end
+
+    def skip_blocks(self, count):
+        """Skip ``count`` ``{ ... }`` blocks of keyword lines and payloads"""
+        for _ in range(count):
+            self.expect(b'{')
+            while not self.peek(b'}'):
+                key, value = self.key()
+                self.payload(key, _hxsurface_int(value))
+            self.pos += 1
+
+    def patch(self):
+        """Scan a single ``{ ... }`` patch
+
+        :return OrderedDict patch: the attributes of the patch; ``Triangles`` is the tuple ``(count, range)``
+        """
+        patch = collections.OrderedDict()
+        self.expect(b'{')
+        while not self.peek(b'}'):
+            key, value = self.key()
+            if key in ('InnerRegion', 'OuterRegion'):
+                patch[key] = value
+                continue
+            count = _hxsurface_int(value)
+            stream_range = self.payload(key, count)
+            if key == 'Triangles':
+                patch[key] = (count, stream_range)
+            else:
+                patch[key] = count
+        self.pos += 1
+        if 'Triangles' not in patch:
+            raise ValueError("HxSurface patch ending at byte {} has no triangles".format(self.pos))
+        return patch
+
+
+def _hxsurface_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError("expected a count in HxSurface data instead of {!r}".format(value))
+
+
+def scan_hxsurface(data, binary=True):
+    """Scan the body (the bytes following the header) of an HxSurface file in a single pass
+
+    Binary payloads are skipped using the item counts; ASCII payloads are skipped as runs of numbers. No part
+    of ``data`` is copied: only the offsets of the vertex and triangle payloads are recorded.
+
+    :param data: the body of the HxSurface file (any buffer)
+    :param bool binary: whether the payloads are binary (default) or ASCII
+    :return OrderedDict surface: ``Vertices`` as the tuple ``(count, (start, end))``, the counts of
+        ``NBranchingPoints``, ``NVerticesOnCurves`` and ``BoundaryCurves`` and ``Patches`` as a list of
+        patches (see :py:meth:`_HxSurfaceScanner.patch`)
+    """
+    scanner = _HxSurfaceScanner(data, binary)
+    surface = collections.OrderedDict()
+    while 'Patches' not in surface:
+        key, value = scanner.key()
+        count = _hxsurface_int(value)
+        if key == 'Vertices':
+            surface[key] = (count, scanner.payload(key, count))
+        elif key in ('NBranchingPoints', 'NVerticesOnCurves'):
+            surface[key] = count
+            scanner.payload(key, count)
+        elif key == 'BoundaryCurves':
+            surface[key] = count
+            if binary and count:
+                raise ValueError("unsupported binary HxSurface section: {} {}".format(key, count))
+            scanner.skip_blocks(count)
+        elif key == 'Patches':
+            surface[key] = [scanner.patch() for _ in range(count)]
+        else:
+            raise ValueError("unexpected section in HxSurface data: {}".format(key))
+    if 'Vertices' not in surface:
+        raise ValueError("HxSurface data has no vertices")
+    # any further sections (e.g. Surfaces) are not read
+    return surface
+
+
 class AmiraHxSurfaceDataStream(AmiraDataStream):
     """Class that defines an Amira HxSurface data stream"""
 
     def read(self):
-        """Extract the data streams from the HxSurface file"""
-        with open(self._header.filename, 'rb') as f:
-            # rewind the file pointer to the end of the header
-            f.seek(len(self._header))
-            data = f.read()
-            # get the vertex count and streams
-            _vertices_regex = r".*?\n" \
-                              r"Vertices (?P<vertex_count>\d+)\n" \
-                              r"(?P<streams>.*)".encode('ASCII')
-            vertices_regex = re.compile(_vertices_regex, re.S)
-            match_vertices = vertices_regex.match(data)
-            # todo: fix for full.surf and simple.surf
-            # print(f"streams: {match_vertices.group('streams')}")
-            vertex_count = int(match_vertices.group('vertex_count'))
-            # get the patches
-            # fixme: general case for NBranchingPoints, NVerticesOnCurves, BoundaryCurves being non-zero
-            stream_regex = r"(?P<vertices>.*?)\n" \
-                           r"NBranchingPoints (?P<branching_point_count>\d+)\n" \
-                           r"NVerticesOnCurves (?P<vertices_on_curves_count>\d+)\n" \
-                           r"BoundaryCurves (?P<boundary_curve_count>\d+)\n" \
-                           r"Patches (?P<patch_count>\d+)\n" \
-                           r"(?P<patches>.*)".encode('ASCII')
-            match_streams = re.match(stream_regex, match_vertices.group('streams'), re.S)
-            # instatiate the vertex block
-            vertices_block = AmiraHxSurfaceDataStream('Vertices', self._header)
-            # set the data for this stream
-            vertices_block._stream_data = match_streams.group('vertices')
-            # length, type and dimension are needed for decoding
-            vertices_block.add_attr('length', vertex_count)
-            vertices_block.add_attr('type', 'float')
-            vertices_block.add_attr('dimension', 3)
-            vertices_block.add_attr('data', vertices_block.get_data())
-            vertices_block.add_attr('NBranchingPoints', 0)
-            vertices_block.add_attr('NVerticesOnCurves', 0)
-            vertices_block.add_attr('BoundaryCurves', 0)
-            # instantiate the patches block
-            patches_block = AmiraHxSurfaceDataStream('Patches', self._header)
-            patch_count = int(match_streams.group('patch_count'))
-            patches_block.add_attr('length', patch_count)
-            # get the triangles and contents of each patch
-            # fixme: general case for BoundaryID, BranchingPoints being non-zero
-            #  i've not seen an example with loaded fields
-            # todo: consider compiling regular expressions
-            # NOTE:
-            # There is a subtlety with this regex:
-            # It might be the case that the last part matches bytes that end in '\n[}]\n'
-            # that are not the end of the stream. The only way to remede this is to include the
-            # extra brace [{] so that it now matches '\n[}]\n[{]', which is more likely to
-            # correspond to the end of the patch. However this introduces a problem:
-            # we will not be able to match the last patch unless we also add [{] to the stream to match.
-            # This also means that start_from argument will be wrong given that it will have past
-            # the starting point of the next patch. This is trivial to solve because we simply
-            # backtrack start_from by 1.
-            # These are noted in NOTE A and NOTE B below.
-            _patch_regex = r"[{]\n" \
-                           r"InnerRegion (?P<patch_inner_region>.*?)\n" \
-                           r"OuterRegion (?P<patch_outer_region>.*?)\n" \
-                           r"BoundaryID (?P<patch_boundary_id>\d+)\n" \
-                           r"BranchingPoints (?P<patch_branching_points>\d+)\n" \
-                           r"\s+\n" \
-                           r"Triangles (?P<triangle_count>.*?)\n" \
-                           r"(?P<triangles>.*?)\n" \
-                           r"[}]\n[{]".encode('ASCII')
-            patch_regex = re.compile(_patch_regex, re.S)
-            # start from the beginning
-            start_from = 0
-            for p_id in range(patch_count):
-                # NOTE A
-                match_patch = patch_regex.match(match_streams.group('patches') + b'{', start_from)
-                patch_block = AmiraHxSurfaceDataStream('Patch', self._header)
-                patch_block.add_attr('InnerRegion', match_patch.group('patch_inner_region').decode('utf-8'))
-                patch_block.add_attr('OuterRegion', match_patch.group('patch_outer_region').decode('utf-8'))
-                patch_block.add_attr('BoundaryID', int(match_patch.group('patch_boundary_id')))
-                patch_block.add_attr('BranchingPoints', int(match_patch.group('patch_branching_points')))
-                # let's now add the triangles from the patch
-                triangles_block = AmiraHxSurfaceDataStream('Triangles', self._header)
-                # set the raw data stream
-                triangles_block._stream_data = match_patch.group('triangles')
-                # decoding needs to have the length, type, and dimension
-                triangles_block.add_attr('length', int(match_patch.group('triangle_count')))
-                triangles_block.add_attr('type', 'int')
-                triangles_block.add_attr('dimension', 3)
-                # print('debug:', int(match_patch.group('triangle_count')), len(match_patch.group('triangles')))
-                # print('debug:', match_patch.group('triangles')[:20])
-                # print('debug:', match_patch.group('triangles')[-20:])
-                triangles_block.add_attr('data', triangles_block.get_data())
-                # now we can add the triangles block to the patch...
-                patch_block.add_attr(triangles_block)
-                # then we collate the patches
-                patches_block.append(patch_block)
-                # the next patch begins where the last patch ended
-                # NOTE B
-                start_from = match_patch.end() - 1  # backtrack by 1
-            # add the patches to the vertices
-            vertices_block.add_attr(patches_block)
-            # add the vertices to the data stream
-            self.add_attr(vertices_block)
+        """Extract the data streams from the HxSurface file
+
+        The body of the file is scanned once (see :py:func:`scan_hxsurface`) and the raw data of the ``Vertices``
+        and ``Triangles`` streams are views into a single buffer. The body of a binary file is memory-mapped so
+        that only the pages holding the keyword lines are read; vertices and triangles are only read (and
+        decoded into read-only ``np.frombuffer`` views of the mapping) when their ``data`` is first accessed.
+        """
+        if self._header.format == 'BINARY':
+            data = np.memmap(self._header.filename, dtype=np.uint8, mode='r', offset=len(self._header))
+        else:
+            with open(self._header.filename, 'rb') as f:
+                # rewind the file pointer to the end of the header
+                f.seek(len(self._header))
+                data = f.read()
+        view = memoryview(data)
+        surface = scan_hxsurface(view, binary=self._header.format == 'BINARY')
+        # instatiate the vertex block
+        vertices_block = AmiraHxSurfaceDataStream('Vertices', self._header)
+        vertex_count, (start, end) = surface['Vertices']
+        vertices_block._stream_data = view[start:end]
+        # length, type and dimension are needed for decoding
+        vertices_block.add_attr('length', vertex_count)
+        vertices_block.add_attr('type', 'float')
+        vertices_block.add_attr('dimension', 3)
+        vertices_block.add_attr('NBranchingPoints', surface.get('NBranchingPoints', 0))
+        vertices_block.add_attr('NVerticesOnCurves', surface.get('NVerticesOnCurves', 0))
+        vertices_block.add_attr('BoundaryCurves', surface.get('BoundaryCurves', 0))
+        # instantiate the patches block
+        patches_block = AmiraHxSurfacePatches('Patches', self._header)
+        patches_block.add_attr('length', len(surface['Patches']))
+        for patch in surface['Patches']:
+            patch_block = AmiraHxSurfaceDataStream('Patch', self._header)
+            for key, value in _dict_iter_items(patch):
+                if key == 'Triangles':
+                    continue
+                patch_block.add_attr(key, value)
+            # the triangles of the patch
+            triangle_count, (start, end) = patch['Triangles']
+            triangles_block = AmiraHxSurfaceDataStream('Triangles', self._header)
+            # set the raw data stream
+            triangles_block._stream_data = view[start:end]
+            # decoding needs to have the length, type, and dimension
+            triangles_block.add_attr('length', triangle_count)
+            triangles_block.add_attr('type', 'int')
+            triangles_block.add_attr('dimension', 3)
+            # now we can add the triangles block to the patch...
+            patch_block.add_attr(triangles_block)
+            # then we collate the patches
+            patches_block.append(patch_block)
+        # add the patches to the vertices
+        vertices_block.add_attr(patches_block)
+        # add the vertices to the data stream
+        self.add_attr(vertices_block)
+
+    @property
+    def data(self):
+        """The decoded data of the ``Vertices`` and ``Triangles`` streams; container blocks have no data"""
+        if self._stream_data is None:
+            raise AttributeError("'{}' has no data stream".format(self.name))
+        return super(AmiraHxSurfaceDataStream, self).data
+
+    def unload(self):
+        """Release the decoded stream data
+
+        The raw bytes are kept because HxSurface streams can only be re-read together with the whole surface.
+        """
+        self._data = None
+
+    def _attr_items(self):
+        if self._stream_data is None:
+            # skip the data attribute for container blocks
+            return super(AmiraDataStream, self)._attr_items()
+        return super(AmiraHxSurfaceDataStream, self)._attr_items()
+
+    @property
+    def dtype(self):
+        """The type of the decoded data"""
+        if self._header.format == 'BINARY':
+            return _type_map[self._header.endian == 'LITTLE'][self.type]
+        return _type_map[self.type]
 
     def _decode(self, data):
-        is_little_endian = self._header.endian == 'LITTLE'
         if self._header.format == 'BINARY':
-            return np.frombuffer(
-                data,
-                dtype=_type_map[is_little_endian][self.type]
-            ).reshape(self.length, self.dimension)
+            return np.frombuffer(data, dtype=self.dtype).reshape(self.length, self.dimension)
         elif self._header.format == 'ASCII':
-            return np.fromstring(
-                data,
-                dtype=_type_map[self.type],
-                sep="\n \t"
-            ).reshape(self.length, self.dimension)
+            return ascii_decode(data, self.dtype, self.length * self.dimension).reshape(self.length, self.dimension)
+
+    def _decode_into(self, data, output):
+        """Decode the stream data into the preallocated ``(length, dimension)`` array ``output``"""
+        if self._header.format == 'BINARY':
+            output[...] = self._decode(data)
+        else:
+            ascii_decode_into(data, output)
+        return output
+
+
+class AmiraHxSurfacePatches(AmiraHxSurfaceDataStream):
+    """The ``Patches`` of an HxSurface with optional consolidated (CSR-style) triangles
+
+    The triangles of all patches may be decoded into a single ``(T, 3)`` array (see :py:attr:`triangles`) where
+    the triangles of patch ``i`` are ``triangles[patch_offsets[i]:patch_offsets[i + 1]]``. Once consolidated the
+    ``Triangles.data`` of every patch is a view into this array so all-patch operations are a single NumPy
+    call e.g. the patch of each triangle is ``np.repeat(np.arange(len(patches)), np.diff(patches.patch_offsets))``.
+    """
+
+    def __init__(self, name, header):
+        self._triangles = None
+        super(AmiraHxSurfacePatches, self).__init__(name, header)
+
+    @property
+    def patch_offsets(self):
+        """The offsets of the triangles of each patch in :py:attr:`triangles` (``len(self) + 1`` values)"""
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum([patch.Triangles.length for patch in self], out=offsets[1:])
+        return offsets
+
+    @property
+    def triangles(self):
+        """The triangles of all patches as one contiguous ``(T, 3)`` array; decoded on first access
+
+        Triangles of patches which have already been decoded are replaced by views into this array.
+        """
+        if self._triangles is None:
+            offsets = self.patch_offsets
+            dtype = self[0].Triangles.dtype if len(self) > 0 else np.dtype(np.int32)
+            triangles = np.empty((int(offsets[-1]), 3), dtype=dtype)
+            for patch, start, end in zip(self, offsets[:-1], offsets[1:]):
+                stream = patch.Triangles
+                if stream._data is not None:
+                    triangles[start:end] = stream._data
+                else:
+                    stream._decode_into(stream._stream_data, triangles[start:end])
+                stream._data = triangles[start:end]
+            self._triangles = triangles
+        return self._triangles
 
 
 @deprecated(
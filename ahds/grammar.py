@@ -9,9 +9,11 @@ we also define how `HxSurface` files are structured.
 
 This module also includes several helper functions that use the grammar resources:
 
+*   the `locate_header` function finds the end of the header in a single pass over the file and returns the raw header bytes together with the byte offset of the data section;
+
 *   the `get_header` function returns only the header up to the first data stream; data is returned as a decoded string (`UTF-8`);
 
-*   the `parse_header` function applies the grammar to return a nested set of Python primitives to be transformed into an `AmiraHeader` object;
+*   the `parse_header` function applies the fast tokenizer (see the `tokenizer` module) or the grammar to return a nested set of Python primitives to be transformed into an `AmiraHeader` object;
 
 *   the `get_parsed_data` function transparently applied both above functions given the Amira (R) filename
 
@@ -19,14 +21,18 @@ This module also includes several helper functions that use the grammar resource
 
 from __future__ import print_function
 
+import io
 import re
 import sys
+import threading
 
 # simpleparse
 from simpleparse.parser import Parser
+from simpleparse.stt.TextTools.TextTools import tag
 from simpleparse.common import numbers, strings
 from simpleparse.dispatchprocessor import DispatchProcessor, getString, dispatchList, dispatch, singleMap, multiMap
 
+from . import tokenizer
 from .core import _decode_string, _dict_iter_items, _dict_iter_keys
 from .proc import AmiraDispatchProcessor
 
@@ -220,13 +226,22 @@ def _swap_illegal_chars(byte_seq, seq_map):
     return swapped_byte_seq
 
 
-def get_header(fn, file_format, header_bytes=20000, verbose=True, *args, **kwargs):
-    """Apply rules for detecting the boundary of the header
-    
+# largest number of bytes read at a time while looking for the end of the header
+_max_header_chunk = 2 ** 24
+
+
+def locate_header(fn, file_format, header_bytes=20000, verbose=True, *args, **kwargs):
+    """Locate the end of the header i.e. the start of the data section
+
+    The file is read into a single growing ``bytearray`` buffer with ``readinto`` using chunks which double
+    in size (from ``header_bytes`` up to 16 MiB) so that even headers of several megabytes need only a few
+    reads. Each read only rescans the bytes which have not been scanned before (plus a small overlap for
+    delimiters spanning two reads). If no delimiter is found the whole file is the header.
+
     :param str fn: file name
     :param str file_format: either ``AmiraMesh`` or ``HyperSurface``
-    :param int header_bytes: number of bytes in which to search for the header [default: 20000]
-    :return str data: the header as per the ``file_format``
+    :param int header_bytes: number of bytes in which to search for the header first [default: 20000]
+    :return tuple header: the raw header bytes and the byte offset of the end of the header
     """
     assert header_bytes > 0
     try:
@@ -234,58 +249,109 @@ def get_header(fn, file_format, header_bytes=20000, verbose=True, *args, **kwarg
     except AssertionError:
         raise ValueError("unknown file format: {}".format(file_format))
 
-    with open(fn, 'rb') as f:
-        # read a first chunk and store it in the first element of the list of header chunks
-        _data = f.read(header_bytes if header_bytes >= _rescan_overlap else _rescan_overlap)
+    if file_format == "AmiraMesh" or file_format == "Avizo":
+        # the first @<n> data block start marker
+        delimiter = _stream_delimiters[0]
+    else:
+        # the first occurance of any of the keys of the above _hyper_surface_file structure
+        delimiter = _stream_delimiters[1]
+    if verbose:
+        print("Using pattern: {}".format(delimiter.pattern), file=sys.stderr)
+
+    chunk_size = max(header_bytes, _rescan_overlap)
+    buffer_ = bytearray(chunk_size)
+    size = 0  # number of bytes read into the buffer
+    scan_from = 0  # offset from which to rescan the buffer
+    with io.open(fn, 'rb') as f:
+        while True:
+            if size + chunk_size > len(buffer_):
+                # grow geometrically; a new buffer avoids resizing one which may still be exported
+                grown = bytearray(max(2 * len(buffer_), size + chunk_size))
+                grown[:size] = buffer_[:size]
+                buffer_ = grown
+            count = f.readinto(memoryview(buffer_)[size:size + chunk_size])
+            size += count
+            m = delimiter.search(buffer_, scan_from, size)
+            if m is not None:
+                return bytes(buffer_[:m.start()]), m.start()
+            if count == 0:
+                # end of file: there is no data section
+                return bytes(buffer_[:size]), size
+            scan_from = max(0, size - _rescan_overlap)
+            chunk_size = min(2 * chunk_size, _max_header_chunk)
 
-        data = _swap_illegal_chars(_data, SEQ_MAP)
 
-        if file_format == "AmiraMesh" or file_format == "Avizo":
-            if verbose:
-                print("Using pattern: {}".format(_stream_delimiters[0].pattern), file=sys.stderr)
-            # scan the latests chunk  for the first @<n> data block start marker
-            m = _stream_delimiters[0].search(data)
-            while m is None:
-                _chunklen = len(data) - _rescan_overlap
-                data += f.read(header_bytes)
-                m = _stream_delimiters[0].search(data, _chunklen)
-        elif file_format == "HyperSurface":
-            if verbose:
-                print("Using pattern: {}".format(_stream_delimiters[1].pattern), file=sys.stderr)
-            # scan the latests chunk for the the first occurance of any of the keys of the above
-            # _hyper_surface_file structure
-            m = _stream_delimiters[1].search(data)
-            while m is None:
-                _chunklen = len(data) - _rescan_overlap
-                data += f.read(header_bytes)
-                m = _stream_delimiters[1].search(data, _chunklen)
-        elif file_format == "Undefined":
-            raise ValueError("Unable to parse undefined file")
-    # cut the data before the delimter and encode the remaining byte string into ASCII
+def get_header(fn, file_format, header_bytes=20000, verbose=True, *args, **kwargs):
+    """Apply rules for detecting the boundary of the header
+    
+    :param str fn: file name
+    :param str file_format: either ``AmiraMesh`` or ``HyperSurface``
+    :param int header_bytes: number of bytes in which to search for the header [default: 20000]
+    :return str data: the header as per the ``file_format``
+    """
+    data, _ = locate_header(fn, file_format, header_bytes=header_bytes, verbose=verbose)
+    # replace illegal byte sequences and encode the remaining byte string into ASCII
     # string in case of python 2 and UTF-8 string for python3
-    return _decode_string(data[:m.start()])
+    return _decode_string(_swap_illegal_chars(data, SEQ_MAP))
 
 
-def parse_header(data, verbose=False, *args, **kwargs):
+# the compiled grammar shared by all calls to parse_header (see _get_parser)
+_parser = None
+_parser_lock = threading.Lock()
+
+
+def _get_parser():
+    """The compiled grammar as a ``(parser, processor, tag table)`` triple
+
+    Compiling the grammar takes longer than parsing a typical header so it is only done once per process, on
+    first use. Building tag tables mutates the ``Parser`` object so the tag table of the ``amira`` production
+    is also built once here under the lock; thereafter only the (immutable) tag table and the (stateless)
+    processor are used which makes parsing thread-safe.
+    """
+    global _parser
+    if _parser is None:
+        with _parser_lock:
+            if _parser is None:
+                parser = Parser(amira_header_grammar)
+                amira_processor = AmiraDispatchProcessor()
+                _parser = parser, amira_processor, parser.buildTagger('amira', amira_processor)
+    return _parser
+
+
+def parse_header(data, verbose=False, engine='auto', *args, **kwargs):
     """Parse the data using the grammar specified in this module
     
+    By default the header is first parsed by the fast tokenizer (:py:mod:`ahds.tokenizer`) which falls
+    back to the grammar for headers containing anything it does not understand.
+
     :param str data: delimited data to be parsed for metadata
+    :param str engine: ``auto`` (default), ``tokenizer`` or ``grammar``
     :return list parsed_data: structured metadata 
     """
-    # the parser
-    if verbose:
-        print("Creating parser object...", file=sys.stderr)
-    parser = Parser(amira_header_grammar)
+    try:
+        assert engine in ['auto', 'tokenizer', 'grammar']
+    except AssertionError:
+        raise ValueError("unknown header parsing engine: {}".format(engine))
+    if engine != 'grammar':
+        if verbose:
+            print("Tokenizing data...", file=sys.stderr)
+        try:
+            return tokenizer.parse_header(data)
+        except tokenizer.UnsupportedHeader as e:
+            if engine == 'tokenizer':
+                raise
+            if verbose:
+                print("Falling back to grammar: {}".format(e), file=sys.stderr)
 
-    # the processor
+    # the parser and processor are only created on the first call
     if verbose:
-        print("Defining dispatch processor...", file=sys.stderr)
-    amira_processor = AmiraDispatchProcessor()
+        print("Getting parser object...", file=sys.stderr)
+    parser, amira_processor, tag_table = _get_parser()
 
-    # parsing
+    # parsing; equivalent to parser.parse(data, production='amira', processor=amira_processor)
     if verbose:
         print("Parsing data...", file=sys.stderr)
-    success, parsed_data, next_item = parser.parse(data, production='amira', processor=amira_processor)
+    success, parsed_data, next_item = amira_processor(tag(data, tag_table, 0, len(data)), data)
 
     if success:
         if verbose:
@@ -302,6 +368,8 @@ def get_parsed_data(fn, *args, **kwargs):
     :return tuple(list,int) parsed_data,header_length: structured metadata and total number of header bytes
     """
     file_format = detect_format(fn, *args, **kwargs)
-    data = get_header(fn, file_format, *args, **kwargs)
+    raw_data, header_length = locate_header(fn, file_format, *args, **kwargs)
+    data = _decode_string(_swap_illegal_chars(raw_data, SEQ_MAP))
     parsed_data = parse_header(data, *args, **kwargs)
-    return data, parsed_data, len(data), file_format
+    # the byte offset of the data section which differs from len(data) if any bytes were swapped or decoded
+    return data, parsed_data, header_length, file_format
@@ -121,8 +121,9 @@ from __future__ import print_function
 import sys
 import numpy
 
+from .cache import load_sidecar, save_sidecar
 from .core import Block, deprecated, ListBlock
-from .data_stream import set_data_stream
+from .data_stream import set_data_stream, locate_data_streams
 from .grammar import get_parsed_data
 
 
@@ -134,14 +135,38 @@ class AmiraHeader(Block):
     # which will be stored inside the __dict__ attribute of the Block base class
     __slots__ = (
         '_fn', '_parsed_data', '_header_length', '_file_format', '_parameters', '_load_streams',
-        '_data_stream_count')
+        '_data_stream_count', '_data_stream_offsets', '_mmap')
 
     # fixme: load_streams should be False by default
     def __init__(self, fn, load_streams=True, *args, **kwargs):
-        """Construct an AmiraHeader object from parsed data"""
+        """Construct an AmiraHeader object from parsed data
+
+        Additional args/kwargs are passed on to :py:func:`ahds.grammar.get_parsed_data`; the following are
+        keyword-only:
+
+        :param str fn: Amira file name
+        :param bool load_streams: whether (default) or not to load data streams
+        :param bool mmap: whether or not (default) to memory-map uncompressed binary data streams
+        :param cache: ``True`` to cache the parsed header in a sidecar next to the file, the name of
+            a cache directory or ``None`` (default) for no caching
+        """
+        # keyword-only (Python2 compatible) so that positional args still go to get_parsed_data
+        mmap = kwargs.pop('mmap', False)
+        cache = kwargs.pop('cache', None)
         self._fn = fn
-        self._literal_data, self._parsed_data, self._header_length, self._file_format = get_parsed_data(fn, *args,
-                                                                                                        **kwargs)
+        self._mmap = mmap
+        # byte offsets and lengths of data streams; located on first use
+        self._data_stream_offsets = None
+        cached = load_sidecar(fn, cache) if cache else None
+        if cached is not None:
+            self._literal_data = cached['literal_data']
+            self._parsed_data = cached['parsed_data']
+            self._header_length = cached['header_length']
+            self._file_format = cached['file_format']
+            self._data_stream_offsets = cached['data_stream_offsets']
+        else:
+            self._literal_data, self._parsed_data, self._header_length, self._file_format = get_parsed_data(
+                fn, *args, **kwargs)
         # load the streams
         self._load_streams = load_streams
         # data stream count
@@ -149,6 +174,8 @@ class AmiraHeader(Block):
         super(AmiraHeader, self).__init__('header')
         # load the parse data into this object
         self._load()
+        if cache and cached is None:
+            self._save_sidecar(cache)
 
     @classmethod
     @deprecated("Now you can directly create a header from the file name as AmiraHeader('file.am')")
@@ -168,6 +195,11 @@ class AmiraHeader(Block):
     def parsed_data(self):
         return self._parsed_data
 
+    @property
+    def mmap(self):
+        """Whether uncompressed binary data streams are memory-mapped (``numpy.memmap``) rather than read"""
+        return self._mmap
+
     # todo: change this to streams_loaded
     @property
     def load_streams(self):
@@ -186,6 +218,31 @@ class AmiraHeader(Block):
     def data_stream_count(self):
         return self._data_stream_count
 
+    @property
+    def data_stream_offsets(self):
+        """A dictionary of ``(offset, length)`` byte ranges of each data stream keyed by stream index
+
+        The data section is scanned only once (on first access) and the result is reused by all streams.
+        """
+        if self._data_stream_offsets is None:
+            stream_sizes = dict()
+            for ds in self._data_streams_block_list:
+                stream_sizes[int(ds.data_index)] = ds.stream_size
+            self._data_stream_offsets = locate_data_streams(self._fn, len(self), stream_sizes)
+        return self._data_stream_offsets
+
+    def _save_sidecar(self, cache):
+        """Cache the parsed header together with the located data streams"""
+        data_stream_offsets = None
+        data_stream_formats = None
+        if self.filetype == "AmiraMesh":
+            data_stream_offsets = self.data_stream_offsets
+            data_stream_formats = dict()
+            for ds in self._data_streams_block_list:
+                data_stream_formats[int(ds.data_index)] = ds.format
+        save_sidecar(self._fn, cache, self._literal_data, self._parsed_data, self._header_length, self._file_format,
+                     data_stream_offsets=data_stream_offsets, data_stream_formats=data_stream_formats)
+
     def load(self):
         """Public loading method"""
         self._load()
@@ -213,13 +270,7 @@ class AmiraHeader(Block):
         else:
             # just create an empty parameters block to keep header consistent
             _parameters = Block('Parameters')
-        # if we have a Materials block in parameters we create a convenience dictionary for
-        # accessing materials e.g. for patches
-        if hasattr(_parameters, 'Materials'):
-            material_dict = dict()
-            for material in _parameters.Materials:
-                material_dict[material.name] = material
-            _parameters.Materials.material_dict = material_dict
+        # a Materials ListBlock maintains its own indexes of materials by name (material_dict) and Id (id_dict)
         super(AmiraHeader, self).add_attr('Parameters', _parameters)
         # load array declarations
         self._load_declarations(block_data['array_declarations'])
@@ -373,6 +424,7 @@ class AmiraHeader(Block):
             else:
                 block.add_attr('shape', _shape)
             block.add_attr('format', defn.get('data_format', None))
+            block.add_attr('data_length', defn.get('data_length', None))
             # insert this definition as an attribute
             # parent.add_attr(block)
             # keep track of data streams
@@ -34,6 +34,26 @@ _strip_material_name = re.compile(r'^\s*"\s*|\s*",*$')
 from simpleparse.dispatchprocessor import DispatchProcessor, getString, dispatchList, singleMap
 
 
+def materials_from_parameter_lists(parameter_lists):
+    """Convert the parameter lists of a dedicated Materials section into a list of named materials"""
+    # currently gramma handles dedicated materials section as additional
+    # parameters section starting with Materials instead of Parameters.
+    # rewrite it to materials struture to ensure they do not overwrite
+    # the preceeding parameters section
+    return [
+        {
+            'parameter_name': _strip_material_name.sub('', _item[_id]['parameter_value']),
+            'parameter_value': _item[:_id] + _item[_id + 1:]
+        }
+        for _item, _id in (
+            (
+                _item,
+                [_index for _index, _val in enumerate(_item) if _val['parameter_name'] in ['name', 'Name']][0]
+            ) for _item in parameter_lists
+        )
+    ]
+
+
 class AmiraDispatchProcessor(DispatchProcessor):
     """Class defining methods to handle each token specified in the grammar"""
 
@@ -104,24 +124,7 @@ class AmiraDispatchProcessor(DispatchProcessor):
     def materials(self, value, buffer_):  # @UnusedVariable
         # value = (tag, left, right, taglist)
         _av = dispatchList(self, value[3], buffer_)
-        # currently gramma handles dedicated materials section as additional 
-        # parameters section starting with Materials instead of Parameters.
-        # rewrite it to materials struture to ensure they do not overwrite 
-        # the preceeding parameters section
-        return {
-            'materials': [
-                {
-                    'parameter_name': _strip_material_name.sub('', _item[_id]['parameter_value']),
-                    'parameter_value': _item[:_id] + _item[_id + 1:]
-                }
-                for _item, _id in (
-                    (
-                        _item,
-                        [_index for _index, _val in enumerate(_item) if _val['parameter_name'] in ['name', 'Name']][0]
-                    ) for _item in _av
-                )
-            ]
-        }
+        return {'materials': materials_from_parameter_lists(_av)}
 
     def parameter(self, value, buffer_):  # @UnusedVariable
         # value = (tag, left, right, taglist)
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+query
+=====
+
+Path expressions which select entities from trees of :py:class:`ahds.core.Block` objects.
+
+A path is a sequence of steps separated by dots; each step selects children of the entities selected by the
+previous step:
+
+*   ``Parameters`` - the attribute (or list item) with this name;
+
+*   ``*`` - all attributes followed by all list items; names may also contain the wildcards ``*`` and ``?``
+    e.g. ``*Box``;
+
+*   ``**`` - the entity itself and all its descendants;
+
+and may be followed by any number of filters in square brackets:
+
+*   ``[1]``, ``[-1]`` - the list item (or element of a sequence value) at this index;
+
+*   ``[*]`` - all list items (or elements of a sequence value);
+
+*   ``[Color]`` - only those of the selected blocks which have this attribute;
+
+*   ``[Id=2]``, ``[name!=Exterior]``, ``[Id>=3]`` - only those of the selected blocks whose attribute compares
+    as given to a number or (optionally quoted) string.
+
+For example, ``header.Parameters.Materials.*.Color`` selects the colour of every material,
+``header.Parameters.Materials.*[Id>=3]`` the materials with an Id of at least 3 and ``header.**.BoundingBox``
+the bounding box wherever it is defined.
+
+Paths are compiled once (and cached) into a :py:class:`PathQuery` which may then be applied to any number of
+trees. Matches are returned as flat :py:class:`Record` tuples whose ``path`` is the concrete path to the value
+e.g. ``header.Parameters.Materials[2].Color``; concrete paths are themselves valid path expressions.
+
+Usage:
+
+::
+
+    >>> from ahds.query import compile_path
+    >>> query = compile_path('header.Parameters.Materials.*[Id>1].Color')
+    >>> for record in query.records(af):
+    ...     print(record.path, record.value)
+
+"""
+from __future__ import print_function
+
+import collections
+import fnmatch
+import operator
+import re
+
+import numpy as np
+
+from .core import Block, ListBlock, _dict_iter_items
+
+Record = collections.namedtuple('Record', [
+    'query',  # the path expression which matched
+    'path',  # the concrete path to the value e.g. header.Parameters.Materials[2].Color
+    'value',  # the value; a Block or an attribute value
+])
+
+
+class PathSyntaxError(ValueError):
+    """Raised for invalid path expressions"""
+
+
+_missing = object()
+
+# path tokens
+_name = re.compile(r'[-A-Za-z0-9_:&*?]+')
+_index = re.compile(r'\[[ \t]*(?P<index>-?\d+|\*)[ \t]*\]')
+_predicate = re.compile(
+    r'\[[ \t]*(?P<key>[-A-Za-z0-9_:&]+)[ \t]*'
+    r'(?:(?P<op>==|=|!=|<=|>=|<|>)[ \t]*(?P<literal>"[^"]*"|\'[^\']*\'|[^\]]*?)[ \t]*)?\]'
+)
+_number = re.compile(r'-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$')
+_operators = {
+    '=': operator.eq,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+# sequence values which may be indexed; strings are not
+_sequence_types = (list, tuple, np.ndarray)
+
+# compiled queries by expression
+_cache = dict()
+_cache_size = 256
+
+
+def _lookup(node, name):
+    """The attribute or list item of ``node`` called ``name`` or ``_missing``"""
+    if isinstance(node, Block):
+        value = node._attrs.get(name, _missing)
+        if value is not _missing:
+            return value
+        if isinstance(node, ListBlock):
+            value = node._get_name_index().get(name, _missing)
+            if value is not _missing:
+                return value
+    try:
+        return getattr(node, name, _missing)
+    except Exception:
+        # e.g. properties which fail for this node
+        return _missing
+
+
+def _join(path, name):
+    if path:
+        return path + '.' + name
+    return name
+
+
+def _children(path, node):
+    """All attributes followed by all list items of a block"""
+    if isinstance(node, Block):
+        for name, value in _dict_iter_items(node._attrs):
+            yield _join(path, name), value
+        if isinstance(node, ListBlock):
+            for index, item in enumerate(node._list):
+                yield '{}[{}]'.format(path, index), item
+
+
+def _descendants(path, node):
+    """The node followed by all its descendants (depth first, in tree order)"""
+    yield path, node
+    # an explicit stack rather than recursion so that deep trees do not hit the recursion limit
+    stack = [_children(path, node)]
+    while stack:
+        for child_path, child in stack[-1]:
+            yield child_path, child
+            if isinstance(child, Block):
+                stack.append(_children(child_path, child))
+                break
+        else:
+            stack.pop()
+
+
+def _elements(node):
+    """The list items of a list block or the elements of a sequence value"""
+    if isinstance(node, ListBlock):
+        return node._list
+    if isinstance(node, _sequence_types) and np.ndim(node) > 0:
+        return node
+    return ()
+
+
+def _name_step(name):
+    def step(matches):
+        for path, node in matches:
+            value = _lookup(node, name)
+            if value is not _missing:
+                yield _join(path, name), value
+
+    return step
+
+
+def _pattern_step(pattern):
+    match = re.compile(fnmatch.translate(pattern)).match
+
+    def step(matches):
+        for path, node in matches:
+            if isinstance(node, Block):
+                for name, value in _dict_iter_items(node._attrs):
+                    if match(name):
+                        yield _join(path, name), value
+                if isinstance(node, ListBlock):
+                    for index, item in enumerate(node._list):
+                        if match(item.name):
+                            yield '{}[{}]'.format(path, index), item
+
+    return step
+
+
+def _wildcard_step(matches):
+    for path, node in matches:
+        for child in _children(path, node):
+            yield child
+
+
+def _descendant_step(matches):
+    for path, node in matches:
+        for descendant in _descendants(path, node):
+            yield descendant
+
+
+def _index_step(index):
+    def step(matches):
+        for path, node in matches:
+            elements = _elements(node)
+            if -len(elements) <= index < len(elements):
+                yield '{}[{}]'.format(path, index % len(elements)), elements[index]
+
+    return step
+
+
+def _all_elements_step(matches):
+    for path, node in matches:
+        for index, element in enumerate(_elements(node)):
+            yield '{}[{}]'.format(path, index), element
+
+
+def _literal(token):
+    """A predicate literal: a number, a quoted string or a bare string"""
+    if len(token) >= 2 and token[0] == token[-1] and token[0] in '"\'':
+        return token[1:-1]
+    if _number.match(token):
+        if '.' in token or 'e' in token or 'E' in token:
+            return float(token)
+        return int(token)
+    return token
+
+
+def _compare(op, value, literal):
+    """Compare an attribute value to a predicate literal; values which cannot be compared never match"""
+    if isinstance(value, np.ndarray):
+        if value.size != 1:
+            return False
+        value = value.item()
+    try:
+        return bool(op(value, literal))
+    except (TypeError, ValueError):
+        return False
+
+
+def _predicate_step(key, op=None, literal=None):
+    def step(matches):
+        for path, node in matches:
+            if not isinstance(node, Block):
+                continue
+            value = _lookup(node, key)
+            if value is _missing:
+                continue
+            if op is None or _compare(op, value, literal):
+                yield path, node
+
+    return step
+
+
+class PathQuery(object):
+    """A compiled path expression; create instances with :py:func:`compile_path`"""
+
+    def __init__(self, expression):
+        self._expression = expression
+        self._steps = list()
+        # paths consisting only of names need not be run through generators
+        self._names = list()
+        self._compile()
+
+    @property
+    def expression(self):
+        return self._expression
+
+    def _error(self, message, pos):
+        return PathSyntaxError("{} at position {} of path '{}'".format(message, pos, self._expression))
+
+    def _compile(self):
+        expression = self._expression
+        pos = 0
+        end = len(expression)
+        if not expression.strip():
+            raise PathSyntaxError("empty path")
+        while True:
+            match = _name.match(expression, pos)
+            if match is None:
+                raise self._error("expected a name, '*' or '**'", pos)
+            name = match.group(0)
+            pos = match.end()
+            if name == '*':
+                self._steps.append(_wildcard_step)
+                self._names = None
+            elif name == '**':
+                self._steps.append(_descendant_step)
+                self._names = None
+            elif '*' in name or '?' in name:
+                self._steps.append(_pattern_step(name))
+                self._names = None
+            else:
+                self._steps.append(_name_step(name))
+                if self._names is not None:
+                    self._names.append(name)
+            while pos < end and expression[pos] == '[':
+                self._names = None
+                match = _index.match(expression, pos)
+                if match is not None:
+                    index = match.group('index')
+                    if index == '*':
+                        self._steps.append(_all_elements_step)
+                    else:
+                        self._steps.append(_index_step(int(index)))
+                    pos = match.end()
+                    continue
+                match = _predicate.match(expression, pos)
+                if match is None:
+                    raise self._error("invalid filter", pos)
+                if match.group('op') is None:
+                    self._steps.append(_predicate_step(match.group('key')))
+                else:
+                    self._steps.append(_predicate_step(
+                        match.group('key'), _operators[match.group('op')], _literal(match.group('literal'))
+                    ))
+                pos = match.end()
+            if pos == end:
+                break
+            if expression[pos] != '.':
+                raise self._error("expected '.' or '['", pos)
+            pos += 1
+
+    def iter(self, root, path=''):
+        """Generate the matches in ``root`` as ``(path, value)`` pairs in tree order
+
+        :param root: a :py:class:`ahds.core.Block` (or any object with attributes)
+        :param str path: the path of ``root`` with which concrete paths begin
+        :return generator matches: ``(path, value)`` pairs
+        """
+        if self._names is not None:
+            value = root
+            for name in self._names:
+                value = _lookup(value, name)
+                if value is _missing:
+                    return
+                path = _join(path, name)
+            yield path, value
+            return
+        matches = iter([(path, root)])
+        for step in self._steps:
+            matches = step(matches)
+        for match in matches:
+            yield match
+
+    def records(self, root, path=''):
+        """The matches in ``root`` as a list of :py:class:`Record` tuples (see :py:meth:`iter`)"""
+        return [Record(self._expression, match_path, value) for match_path, value in self.iter(root, path=path)]
+
+    def values(self, root):
+        """The matching values in ``root``"""
+        return [value for _, value in self.iter(root)]
+
+    def first(self, root, default=None):
+        """The first matching value in ``root`` or ``default`` if there is none"""
+        for _, value in self.iter(root):
+            return value
+        return default
+
+    def __repr__(self):
+        return "PathQuery('{}')".format(self._expression)
+
+
+def compile_path(expression):
+    """Compile a path expression; compiled queries are cached by expression
+
+    :param str expression: the path expression e.g. ``header.Parameters.Materials.*.Color``
+    :return PathQuery query: the compiled query
+    :raises PathSyntaxError: if the expression is invalid
+    """
+    if isinstance(expression, PathQuery):
+        return expression
+    try:
+        return _cache[expression]
+    except KeyError:
+        pass
+    query = PathQuery(expression)
+    if len(_cache) >= _cache_size:
+        _cache.clear()
+    _cache[expression] = query
+    return query
+
+
+def extract(root, expressions, path=''):
+    """Apply several path expressions to the same tree
+
+    :param root: a :py:class:`ahds.core.Block`
+    :param list expressions: path expressions or compiled queries
+    :param str path: the path of ``root`` with which concrete paths begin
+    :return list records: the :py:class:`Record` tuples of all matches; those of each expression in turn
+    """
+    records = list()
+    for expression in expressions:
+        records += compile_path(expression).records(root, path=path)
+    return records
+
+
+def query(root, expression):
+    """The :py:class:`Record` tuples of the matches of a single path expression in ``root``"""
+    return compile_path(expression).records(root)
+
+
+__all__ = ['PathQuery', 'PathSyntaxError', 'Record', 'compile_path', 'extract', 'query']
@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
 
+import io
 import os
 import re
 import sys
 
 import ahds
 from . import Py23FixTestCase, TEST_DATA_PATH
-from ..ahds import parse_args, get_debug, get_literal, get_paths, set_file_and_paths, get_amira_file
+from ..ahds import parse_args, get_debug, get_literal, get_paths, set_file_and_paths, get_amira_file, write_paths, \
+    write_records, write_ndjson_paths, write_ndjson_records
 from ..core import _str, _print
 import numpy
 
@@ -53,6 +55,44 @@ class TestArgs(Py23FixTestCase):
         args = _parse_with_shlex("ahds -s file.am")
         self.assertTrue(args.load_streams)
 
+    def test_files(self):
+        """Test files, path and jobs options"""
+        args = _parse_with_shlex("ahds --files a.am b.am dir --jobs 8 --path Parameters.BoundingBox Parameters.*")
+        self.assertEqual(args.file, [])
+        self.assertEqual(args.files, ['a.am', 'b.am', 'dir'])
+        self.assertEqual(args.jobs, 8)
+        self.assertEqual(args.path, ['Parameters.BoundingBox', 'Parameters.*'])
+        args = _parse_with_shlex("ahds -f a.am")
+        self.assertEqual(args.files, ['a.am'])
+        self.assertIsNone(args.path)
+        self.assertIsNone(args.jobs)
+        # a file or --files is required and paths of --files are given with --path
+        stderr = sys.stderr
+        sys.stderr = io.StringIO()
+        try:
+            for cmd in ["ahds", "ahds file.am --path Parameters", "ahds file.am --jobs 2",
+                        "ahds file.am --files a.am"]:
+                with self.assertRaises(SystemExit):
+                    _parse_with_shlex(cmd)
+        finally:
+            sys.stderr = stderr
+
+    def test_format(self):
+        """Test format option"""
+        args = _parse_with_shlex("ahds file.am")
+        self.assertEqual(args.format, 'text')
+        args = _parse_with_shlex("ahds --format ndjson file.am")
+        self.assertEqual(args.format, 'ndjson')
+
+    def test_truncation(self):
+        """Test max_depth and max_items options"""
+        args = _parse_with_shlex("ahds file.am")
+        self.assertIsNone(args.max_depth)
+        self.assertIsNone(args.max_items)
+        args = _parse_with_shlex("ahds --max-depth 2 --max-items 10 file.am")
+        self.assertEqual(args.max_depth, 2)
+        self.assertEqual(args.max_items, 10)
+
 
 class TestMain(Py23FixTestCase):
     """Tests for the main ahds entry point main()"""
@@ -198,6 +238,95 @@ class TestMain(Py23FixTestCase):
         m_m = m.match(string)
         self.assertIsNotNone(m_m)
 
+    def test_get_paths_query(self):
+        """Test that paths may contain wildcards and filters"""
+        args = _parse_with_shlex("ahds {} header.Parameters.Materials.*[Id].Color header.Nothing".format(self.af_fn))
+        f, p = set_file_and_paths(args)
+        af = get_amira_file(f, args)
+        string = get_paths(p, af)
+        self.assertIn("ahds: Displaying path 'header.Parameters.Materials[1].Color'", string)
+        self.assertNotIn("Materials[0]", string)
+        self.assertNotIn("header.Nothing", string)
+        # invalid and missing paths are reported on stderr rather than raised
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = io.StringIO(), io.StringIO()
+        try:
+            string = get_paths(['header.[0]', 'header.Nothing'], af)
+            out, err = sys.stdout.getvalue(), sys.stderr.getvalue()
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+        self.assertEqual(string, '')
+        self.assertEqual(out, '')
+        self.assertIn("Invalid path 'header.[0]'", err)
+        self.assertIn("Path 'header.Nothing' not found.", err)
+
+    def test_write_records(self):
+        """Test that the paths of many files are displayed per file"""
+        from ..batch import extract_paths
+        missing = os.path.join(TEST_DATA_PATH, 'missing.am')
+        _paths = ['Parameters.BoundingBox', 'Parameters.Materials.*[Id]', 'Nothing']
+        results = dict((result.filename, result) for result in extract_paths([self.af_fn, missing], _paths,
+                                                                              processes=1))
+        stream = io.StringIO()
+        write_records(results[self.af_fn], _paths, stream)
+        string = stream.getvalue()
+        self.assertIn(u"ahds: Displaying file '{}'".format(self.af_fn), string)
+        self.assertIn(u"Parameters.BoundingBox: [118, 436, 281, 566, 0, 279]\n", string)
+        self.assertIn(u"Parameters.Materials[1]:\n+-Spikes", string)
+        self.assertIn(u"Path 'Nothing' not found.", string)
+        stream = io.StringIO()
+        write_records(results[missing], _paths, stream)
+        self.assertIn(u"Error: ", stream.getvalue())
+
+    def test_write_ndjson(self):
+        """Test that matches are written as one JSON record per line"""
+        import json
+        args = _parse_with_shlex("ahds {}".format(self.af_fn))
+        f, p = set_file_and_paths(args)
+        af = get_amira_file(f, args)
+        stream = io.StringIO()
+        write_ndjson_paths(['header.Parameters.Materials.*[Id]', 'header.Lattice.length', 'header.Nothing', 'a['],
+                           af, stream)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(records[0], {'file': self.af_fn, 'query': 'header.Parameters.Materials.*[Id]',
+                                      'path': 'header.Parameters.Materials[1]',
+                                      'value': {'Id': 3, 'Color': [0.16, 0.481757, 0.8]}})
+        self.assertEqual(records[1]['value'], [319, 286, 280])
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[2]['query'], 'a[')
+        self.assertIn('error', records[2])
+        # the whole file
+        stream = io.StringIO()
+        write_ndjson_paths(None, af, stream)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['value']['header']['Lattice']['length'], [319, 286, 280])
+        # many files
+        from ..batch import extract_paths
+        missing = os.path.join(TEST_DATA_PATH, 'missing.am')
+        stream = io.StringIO()
+        for result in extract_paths([self.af_fn, missing], ['Lattice.length'], processes=1, to_dict=True):
+            write_ndjson_records(result, stream)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(records[0], {'file': self.af_fn, 'query': 'Lattice.length', 'path': 'Lattice.length',
+                                      'value': [319, 286, 280]})
+        self.assertEqual(records[1]['file'], missing)
+        self.assertIn('error', records[1])
+
+    def test_get_paths_truncated(self):
+        """Test that displayed trees may be truncated"""
+        args = _parse_with_shlex("ahds {} header".format(self.af_fn))
+        f, p = set_file_and_paths(args)
+        af = get_amira_file(f, args)
+        string = get_paths(p, af, max_depth=1)
+        self.assertIn('Parameters', string)
+        self.assertNotIn('Inside', string)
+        self.assertIn('more)', string)
+        self.assertEqual(get_paths(p, af), get_paths(p, af, max_depth=100, max_items=10 ** 6))
+        stream = io.StringIO()
+        write_paths(p, af, stream)
+        self.assertEqual(stream.getvalue(), get_paths(p, af))
+
     # def test_data(self):
     #     """Test that the data is correctly oriented"""
     #     af = ahds.AmiraFile(os.path.join(TEST_DATA_PATH, 'EM04226_2_U19_Cropped_YZ_binned.labels.am'))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import os
+import sys
+import unittest
+
+import numpy
+
+from ahds import AmiraFile
+from ahds.tests import TEST_DATA_PATH
+
+if sys.version_info[:2] >= (3, 5):
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ahds import aio
+
+
+@unittest.skipIf(sys.version_info[:2] < (3, 5), "asyncio interface requires Python 3.5+")
+class TestAsyncAmiraFile(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def test_aopen(self):
+        """Headers are parsed and streams decoded on the executor"""
+        fn = os.path.join(TEST_DATA_PATH, 'test9.am')
+        af = self.loop.run_until_complete(aio.aopen(fn))
+        self.assertIsInstance(af, aio.AsyncAmiraFile)
+        self.assertEqual(list(af.streams.keys()), ['Labels'])
+        self.assertFalse(af.streams['Labels'].stream.is_loaded)
+        labels = self.loop.run_until_complete(af.streams['Labels'])
+        self.assertTrue(numpy.array_equal(labels, AmiraFile(fn).data_streams.Labels.data))
+        region = self.loop.run_until_complete(af.streams['Labels'].read_region(z=slice(10, 12)))
+        self.assertTrue(numpy.array_equal(region, labels[10:12]))
+
+    def test_concurrent_awaits(self):
+        """Concurrent awaits of a stream share a single decode"""
+        fn = os.path.join(TEST_DATA_PATH, 'test9.am')
+        af = self.loop.run_until_complete(aio.aopen(fn))
+        labels = af.streams['Labels']
+        stream = labels.stream
+        calls = []
+        read_data = stream._read_data
+
+        def _read_data():
+            calls.append(1)
+            return read_data()
+
+        stream._read_data = _read_data
+        first, second = self.loop.run_until_complete(asyncio.gather(labels.data(), labels))
+        self.assertEqual(len(calls), 1)
+        self.assertIs(first, second)
+        self.assertIsNone(labels._pending)
+        # decoded again after unloading
+        labels.unload()
+        self.assertFalse(stream.is_loaded)
+        third = self.loop.run_until_complete(labels)
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(numpy.array_equal(first, third))
+
+    def test_unload_in_flight(self):
+        """Data decoded by a decode in flight when the stream is unloaded is discarded"""
+        import threading
+        fn = os.path.join(TEST_DATA_PATH, 'test9.am')
+        af = self.loop.run_until_complete(aio.aopen(fn))
+        labels = af.streams['Labels']
+        stream = labels.stream
+        calls = []
+        started, release = threading.Event(), threading.Event()
+        read_data = stream._read_data
+
+        def _read_data():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return read_data()
+
+        stream._read_data = _read_data
+
+        async def unload_in_flight(again):
+            started.clear()
+            release.clear()
+            first = asyncio.ensure_future(labels.data())
+            await self.loop.run_in_executor(None, started.wait)
+            labels.unload()
+            second = asyncio.ensure_future(labels.data()) if again else None
+            release.set()
+            return await first, (await second if again else None)
+
+        # nothing is kept if nothing is awaited after the unload
+        first, _ = self.loop.run_until_complete(unload_in_flight(False))
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(numpy.array_equal(first, AmiraFile(fn).data_streams.Labels.data))
+        self.assertFalse(stream.is_loaded)
+        self.assertIsNone(stream._stream_data)
+        self.assertIsNone(labels._pending)
+        # awaits after the unload start a decode of their own whose data is kept
+        first, second = self.loop.run_until_complete(unload_in_flight(True))
+        self.assertEqual(len(calls), 3)
+        self.assertIsNot(first, second)
+        self.assertTrue(numpy.array_equal(first, second))
+        self.assertTrue(stream.is_loaded)
+        self.assertIs(stream._data, second)
+
+    def test_many_files(self):
+        """Many files may be in flight at once on a bounded executor"""
+        fns = [os.path.join(TEST_DATA_PATH, fn) for fn in ['testscalar.am', 'testvector2c.am', 'testvector3c.am',
+                                                           'BinaryHxSpreadSheet62x200.am']]
+        executor = ThreadPoolExecutor(2)
+        semaphore = asyncio.Semaphore(2)
+        try:
+            files = self.loop.run_until_complete(asyncio.gather(
+                *[aio.aopen(fn, executor=executor, semaphore=semaphore) for fn in fns]))
+            data = self.loop.run_until_complete(asyncio.gather(*[af.load() for af in files]))
+        finally:
+            executor.shutdown()
+        for fn, af, streams in zip(fns, files, data):
+            expected = AmiraFile(fn).data_streams
+            self.assertEqual(list(streams.keys()), expected.attrs())
+            for name, array in streams.items():
+                self.assertTrue(numpy.array_equal(array, getattr(expected, name).data))
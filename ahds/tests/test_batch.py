@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import os
+import pickle
+import unittest
+
+from ahds import batch
+from ahds.tests import TEST_DATA_PATH
+
+
+class TestScanHeaders(unittest.TestCase):
+    def test_scan_directory(self):
+        """All Amira (R) files in a directory tree are summarised by the pool"""
+        expected = sorted(os.path.join(TEST_DATA_PATH, fn) for fn in os.listdir(TEST_DATA_PATH)
+                          if os.path.splitext(fn)[1] in batch.AMIRA_EXTENSIONS)
+        summaries = list(batch.scan_headers([TEST_DATA_PATH], processes=2))
+        self.assertEqual(sorted(summary.filename for summary in summaries), expected)
+        self.assertTrue(all(summary.error is None for summary in summaries))
+        # summaries are picklable and match those scanned in this process
+        self.assertEqual(pickle.loads(pickle.dumps(summaries)), summaries)
+        self.assertEqual(sorted(batch.scan_headers([TEST_DATA_PATH], processes=1)), sorted(summaries))
+
+    def test_summary(self):
+        """The summary holds the filetype, arrays, streams and materials"""
+        summary = batch.scan_header(os.path.join(TEST_DATA_PATH, 'test9.am'))
+        self.assertEqual(summary.filetype, 'AmiraMesh')
+        self.assertEqual(summary.arrays, (('Lattice', (284, 284, 284)),))
+        self.assertEqual(summary.streams, (('Labels', 'byte', 1, 'HxByteRLE'),))
+        self.assertEqual(summary.materials, ('Exterior', 'Inside', 'molecule'))
+        summary = batch.scan_header(os.path.join(TEST_DATA_PATH, 'test7.surf'))
+        self.assertEqual(summary.filetype, 'HyperSurface')
+        self.assertEqual(summary.streams, ())
+
+    def test_error(self):
+        """Unreadable files are reported instead of aborting the scan"""
+        missing = os.path.join(TEST_DATA_PATH, 'missing.am')
+        summaries = list(batch.scan_headers([missing, os.path.join(TEST_DATA_PATH, 'testscalar.am')], processes=2))
+        self.assertEqual(len(summaries), 2)
+        errors = [summary for summary in summaries if summary.error is not None]
+        self.assertEqual([summary.filename for summary in errors], [missing])
+
+
+class TestExtractPaths(unittest.TestCase):
+    def test_extract_paths(self):
+        """Path expressions are applied to the headers of all files in the pool"""
+        from ahds.query import PathSyntaxError
+        expressions = ['Parameters.BoundingBox', 'Parameters.Materials.*[Id>=3].name']
+        results = list(batch.extract_paths([TEST_DATA_PATH], expressions, processes=2, chunksize=1))
+        self.assertEqual(len(results), len(list(batch.iter_amira_files([TEST_DATA_PATH]))))
+        self.assertTrue(all(result.error is None for result in results))
+        result = [result for result in results if os.path.basename(result.filename) == 'test12.am'][0]
+        self.assertEqual([(record.query, record.path, record.value) for record in result.records], [
+            ('Parameters.BoundingBox', 'Parameters.BoundingBox', [118, 436, 281, 566, 0, 279]),
+            ('Parameters.Materials.*[Id>=3].name', 'Parameters.Materials[1].name', 'Spikes'),
+        ])
+        # results are the same in this process
+        self.assertEqual(
+            sorted((result.filename, repr(result.records)) for result in results),
+            sorted((result.filename, repr(result.records))
+                   for result in batch.extract_paths([TEST_DATA_PATH], expressions, processes=1)),
+        )
+        # invalid expressions are reported before any file is read
+        with self.assertRaises(PathSyntaxError):
+            batch.extract_paths([TEST_DATA_PATH], ['Parameters['])
+
+    def test_whole_header(self):
+        """Without expressions the whole header is returned; blocks survive the trip between processes"""
+        fn = os.path.join(TEST_DATA_PATH, 'test12.am')
+        missing = os.path.join(TEST_DATA_PATH, 'missing.am')
+        results = dict((result.filename, result) for result in batch.extract_paths([fn, missing], processes=2))
+        self.assertEqual(len(results[fn].records), 1)
+        header = results[fn].records[0].value
+        self.assertEqual(results[fn].records[0].path, '')
+        self.assertEqual(header.Parameters.Materials.material_dict['Spikes'].Id, 3)
+        self.assertEqual(str(header), str(batch.AmiraHeader(fn, load_streams=False, verbose=False)))
+        self.assertEqual(results[missing].records, ())
+        self.assertIsNotNone(results[missing].error)
+
+    def test_to_dict(self):
+        """Values are converted to built-in types in the workers if requested"""
+        fn = os.path.join(TEST_DATA_PATH, 'test12.am')
+        result, = batch.extract_paths([fn], ['Lattice', 'Lattice.length'], processes=2, to_dict=True)
+        self.assertEqual([(record.path, record.value) for record in result.records],
+                         [('Lattice', {'length': [319, 286, 280]}), ('Lattice.length', [319, 286, 280])])
+        result, = batch.extract_paths([fn], processes=1, to_dict=True)
+        self.assertEqual(result.records[0].value['Lattice'], {'length': [319, 286, 280]})
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ahds import header, cache, AmiraFile
+from ahds.tests import TEST_DATA_PATH
+
+
+class TestSidecarCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.fn = os.path.join(self.tmp, 'BinaryHxSpreadSheet62x200.am')
+        shutil.copy(os.path.join(TEST_DATA_PATH, 'BinaryHxSpreadSheet62x200.am'), self.fn)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_sidecar(self):
+        """The sidecar is written next to the file and used on reopening"""
+        ah = header.AmiraHeader(self.fn, cache=True)
+        self.assertTrue(os.path.exists(self.fn + cache.SIDECAR_EXTENSION))
+        entry = cache.load_sidecar(self.fn, True)
+        self.assertIsNotNone(entry)
+        self.assertEqual(entry['data_stream_offsets'], ah.data_stream_offsets)
+        self.assertEqual(len(entry['data_stream_formats']), ah.data_stream_count)
+        # reopening does not parse the header
+        _get_parsed_data = header.get_parsed_data
+        try:
+            def _fail(*args, **kwargs):
+                raise AssertionError('header should not be parsed')
+
+            header.get_parsed_data = _fail
+            af = AmiraFile(self.fn, cache=True)
+        finally:
+            header.get_parsed_data = _get_parsed_data
+        self.assertEqual(af.header.data_stream_offsets, ah.data_stream_offsets)
+        self.assertEqual(af.header.literal_data, ah.literal_data)
+        self.assertEqual(getattr(af.data_streams, '__Column0000').data.shape, (62,))
+
+    def test_cache_directory(self):
+        """Sidecars may also be kept in a cache directory"""
+        cache_dir = os.path.join(self.tmp, 'cache')
+        header.AmiraHeader(self.fn, cache=cache_dir)
+        self.assertEqual(os.listdir(cache_dir), [os.path.basename(cache.sidecar_path(self.fn, cache_dir))])
+        self.assertIsNotNone(cache.load_sidecar(self.fn, cache_dir))
+
+    def test_stale_sidecar(self):
+        """A sidecar is ignored once the file changes"""
+        header.AmiraHeader(self.fn, cache=True)
+        with open(self.fn, 'ab') as f:
+            f.write(b'\n')
+        self.assertIsNone(cache.load_sidecar(self.fn, True))
+        # a corrupt sidecar is ignored too
+        with open(cache.sidecar_path(self.fn, True), 'wb') as f:
+            f.write(b'not a sidecar')
+        self.assertIsNone(cache.load_sidecar(self.fn, True))
+        ah = header.AmiraHeader(self.fn, cache=True)
+        self.assertIsNotNone(cache.load_sidecar(self.fn, True))
+        self.assertEqual(ah.data_stream_count, 500)
+
+    def test_tampered_sidecar(self):
+        """Sidecars are plain JSON; a sidecar holding a pickle is ignored rather than executed"""
+        import json
+        import pickle
+        header.AmiraHeader(self.fn, cache=True)
+        path = cache.sidecar_path(self.fn, True)
+        with open(path) as f:
+            self.assertEqual(json.load(f)['version'], cache._CACHE_VERSION)
+        marker = os.path.join(self.tmp, 'executed')
+
+        class Payload(object):
+            def __reduce__(self):
+                return open, (marker, 'w')
+
+        with open(path, 'wb') as f:
+            pickle.dump(Payload(), f, protocol=2)
+        self.assertIsNone(cache.load_sidecar(self.fn, True))
+        ah = header.AmiraHeader(self.fn, cache=True)
+        self.assertFalse(os.path.exists(marker))
+        self.assertEqual(ah.data_stream_count, 500)
+        # the sidecar is rewritten and used again
+        self.assertIsNotNone(cache.load_sidecar(self.fn, True))
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
 
+import io
+import json
 import os
 import random
 import sys
@@ -8,7 +10,8 @@ import unittest
 
 from . import TEST_DATA_PATH, Py23FixTestCase
 from .. import AmiraFile
-from ..core import Block, ListBlock, _print
+from ..core import Block, ListBlock, _print, write_tree
+from ..header import AmiraHeader
 
 
 # class TestUtils(unittest.TestCase):
@@ -172,10 +175,204 @@ class TestListBlock(Py23FixTestCase):
         l.sort()
         self.assertTrue(l[0] < l[1])
 
+    def test_indexes(self):
+        """Materials are found by Id and name through indexes which follow changes to the list"""
+        materials = ListBlock('Materials')
+        for i, name in enumerate(['Exterior', 'Inside', 'Outside']):
+            material = Block(name)
+            material.add_attr('Id', i + 1)
+            materials.append(material)
+        self.assertEqual(materials.id_dict[2].name, 'Inside')
+        self.assertIs(materials.material_dict['Outside'], materials[2])
+        # Ids may be added after the material
+        seaside = Block('Seaside')
+        materials.append(seaside)
+        self.assertIs(materials.material_dict['Seaside'], seaside)
+        self.assertNotIn(4, materials.id_dict)
+        seaside.add_attr('Id', 4)
+        self.assertIs(materials.id_dict[4], seaside)
+        # insert, replace, remove, pop and delete
+        lakeside = Block('Lakeside')
+        lakeside.add_attr('Id', 5)
+        materials.insert(0, lakeside)
+        self.assertIs(materials.id_dict[5], lakeside)
+        riverside = Block('Riverside')
+        riverside.add_attr('Id', 6)
+        materials[0] = riverside
+        self.assertNotIn(5, materials.id_dict)
+        self.assertNotIn('Lakeside', materials.material_dict)
+        self.assertIs(materials.material_dict['Riverside'], riverside)
+        materials.remove(Block('Inside'))
+        self.assertNotIn(2, materials.id_dict)
+        self.assertNotIn('Inside', materials.material_dict)
+        materials.pop()
+        self.assertNotIn(4, materials.id_dict)
+        del materials[0]
+        self.assertNotIn(6, materials.id_dict)
+        self.assertCountEqual(materials.ids, [1, 3])
+        self.assertCountEqual(list(materials.id_dict.keys()), [1, 3])
+        self.assertCountEqual(list(materials.material_dict.keys()), ['Exterior', 'Outside'])
+        # Block attributes are indexed by Id too
+        blocks = Block('Materials')
+        inside = Block('Inside')
+        inside.add_attr('Id', 7)
+        blocks.add_attr(inside)
+        self.assertIs(blocks[7], inside)
+        self.assertIsNone(blocks[8])
+        other = ListBlock('other')
+        self.assertEqual(other.material_dict, dict())
+        # changes to the dictionary of other ListBlocks are kept
+        other.material_dict['Inside'] = inside
+        self.assertIs(other.material_dict['Inside'], inside)
+
+    def test_index_invalidation(self):
+        """Changing an Id only invalidates the indexes of the blocks holding it"""
+        import pickle
+        first, second = ListBlock('first'), ListBlock('second')
+        for materials in [first, second]:
+            for i in range(3):
+                material = Block('material{}'.format(i))
+                material.add_attr('Id', i)
+                materials.append(material)
+            self.assertEqual(len(materials.id_dict), 3)
+        index = second._id_index
+        added = Block('added')
+        first.append(added)
+        added.add_attr('Id', 10)
+        self.assertIsNone(first._id_index)
+        self.assertIs(first.id_dict[10], added)
+        self.assertIs(second._id_index, index)
+        # renaming an Id invalidates the parent too
+        added.rename_attr('Id', 'OldId')
+        self.assertNotIn(10, first.id_dict)
+        # blocks held by both a list and a block attribute
+        holder = Block('Materials')
+        holder.add_attr(added)
+        self.assertIsNone(holder[10])
+        added.rename_attr('OldId', 'Id')
+        self.assertIs(holder[10], added)
+        self.assertIs(first.id_dict[10], added)
+        # unpickled trees keep following changes
+        restored = pickle.loads(pickle.dumps(first))
+        self.assertEqual(len(restored.id_dict), 4)
+        restored[0].rename_attr('Id', 'OldId')
+        self.assertNotIn(0, restored.id_dict)
+        self.assertIn(0, first.id_dict)
+        self.assertIs(restored._get_name_index()['added'], restored[3])
+
     # def test_insert_listblock(self):
     #     pass
 
 
+class TestWriteTree(Py23FixTestCase):
+    def setUp(self):
+        self.block = Block('root')
+        self.block.add_attr('value', 1)
+        inner = Block('inner')
+        inner.add_attr('deep', 'text')
+        self.block.add_attr(inner)
+        self.block.add_attr(ListBlock('list'))
+        for i in range(5):
+            item = Block('item{}'.format(i))
+            item.add_attr('Id', i)
+            self.block.list.append(item)
+
+    def test_write_tree(self):
+        """The tree is written to a file-like object"""
+        f = io.StringIO()
+        self.block.write(f)
+        self.assertEqual(f.getvalue(), str(self.block))
+        lines = f.getvalue().splitlines()
+        self.assertEqual(len(lines), 15)
+        self.assertTrue(lines[3].startswith('|  |  +-deep: text'))
+        self.assertTrue(lines[5].startswith('|  |  +[0]-item0'))
+
+    def test_truncation(self):
+        """Trees are truncated at max_depth and max_items"""
+        f = io.StringIO()
+        write_tree(self.block, f, max_depth=1)
+        lines = f.getvalue().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(lines[3], '|  |  +-... (1 more)')
+        self.assertEqual(lines[5], '|  |  +-... (5 more)')
+        f = io.StringIO()
+        write_tree(self.block, f, max_items=2)
+        lines = f.getvalue().splitlines()
+        self.assertEqual(lines[-1], '|  +-... (1 more)')
+        self.assertNotIn('list', f.getvalue())
+        f = io.StringIO()
+        write_tree(self.block.list, f, max_items=3)
+        self.assertEqual(f.getvalue().splitlines()[-1], '|  +-... (2 more)')
+        self.assertIn('item2', f.getvalue())
+        self.assertNotIn('item3', f.getvalue())
+
+    def test_large_tree(self):
+        """Wide and deep trees are written without recursion"""
+        block = Block('parameters')
+        for i in range(20000):
+            block.add_attr('p{}'.format(i), i)
+        current = block
+        for i in range(2000):
+            child = Block('level{}'.format(i))
+            current.add_attr(child)
+            current = child
+        f = io.StringIO()
+        write_tree(block, f)
+        self.assertEqual(len(f.getvalue().splitlines()), 22001)
+
+
+class TestToDict(Py23FixTestCase):
+    def test_to_dict(self):
+        """Blocks are converted to nested dictionaries of built-in types"""
+        import numpy
+        block = Block('root')
+        block.add_attr('value', 1)
+        block.add_attr('array', numpy.arange(6, dtype=numpy.int16).reshape(2, 3))
+        block.add_attr('scalar', numpy.float32(0.5))
+        inner = Block('inner')
+        inner.add_attr('deep', 'text')
+        block.add_attr(inner)
+        block.add_attr(ListBlock('list'))
+        for i in range(3):
+            item = Block('item{}'.format(i))
+            item.add_attr('Id', i)
+            block.list.append(item)
+        data = block.to_dict()
+        self.assertEqual(list(data.keys()), ['value', 'array', 'scalar', 'inner', 'list'])
+        self.assertEqual(data['array'], [[0, 1, 2], [3, 4, 5]])
+        self.assertIs(type(data['array'][0][0]), int)
+        self.assertIs(type(data['scalar']), float)
+        self.assertEqual(data['inner'], {'deep': 'text'})
+        self.assertEqual(data['list'], {'items': [{'name': 'item0', 'Id': 0}, {'name': 'item1', 'Id': 1},
+                                                  {'name': 'item2', 'Id': 2}]})
+        self.assertEqual(json.loads(block.to_json()), data)
+        self.assertEqual(json.loads(block.list.to_json(indent=2)), data['list'])
+
+    def test_header(self):
+        """Headers are converted as a whole"""
+        header = AmiraHeader(os.path.join(TEST_DATA_PATH, 'test12.am'), load_streams=False, verbose=False)
+        data = json.loads(header.to_json())
+        self.assertEqual(data['filetype'], 'AmiraMesh')
+        self.assertEqual(data['Lattice']['length'], [319, 286, 280])
+        self.assertEqual([item['name'] for item in data['Parameters']['Materials']['items']], ['Inside', 'Spikes'])
+        self.assertEqual(data['Parameters']['Materials']['items'][1]['Id'], 3)
+
+    def test_deep_tree(self):
+        """Deep trees are converted without recursion"""
+        block = Block('root')
+        current = block
+        for i in range(sys.getrecursionlimit() + 100):
+            child = Block('level{}'.format(i))
+            current.add_attr(child)
+            current = child
+        data = block.to_dict()
+        depth = 0
+        while data:
+            data = data['level{}'.format(depth)]
+            depth += 1
+        self.assertEqual(depth, sys.getrecursionlimit() + 100)
+
+
 class BlockSubclass(Block):
     """Subclass for test"""
     orange = 'pink'
@@ -2,7 +2,10 @@
 from __future__ import print_function
 
 import os
+import shutil
+import tempfile
 import unittest
+import zlib
 
 import numpy
 
@@ -11,6 +14,22 @@ from ahds import data_stream, AmiraFile, header
 from ahds.tests import TEST_DATA_PATH
 
 
+def _write_lattice(fn, array, data_format=None, encoded=None):
+    """Write a minimal little-endian AmiraMesh lattice of floats with an optional HxZip/HxByteRLE stream"""
+    nz, ny, nx = array.shape
+    if data_format is None:
+        encoded = array.astype('<f4').tobytes()
+        stream = b'@1'
+    else:
+        stream = '@1({},{})'.format(data_format, len(encoded)).encode('ASCII')
+    header = '# AmiraMesh BINARY-LITTLE-ENDIAN 2.1\n\n\ndefine Lattice {} {} {}\n\n'.format(nx, ny, nz).encode('ASCII')
+    data_type = b'byte' if data_format == 'HxByteRLE' else b'float'
+    with open(fn, 'wb') as f:
+        f.write(header + b'Lattice { ' + data_type + b' Data } ' + stream + b'\n\n# Data section follows\n@1\n')
+        f.write(encoded)
+        f.write(b'\n')
+
+
 class TestDataStreams(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -77,3 +96,502 @@ class TestDataStreams(unittest.TestCase):
     #     # get the middle slice of the image set
     #     contours = imgs[128].as_contours
     #     self.assertIsInstance(contours, dict)
+
+
+class TestLocateDataStreams(unittest.TestCase):
+    def test_binary_streams(self):
+        """Every stream of a multi-stream binary file is located by a single scan"""
+        ah = header.AmiraHeader(os.path.join(TEST_DATA_PATH, 'BinaryHxSpreadSheet62x200.am'), load_streams=False)
+        offsets = ah.data_stream_offsets
+        self.assertEqual(len(offsets), ah.data_stream_count)
+        with open(ah.filename, 'rb') as f:
+            data = f.read()
+        for ds in ah._data_streams_block_list:
+            offset, length = offsets[ds.data_index]
+            self.assertEqual(length, ds.stream_size)
+            marker = '\n@{}\n'.format(ds.data_index).encode('ASCII')
+            self.assertEqual(data[offset - len(marker):offset], marker)
+        # the scan is only done once
+        self.assertIs(ah.data_stream_offsets, offsets)
+
+    def test_ascii_streams(self):
+        """ASCII streams have no known size so they end at the next marker"""
+        ah = header.AmiraHeader(os.path.join(TEST_DATA_PATH, 'BinaryCustomLandmarks.elm'), load_streams=False)
+        offsets = ah.data_stream_offsets
+        self.assertCountEqual(list(offsets.keys()), [1, 2])
+        with open(ah.filename, 'rb') as f:
+            data = f.read()
+        offset, length = offsets[1]
+        self.assertEqual(data[offset + length:offsets[2][0]], b'\n@2\n')
+        offset, length = offsets[2]
+        self.assertEqual(data[offset + length:].strip(), b'')
+
+    def test_last_stream_terminator(self):
+        """Only the newline terminating the last stream is stripped"""
+        tmp = tempfile.mkdtemp()
+        try:
+            fn = os.path.join(tmp, 'streams.am')
+            for content, stream in [(b'1 2 3\n\n', b'1 2 3\n'), (b'1 2 3\n', b'1 2 3'), (b'1 2 3', b'1 2 3')]:
+                with open(fn, 'wb') as f:
+                    f.write(b'# header\n@1\n' + content)
+                offset, length = data_stream.locate_data_streams(fn, 0, {1: None})[1]
+                self.assertEqual(offset, len(b'# header\n@1\n'))
+                with open(fn, 'rb') as f:
+                    self.assertEqual(f.read()[offset:offset + length], stream)
+        finally:
+            shutil.rmtree(tmp)
+
+
+class TestMemoryMappedStreams(unittest.TestCase):
+    def test_mmap(self):
+        """Uncompressed binary streams are memory-mapped and identical to the read data"""
+        fn = os.path.join(TEST_DATA_PATH, 'testvector2c.am')
+        af = AmiraFile(fn)
+        af_mmap = AmiraFile(fn, mmap=True)
+        self.assertTrue(af_mmap.header.mmap)
+        self.assertIsInstance(af_mmap.data_streams.Data.data, numpy.memmap)
+        self.assertEqual(af_mmap.data_streams.Data.data.shape, af.data_streams.Data.data.shape)
+        self.assertEqual(af_mmap.data_streams.Data.data.dtype, af.data_streams.Data.data.dtype)
+        self.assertTrue(numpy.array_equal(af_mmap.data_streams.Data.data, af.data_streams.Data.data))
+
+    def test_mmap_compressed(self):
+        """Compressed streams are still decoded into memory"""
+        af = AmiraFile(os.path.join(TEST_DATA_PATH, 'test9.am'), mmap=True)
+        self.assertNotIsInstance(af.data_streams.Labels.data, numpy.memmap)
+
+
+class TestLazyStreams(unittest.TestCase):
+    def test_lazy_data(self):
+        """Stream data is only read and decoded on first access"""
+        af = AmiraFile(os.path.join(TEST_DATA_PATH, 'BinaryHxSpreadSheet62x200.am'))
+        columns = af.data_streams.attrs()
+        self.assertEqual(len(columns), af.header.data_stream_count)
+        self.assertFalse(any(getattr(af.data_streams, c).is_loaded for c in columns))
+        # displaying or converting the tree does not decode any stream
+        str(af)
+        af.to_dict()
+        self.assertFalse(any(getattr(af.data_streams, c).is_loaded for c in columns))
+        column = getattr(af.data_streams, columns[3])
+        self.assertNotIn('data', column.to_dict())
+        data = column.data
+        self.assertIn('data', column.to_dict())
+        self.assertIsInstance(data, numpy.ndarray)
+        self.assertTrue(column.is_loaded)
+        self.assertIs(column.data, data)  # cached
+        self.assertEqual(sum(getattr(af.data_streams, c).is_loaded for c in columns), 1)
+        # unload releases the memory but the data may be reloaded
+        column.unload()
+        self.assertFalse(column.is_loaded)
+        self.assertIsNone(column._stream_data)
+        self.assertTrue(numpy.array_equal(column.data, data))
+
+    def test_lazy_hxsurface(self):
+        """HxSurface vertices and triangles are decoded on first access"""
+        af = AmiraFile(os.path.join(TEST_DATA_PATH, 'BinaryHyperSurface.surf'))
+        vertices = af.data_streams.Data.Vertices
+        self.assertFalse(vertices.is_loaded)
+        self.assertEqual(vertices.data.shape, (vertices.length, 3))
+        triangles = vertices.Patches[0].Triangles
+        self.assertEqual(triangles.data.shape, (triangles.length, 3))
+        triangles.unload()
+        self.assertFalse(triangles.is_loaded)
+        self.assertEqual(triangles.data.shape, (triangles.length, 3))
+
+    def test_mapped_hxsurface(self):
+        """Binary HxSurface streams are views into the memory-mapped file which are decoded on first access"""
+        af = AmiraFile(os.path.join(TEST_DATA_PATH, 'test7.surf'))
+        vertices = af.data_streams.Data.Vertices
+        self.assertIsInstance(vertices._stream_data.obj, numpy.memmap)
+        self.assertFalse(any(patch.Triangles.is_loaded for patch in vertices.Patches))
+        triangles = vertices.Patches[0].Triangles
+        self.assertFalse(triangles.data.flags.owndata)
+        self.assertFalse(triangles.data.flags.writeable)
+        self.assertFalse(vertices.Patches[1].Triangles.is_loaded)
+        with open(af.header.filename, 'rb') as f:
+            f.seek(len(af.header))
+            body = f.read()
+        _, (start, end) = data_stream.scan_hxsurface(body)['Patches'][0]['Triangles']
+        self.assertTrue(numpy.array_equal(triangles.data, numpy.frombuffer(body[start:end], '>i4').reshape(-1, 3)))
+
+    def test_parallel_decode(self):
+        """workers=N decodes all streams in a thread pool without changing the order of the streams"""
+        fn = os.path.join(TEST_DATA_PATH, 'BinaryHxSpreadSheet62x200.am')
+        af = AmiraFile(fn)
+        af_parallel = AmiraFile(fn, workers=4)
+        columns = af_parallel.data_streams.attrs()
+        self.assertEqual(columns, af.data_streams.attrs())
+        self.assertTrue(all(getattr(af_parallel.data_streams, c).is_loaded for c in columns))
+        for c in columns:
+            self.assertTrue(numpy.array_equal(getattr(af_parallel.data_streams, c).data,
+                                              getattr(af.data_streams, c).data))
+        self.assertEqual(af_parallel.meta.decoded_bytes,
+                         sum(getattr(af.data_streams, c).data.nbytes for c in columns))
+        self.assertGreater(af_parallel.meta.decode_throughput, 0)
+        # deferred reading
+        af_deferred = AmiraFile(os.path.join(TEST_DATA_PATH, 'test9.am'), load_streams=False)
+        af_deferred.read(workers=2)
+        self.assertTrue(af_deferred.data_streams.Labels.is_loaded)
+
+
+class TestReadRegion(unittest.TestCase):
+    def test_read_region(self):
+        """Regions read from the file are identical to slices of the fully decoded data"""
+        for fn in ['testscalar.am', 'testvector3c.am']:
+            af = AmiraFile(os.path.join(TEST_DATA_PATH, fn))
+            data = af.data_streams.Data.data
+            for kwargs, index in [
+                (dict(z=slice(2, 5)), (slice(2, 5),)),
+                (dict(z=slice(1, 7), y=slice(2, 4)), (slice(1, 7), slice(2, 4))),
+                (dict(y=slice(1, 5), x=slice(1, 3)), (slice(None), slice(1, 5), slice(1, 3))),
+                (dict(z=3), (3,)),
+                (dict(z=-1, x=2), (-1, slice(None), 2)),
+                (dict(z=slice(None, None, 3), x=slice(3, 0, -2)), (slice(None, None, 3), slice(None), slice(3, 0, -2))),
+                (dict(z=slice(5, 5)), (slice(5, 5),)),
+                (dict(), tuple()),
+            ]:
+                # use a fresh stream so that the region is read from the file
+                stream = AmiraFile(os.path.join(TEST_DATA_PATH, fn)).data_streams.Data
+                region = stream.read_region(**kwargs)
+                self.assertFalse(stream.is_loaded)
+                self.assertEqual(region.shape, data[index].shape)
+                self.assertTrue(numpy.array_equal(region, data[index]))
+        with self.assertRaises(IndexError):
+            af.data_streams.Data.read_region(z=8)
+        with self.assertRaises(TypeError):
+            af.data_streams.Data.read_region(z=[1, 2])
+
+    def test_read_region_compressed(self):
+        """Compressed streams are sliced from the decoded data"""
+        af = AmiraFile(os.path.join(TEST_DATA_PATH, 'test9.am'))
+        region = af.data_streams.Labels.read_region(z=slice(100, 140), y=slice(10, 20))
+        self.assertTrue(numpy.array_equal(region, af.data_streams.Labels.data[100:140, 10:20]))
+
+
+class TestHxZipStreams(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_hxzip(self):
+        """HxZip streams are inflated in chunks into a preallocated array"""
+        array = numpy.arange(10 * 12 * 14, dtype='<f4').reshape(14, 12, 10) % 17
+        fn = os.path.join(self.tmp, 'hxzip.am')
+        _write_lattice(fn, array, 'HxZip', zlib.compress(array.tobytes()))
+        af = AmiraFile(fn)
+        self.assertEqual(af.data_streams.Data.data.shape, (14, 12, 10))
+        self.assertTrue(numpy.array_equal(af.data_streams.Data.data, array))
+        # the explicit read/get_data path gives the same result
+        stream = AmiraFile(fn).data_streams.Data
+        stream.read()
+        self.assertTrue(numpy.array_equal(stream.get_data(), array))
+
+    def test_hxzip_decode_into(self):
+        """Inflating in small chunks gives the same result"""
+        raw = numpy.random.randint(0, 4, 100000).astype(numpy.uint8).tobytes()
+        compressed = zlib.compress(raw)
+        output = numpy.empty(len(raw), dtype=numpy.uint8)
+        data_stream.hxzip_decode_into(data_stream._iter_buffer_chunks(compressed, 1000), output, chunk_size=777)
+        self.assertEqual(output.tobytes(), raw)
+        with self.assertRaises(ValueError):
+            data_stream.hxzip_decode_into([compressed], numpy.empty(len(raw) + 1, dtype=numpy.uint8))
+
+    def test_hxzip_checkpoints(self):
+        """Regions of HxZip streams are inflated from the nearest checkpoint"""
+        array = (numpy.random.rand(20, 16, 12) * 5).astype('<f4')
+        fn = os.path.join(self.tmp, 'hxzip.am')
+        _write_lattice(fn, array, 'HxZip', zlib.compress(array.tobytes()))
+        slice_size = 16 * 12 * 4
+        # regions requested before a full decode build the index as far as they go
+        stream = AmiraFile(fn).data_streams.Data
+        stream._index = data_stream.HxZipIndex(interval=slice_size)
+        self.assertTrue(numpy.array_equal(stream.read_region(z=slice(3, 5), x=2), array[3:5, :, 2]))
+        self.assertFalse(stream.is_loaded)
+        self.assertEqual(len(stream.checkpoint_index), 6)
+        # a full decode completes the index
+        stream = AmiraFile(fn).data_streams.Data
+        stream._index = data_stream.HxZipIndex(interval=slice_size)
+        self.assertTrue(numpy.array_equal(stream.data, array))
+        self.assertEqual(len(stream.checkpoint_index), 21)
+        stream.unload()
+        self.assertEqual(stream.checkpoint_index.nearest(slice_size * 12 + 5)[1], slice_size * 12)
+        for kwargs, index in [
+            (dict(z=slice(12, 15)), (slice(12, 15),)),
+            (dict(z=-1, y=slice(2, 9)), (-1, slice(2, 9))),
+            (dict(z=slice(18, 1, -4)), (slice(18, 1, -4),)),
+            (dict(z=slice(4, 4)), (slice(4, 4),)),
+        ]:
+            region = stream.read_region(**kwargs)
+            self.assertEqual(region.shape, array[index].shape)
+            self.assertTrue(numpy.array_equal(region, array[index]))
+        self.assertFalse(stream.is_loaded)
+
+
+class TestHxByteRLEStreams(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fn = os.path.join(TEST_DATA_PATH, 'test9.am')
+        cls.labels = AmiraFile(cls.fn).data_streams.Labels.data
+
+    def test_checkpoints(self):
+        """Checkpoints are at run boundaries so that every span decodes exactly"""
+        stream = AmiraFile(self.fn).data_streams.Labels
+        offset, length = stream._header.data_stream_offsets[1]
+        with open(self.fn, 'rb') as f:
+            f.seek(offset)
+            encoded = f.read(length)
+        checkpoints = data_stream.hxbyterle_checkpoints(encoded, interval=50000)
+        self.assertEqual(checkpoints[0], (0, 0))
+        self.assertEqual(checkpoints[-1], (length, self.labels.size))
+        for (i0, o0), (i1, o1) in zip(checkpoints[:-1], checkpoints[1:]):
+            self.assertTrue(o1 // 50000 > o0 // 50000 or o1 == self.labels.size)
+            decoded = data_stream.hxbyterle_decode(encoded[i0:i1], o1 - o0)
+            self.assertTrue(numpy.array_equal(decoded, self.labels.ravel()[o0:o1]))
+
+    def test_run_offsets(self):
+        """Runs are located in place, also in memory-mapped streams"""
+        def scan(encoded):
+            encoded = bytearray(encoded)
+            offsets = list()
+            i = 0
+            while i < len(encoded):
+                offsets.append(i)
+                i += (encoded[i] & 0x7f) + 1 if encoded[i] > 127 else 2
+            return offsets
+
+        random = numpy.random.RandomState(0)
+        for size in [0, 1, 2, 3, 1000, 12345]:
+            encoded = random.randint(0, 256, size).astype(numpy.uint8).tobytes()
+            offsets = data_stream.byterle_run_offsets(encoded)
+            self.assertEqual(offsets.dtype, numpy.int64)
+            self.assertEqual(offsets.tolist(), scan(encoded))
+        stream = AmiraFile(self.fn).data_streams.Labels
+        offset, length = stream._header.data_stream_offsets[1]
+        mapped = numpy.memmap(self.fn, dtype=numpy.uint8, mode='r', offset=offset, shape=(length,))
+        offsets = data_stream.byterle_run_offsets(mapped)
+        self.assertEqual(offsets.tolist(), scan(mapped))
+        del mapped
+
+    def test_read_region(self):
+        """Slabs of HxByteRLE streams are decoded from the enclosing checkpoints only"""
+        stream = AmiraFile(self.fn).data_streams.Labels
+        self.assertIsInstance(stream.checkpoint_index, data_stream.HxByteRLEIndex)
+        for kwargs, index in [
+            (dict(z=slice(100, 140)), (slice(100, 140),)),
+            (dict(z=283, y=slice(10, 20), x=5), (283, slice(10, 20), 5)),
+            (dict(z=slice(None, None, 50)), (slice(None, None, 50),)),
+            (dict(z=slice(0, 0)), (slice(0, 0),)),
+        ]:
+            region = stream.read_region(**kwargs)
+            self.assertEqual(region.shape, self.labels[index].shape)
+            self.assertTrue(numpy.array_equal(region, self.labels[index]))
+        self.assertFalse(stream.is_loaded)
+
+    def test_numpy_decoder(self):
+        """The NumPy decoder gives the same result as the selected decoder"""
+        stream = AmiraFile(self.fn).data_streams.Labels
+        stream.read()
+        decoded = data_stream.hxbyterle_decode_numpy(stream._stream_data, self.labels.size)
+        self.assertEqual(decoded.dtype, numpy.uint8)
+        self.assertTrue(numpy.array_equal(decoded, self.labels.ravel()))
+        # random mix of literal and repeated runs
+        rng = numpy.random.RandomState(0)
+        encoded, expected = bytearray(), bytearray()
+        for _ in range(1000):
+            no = int(rng.randint(0, 128))
+            if rng.rand() < 0.5:
+                payload = bytearray(rng.randint(0, 256, no).astype(numpy.uint8).tobytes())
+                encoded += bytearray([no | 0x80]) + payload
+                expected += payload
+            else:
+                value = int(rng.randint(0, 256))
+                encoded += bytearray([no, value])
+                expected += bytearray([value] * no)
+        decoded = data_stream.hxbyterle_decode_numpy(bytes(encoded), len(expected))
+        self.assertEqual(decoded.tobytes(), bytes(expected))
+        with self.assertRaises(ValueError):
+            data_stream.hxbyterle_decode_numpy(bytes(encoded), len(expected) + 1)
+        # a stream missing the value byte of its last repeated run is rejected (as by the C decoder)
+        truncated = bytes(encoded + bytearray([5]))
+        with self.assertRaises(ValueError):
+            data_stream.hxbyterle_decode_numpy(truncated, len(expected) + 5)
+        truncated = bytes(encoded + bytearray([0x83, 1, 2]))
+        with self.assertRaises(ValueError):
+            data_stream.hxbyterle_decode_numpy(truncated, len(expected) + 3)
+        # the value byte of a terminating empty run may be absent
+        decoded = data_stream.hxbyterle_decode_numpy(bytes(encoded + bytearray([0])), len(expected))
+        self.assertEqual(decoded.tobytes(), bytes(expected))
+
+    def test_truncated_stream(self):
+        """Streams which end at a run boundary before the output is filled are rejected by the C-ext."""
+        try:
+            from ahds import decoders
+        except ImportError:
+            self.skipTest("C-extension not built")
+        stream = AmiraFile(self.fn).data_streams.Labels
+        stream.read()
+        encoded = bytes(stream._stream_data)
+        input_end, output_end = data_stream.hxbyterle_checkpoints(encoded, interval=50000)[1]
+        with self.assertRaises(ValueError):
+            decoders.byterle_decoder_into(encoded[:input_end], numpy.empty(output_end + 1, dtype=numpy.uint8))
+        with self.assertRaises(ValueError):
+            stream._decode(encoded[:input_end])
+        # the same bytes decode into an output of the size they decode to
+        output = numpy.empty(output_end, dtype=numpy.uint8)
+        self.assertEqual(decoders.byterle_decoder_into(encoded[:input_end], output), output_end)
+        self.assertTrue(numpy.array_equal(output, self.labels.ravel()[:output_end]))
+
+    def test_decode_into(self):
+        """Streams decode from any buffer into a preallocated array, also from several threads at once"""
+        import threading
+        stream = AmiraFile(self.fn).data_streams.Labels
+        stream.read()
+        output = numpy.empty(self.labels.size, dtype=numpy.uint8)
+        size = data_stream.hxbyterle_decode_into(memoryview(bytearray(stream._stream_data)), output)
+        self.assertEqual(size, self.labels.size)
+        self.assertTrue(numpy.array_equal(output, self.labels.ravel()))
+        decoded = data_stream.hxbyterle_decode(memoryview(stream._stream_data), self.labels.size)
+        self.assertTrue(numpy.array_equal(decoded, self.labels.ravel()))
+        # the output must hold exactly the decoded stream
+        with self.assertRaises(ValueError):
+            data_stream.hxbyterle_decode_into(stream._stream_data, numpy.empty(self.labels.size - 1, numpy.uint8))
+        with self.assertRaises(ValueError):
+            data_stream.hxbyterle_decode(stream._stream_data, self.labels.size + 1)
+        outputs = [numpy.empty(self.labels.size, dtype=numpy.uint8) for _ in range(4)]
+        threads = [threading.Thread(target=data_stream.hxbyterle_decode_into, args=(stream._stream_data, output))
+                   for output in outputs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for output in outputs:
+            self.assertTrue(numpy.array_equal(output, self.labels.ravel()))
+
+
+class TestASCIIStreams(unittest.TestCase):
+    def setUp(self):
+        self.fn = os.path.join(TEST_DATA_PATH, 'BinaryCustomLandmarks.elm')
+
+    def test_ascii_stream(self):
+        """ASCII streams parse to the declared number of values of the declared type"""
+        af = AmiraFile(self.fn)
+        coordinates = af.data_streams.Coordinates
+        self.assertEqual(coordinates.data.dtype, numpy.float32)
+        self.assertEqual(coordinates.data.shape, (62, 3))
+        expected = numpy.array(coordinates._stream_data.split(), dtype=numpy.float64).astype(numpy.float32)
+        self.assertTrue(numpy.array_equal(coordinates.data.ravel(), expected))
+        identifiers = af.data_streams.LeadIdentifer
+        self.assertEqual(identifiers.data.dtype, numpy.int32)
+        self.assertEqual(identifiers.data.tolist(), [int(value) for value in identifiers._stream_data.split()])
+
+    def test_ascii_decode_into(self):
+        """Streams split into many chunks parse in parallel into the same array"""
+        rng = numpy.random.RandomState(0)
+        values = rng.uniform(-1000, 1000, 30000)
+        data = b'\n'.join(' '.join(repr(float(v)) for v in values[i:i + 3]).encode('ASCII')
+                          for i in range(0, len(values), 3)) + b'\n'
+        for workers in (None, 1, 4):
+            output = data_stream.ascii_decode_into(data, numpy.empty(len(values)), workers=workers, chunk_size=1000)
+            self.assertTrue(numpy.array_equal(output, values))
+        self.assertGreater(len(data_stream._ascii_chunk_bounds(data, chunk_size=1000)), 100)
+        integers = rng.randint(-2 ** 31, 2 ** 31, 20000)
+        data = b' '.join(str(i).encode('ASCII') for i in integers)
+        output = data_stream.ascii_decode_into(data, numpy.empty(len(integers), dtype=numpy.int32), workers=4,
+                                               chunk_size=1000)
+        self.assertTrue(numpy.array_equal(output, integers))
+        self.assertEqual(data_stream.ascii_token_count(memoryview(data)), len(integers))
+
+    def test_ascii_validation(self):
+        """The number of values must match the header and every value must fit the type"""
+        for workers in (1, 4):
+            for data in (b'1 2 3', b'1 2 3 4 5', b'1 2 x 4'):
+                with self.assertRaises(ValueError):
+                    data_stream.ascii_decode_into(data, numpy.empty(4, dtype=numpy.int32), workers=workers,
+                                                  chunk_size=2)
+        with self.assertRaises(ValueError):
+            data_stream.ascii_decode(b'1 256', numpy.uint8, 2)
+        with self.assertRaises(ValueError):
+            data_stream.ascii_decode(b'1 -1', numpy.uint16, 2)
+        with self.assertRaises(ValueError):
+            data_stream.ascii_decode(b'1.5', numpy.int32, 1)
+        self.assertEqual(data_stream.ascii_decode(b' \t1\r\n2  ', numpy.uint8, 2).tolist(), [1, 2])
+
+
+class TestHxSurfaceScanner(unittest.TestCase):
+    def test_binary_surface(self):
+        """Binary payloads are skipped by their size and referenced without copying"""
+        af = AmiraFile(os.path.join(TEST_DATA_PATH, 'test7.surf'))
+        vertices = af.data_streams.Data.Vertices
+        self.assertEqual(vertices.data.shape, (78030, 3))
+        self.assertEqual(len(vertices.Patches), 2)
+        self.assertEqual([patch.Triangles.length for patch in vertices.Patches], [155948, 116])
+        self.assertEqual(vertices.Patches[1].attrs()[:4],
+                         ['InnerRegion', 'OuterRegion', 'BoundaryID', 'BranchingPoints'])
+        self.assertEqual(vertices.Patches[1].InnerRegion, 'host_cell_2')
+        # all streams are views into the same buffer
+        buffers = set(id(patch.Triangles._stream_data.obj) for patch in vertices.Patches)
+        buffers.add(id(vertices._stream_data.obj))
+        self.assertEqual(len(buffers), 1)
+        with open(af.header.filename, 'rb') as f:
+            f.seek(len(af.header))
+            body = f.read()
+        surface = data_stream.scan_hxsurface(body)
+        count, (start, end) = surface['Patches'][1]['Triangles']
+        self.assertEqual(body[start - len(b'Triangles 116\n'):start], b'Triangles 116\n')
+        self.assertEqual(body[end:], b'\n}\n')
+        with self.assertRaises(ValueError):
+            data_stream.scan_hxsurface(body[:end - 1])
+
+    def test_ascii_surface(self):
+        """ASCII surfaces with boundary curves and surfaces are scanned"""
+        af = AmiraFile(os.path.join(TEST_DATA_PATH, 'full.surf'))
+        vertices = af.data_streams.Data.Vertices
+        self.assertEqual(vertices.data.shape, (6, 3))
+        self.assertEqual(vertices.BoundaryCurves, 3)
+        self.assertEqual(len(vertices.Patches), 5)
+        self.assertEqual(vertices.Patches[0].InnerRegion, 'Material1')
+        self.assertEqual(vertices.Patches[0].BoundaryCurves, 2)
+        self.assertEqual(vertices.Patches[0].Triangles.data.tolist(), [[5, 1, 3], [1, 5, 2], [5, 3, 2]])
+        af = AmiraFile(os.path.join(TEST_DATA_PATH, 'simple.surf'))
+        self.assertEqual([patch.Triangles.length for patch in af.data_streams.Data.Vertices.Patches], [7, 1, 2])
+        self.assertEqual(af.data_streams.Data.Vertices.Patches[1].Triangles.data.tolist(), [[9, 2, 1]])
+
+    def test_many_patches(self):
+        """Patch boundaries inside binary triangles do not confuse the scanner"""
+        rng = numpy.random.RandomState(0)
+        vertices = rng.rand(4, 3).astype('>f4')
+        body = b'\nVertices 4\n' + vertices.tobytes() + b'\nNBranchingPoints 0\nNVerticesOnCurves 0\n' \
+            b'BoundaryCurves 0\nPatches 500\n'
+        patches = list()
+        for i in range(500):
+            # 0x0a7d0a7b is '\n}\n{'
+            triangles = numpy.array([[1, 2, 3], [0x0a7d0a7b, i, 4]], dtype='>i4')
+            patches.append(triangles)
+            body += b'{\nInnerRegion A\nOuterRegion B\nBoundaryID 0\nBranchingPoints 0\n    \nTriangles 2\n' + \
+                triangles.tobytes() + b'\n}\n'
+        surface = data_stream.scan_hxsurface(body)
+        self.assertEqual(len(surface['Patches']), 500)
+        for patch, triangles in zip(surface['Patches'], patches):
+            count, (start, end) = patch['Triangles']
+            self.assertEqual(count, 2)
+            self.assertEqual(body[start:end], triangles.tobytes())
+
+    def test_consolidated_triangles(self):
+        """The triangles of all patches form one array of which each patch's triangles are a view"""
+        for fn in ('test7.surf', 'full.surf'):
+            patches = AmiraFile(os.path.join(TEST_DATA_PATH, fn)).data_streams.Data.Vertices.Patches
+            # decode one patch before consolidating
+            first = patches[0].Triangles.data.copy()
+            separate = [patch.Triangles._decode(patch.Triangles._stream_data) for patch in patches]
+            offsets = patches.patch_offsets
+            self.assertEqual(offsets.tolist(),
+                             [0] + numpy.cumsum([patch.Triangles.length for patch in patches]).tolist())
+            triangles = patches.triangles
+            self.assertIs(patches.triangles, triangles)
+            self.assertEqual(triangles.shape, (offsets[-1], 3))
+            self.assertTrue(numpy.array_equal(triangles, numpy.concatenate(separate)))
+            self.assertTrue(numpy.array_equal(patches[0].Triangles.data, first))
+            for i, patch in enumerate(patches):
+                self.assertTrue(numpy.shares_memory(patch.Triangles.data, triangles))
+                self.assertTrue(numpy.array_equal(patch.Triangles.data, triangles[offsets[i]:offsets[i + 1]]))
@@ -24,4 +24,55 @@ class TestGrammar(unittest.TestCase):
     def test_parse_header(self):
         self.assertTrue(len(self.parsed_header) > 0)
 
+    def test_parser_reused(self):
+        """The grammar is compiled once and parses headers concurrently with the same result"""
+        import threading
+        self.assertIs(grammar._get_parser(), grammar._get_parser())
+        fns = ['testscalar.am', 'test9.am', 'test7.surf', 'BinaryHxSpreadSheet62x200.am', 'FieldOnTetraMesh.am']
+        headers = list()
+        for fn in fns:
+            fn = os.path.join(TEST_DATA_PATH, fn)
+            headers.append(grammar.get_header(fn, grammar.detect_format(fn, verbose=False), verbose=False))
+        # the result of parsing with a freshly compiled grammar
+        expected = [grammar.Parser(grammar.amira_header_grammar).parse(
+            header, production='amira', processor=grammar.AmiraDispatchProcessor())[1] for header in headers]
+        results = [None] * (4 * len(headers))
 
+        def _parse(i):
+            results[i] = grammar.parse_header(headers[i % len(headers)])
+
+        threads = [threading.Thread(target=_parse, args=(i,)) for i in range(len(results))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # parsed headers contain arrays which do not compare with ==
+        self.assertEqual(repr(results), repr(expected * 4))
+
+    def test_locate_header(self):
+        """The end of large headers is found with small initial reads and reported as a byte offset"""
+        import tempfile
+        fn = os.path.join(TEST_DATA_PATH, 'testscalar.am')
+        with open(fn, 'rb') as f:
+            contents = f.read()
+        offset = contents.index(b'\n@1\n')
+        data, header_length = grammar.locate_header(fn, self.file_format, verbose=False)
+        self.assertEqual(header_length, offset)
+        self.assertEqual(data, contents[:offset])
+        # pad the header with a large parameter list so that the delimiter lies far beyond the first read
+        padding = b''.join(b'    Parameter' + str(i).encode('ascii') + b' ' + str(i).encode('ascii') + b',\n'
+                           for i in range(50000))
+        start = contents.index(b'Parameters {') + len(b'Parameters {\n')
+        large = contents[:start] + padding + contents[start:]
+        with tempfile.NamedTemporaryFile(suffix='.am', delete=False) as f:
+            f.write(large)
+        try:
+            for header_bytes in (100, 20000):
+                data, header_length = grammar.locate_header(f.name, self.file_format, header_bytes=header_bytes,
+                                                            verbose=False)
+                self.assertEqual(header_length, large.index(b'\n@1\n'))
+                self.assertEqual(data, large[:header_length])
+            _, parsed_data, header_length, _ = grammar.get_parsed_data(f.name, verbose=False)
+            self.assertEqual(header_length, large.index(b'\n@1\n'))
+        finally:
+            os.remove(f.name)
@@ -16,6 +16,21 @@ class TestHeaderBlock(Py23FixTestCase):
     def test_amiraheader(self):
         self.assertIsInstance(self.header, header.AmiraHeader)
 
+    def test_positional_args(self):
+        """Extra positional arguments are passed on to the parser; mmap, cache and workers are keyword-only"""
+        import ahds
+        fn = os.path.join(TEST_DATA_PATH, 'testscalar.am')
+        # format_bytes of ahds.grammar.detect_format
+        ah = header.AmiraHeader(fn, True, 100)
+        self.assertFalse(ah._mmap)
+        self.assertFalse(os.path.exists(fn + '.ahdsidx'))
+        af = ahds.AmiraFile(fn, False, 100)
+        self.assertFalse(af.header._mmap)
+        self.assertIsNone(af._workers)
+        af = ahds.AmiraFile(fn, mmap=True, workers=2)
+        self.assertTrue(af.header._mmap)
+        self.assertEqual(af._workers, 2)
+
     def test_add_attr(self):
         self.header.Parameters.add_attr('x', 10)
         self.assertTrue(hasattr(self.header.Parameters, 'x'))
@@ -26,3 +41,7 @@ class TestHeaderBlock(Py23FixTestCase):
         self.assertTrue(hasattr(self.header, 'Parameters'))
         self.assertTrue(hasattr(self.header.Parameters, 'Materials'))
         self.assertCountEqual(self.header.Parameters.Materials.ids, [3])
+        materials = self.header.Parameters.Materials
+        for material in materials:
+            self.assertIs(materials.material_dict[material.name], material)
+        self.assertCountEqual(list(materials.id_dict.keys()), [3])
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import os
+
+from . import Py23FixTestCase, TEST_DATA_PATH
+from ..core import Block, ListBlock
+from ..query import PathQuery, PathSyntaxError, Record, compile_path, extract, query
+
+
+class TestQuery(Py23FixTestCase):
+    @classmethod
+    def setUpClass(cls):
+        import ahds
+        cls.af = ahds.AmiraFile(os.path.join(TEST_DATA_PATH, 'test12.am'), load_streams=False)
+
+    def _paths(self, expression, root=None):
+        return [(record.path, record.value) for record in query(self.af if root is None else root, expression)]
+
+    def test_names(self):
+        """Dotted names select a single attribute or list item"""
+        records = query(self.af, 'header.Parameters.BoundingBox')
+        self.assertEqual(len(records), 1)
+        self.assertIsInstance(records[0], Record)
+        self.assertEqual(records[0].query, 'header.Parameters.BoundingBox')
+        self.assertEqual(records[0].path, 'header.Parameters.BoundingBox')
+        self.assertEqual(records[0].value, [118, 436, 281, 566, 0, 279])
+        # list items by name
+        self.assertEqual(self._paths('header.Parameters.Materials.Spikes.Id'),
+                         [('header.Parameters.Materials.Spikes.Id', 3)])
+        # missing names match nothing
+        self.assertEqual(query(self.af, 'header.Parameters.Nothing'), [])
+        self.assertEqual(query(self.af, 'header.Parameters.BoundingBox.Nothing'), [])
+
+    def test_wildcards(self):
+        """Wildcards select all attributes and list items or those with matching names"""
+        self.assertEqual(self._paths('header.Parameters.Materials.*.Color'), [
+            ('header.Parameters.Materials[0].Color', [0.64, 0, 0.8]),
+            ('header.Parameters.Materials[1].Color', [0.16, 0.481757, 0.8]),
+        ])
+        self.assertEqual(self._paths('*.Parameters.*Box'),
+                         [('header.Parameters.BoundingBox', [118, 436, 281, 566, 0, 279])])
+        self.assertEqual([path for path, _ in self._paths('header.Parameters.Materials.S?ikes')],
+                         ['header.Parameters.Materials[1]'])
+        # recursive descent
+        self.assertEqual(self._paths('**.Id'), [('header.Parameters.Materials[1].Id', 3)])
+        self.assertEqual(self._paths('header.**.BoundingBox'),
+                         [('header.Parameters.BoundingBox', [118, 436, 281, 566, 0, 279])])
+
+    def test_filters(self):
+        """Indices select list items and sequence elements; predicates filter blocks"""
+        self.assertEqual([path for path, _ in self._paths('header.Parameters.Materials[-1]')],
+                         ['header.Parameters.Materials[1]'])
+        self.assertEqual(self._paths('header.Parameters.Materials[0].Color[*]'), [
+            ('header.Parameters.Materials[0].Color[0]', 0.64),
+            ('header.Parameters.Materials[0].Color[1]', 0),
+            ('header.Parameters.Materials[0].Color[2]', 0.8),
+        ])
+        self.assertEqual(self._paths('header.Parameters.Materials[2]'), [])
+        self.assertEqual(self._paths('header.Parameters.Materials.*[Id>=3].name'),
+                         [('header.Parameters.Materials[1].name', 'Spikes')])
+        self.assertEqual(self._paths('header.Parameters.Materials.*[name="Inside"].Color[1]'),
+                         [('header.Parameters.Materials[0].Color[1]', 0)])
+        self.assertEqual(self._paths('header.Parameters.Materials.*[name!=Inside][Id].name'),
+                         [('header.Parameters.Materials[1].name', 'Spikes')])
+        # values which cannot be compared never match
+        self.assertEqual(self._paths('header.Parameters.Materials.*[Color>1]'), [])
+        self.assertEqual(self._paths('header.Lattice[length=5]'), [])
+
+    def test_concrete_paths(self):
+        """Concrete paths are valid expressions which select exactly the matched value"""
+        records = query(self.af, '**')
+        # the root itself has an empty path
+        self.assertEqual(records[0].path, '')
+        self.assertIs(records[0].value, self.af)
+        for record in records[1:]:
+            matches = query(self.af, record.path)
+            self.assertEqual(len(matches), 1)
+            self.assertIs(matches[0].value, record.value)
+
+    def test_compile(self):
+        """Expressions are compiled once and syntax errors are reported"""
+        self.assertIs(compile_path('header.Parameters'), compile_path('header.Parameters'))
+        compiled = compile_path('header.*')
+        self.assertIsInstance(compiled, PathQuery)
+        self.assertIs(compile_path(compiled), compiled)
+        self.assertEqual(compiled.expression, 'header.*')
+        for expression in ['', 'a..b', 'a[', 'a[b=]x', 'a b', '.a', 'a.']:
+            with self.assertRaises(PathSyntaxError):
+                compile_path(expression)
+        # syntax errors are value errors
+        self.assertTrue(issubclass(PathSyntaxError, ValueError))
+
+    def test_extract(self):
+        """Several queries are applied to the same tree; paths may be prefixed"""
+        records = extract(self.af.header, ['Parameters.BoundingBox', 'Parameters.Materials.*.name'],
+                          path='header')
+        self.assertEqual([(record.query, record.path, record.value) for record in records], [
+            ('Parameters.BoundingBox', 'header.Parameters.BoundingBox', [118, 436, 281, 566, 0, 279]),
+            ('Parameters.Materials.*.name', 'header.Parameters.Materials[0].name', 'Inside'),
+            ('Parameters.Materials.*.name', 'header.Parameters.Materials[1].name', 'Spikes'),
+        ])
+        self.assertEqual(compile_path('Parameters.Materials.Spikes').first(self.af.header).name, 'Spikes')
+        self.assertIsNone(compile_path('Parameters.Nothing').first(self.af.header))
+        self.assertEqual(compile_path('Parameters.Materials.*.Id').values(self.af.header), [3])
+
+    def test_deep_tree(self):
+        """Recursive descent does not recurse"""
+        import sys
+        root = ListBlock('root')
+        block = root
+        for i in range(sys.getrecursionlimit() + 100):
+            child = Block('level{}'.format(i))
+            child.add_attr('Id', i)
+            block.add_attr(child)
+            block = child
+        records = query(root, '**[Id>=1000]')
+        self.assertEqual(len(records), sys.getrecursionlimit() + 100 - 1000)
+        self.assertTrue(records[0].path.startswith('level0.level1.'))
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import os
+import unittest
+
+from ahds import grammar, tokenizer
+from ahds.tests import TEST_DATA_PATH
+
+_designation = "# AmiraMesh BINARY-LITTLE-ENDIAN 2.1\n\n"
+
+# headers exercising the less common constructs
+_headers = [
+    "# AmiraMesh 3D ASCII 2.0 <hxsurface>\n",
+    "# Avizo BINARY-LITTLE-ENDIAN 2.1\n# CreationDate: Tue Nov  2 11:46:31 2004\n# some (other) comment\n\n"
+    "nNodes 10\nnTetrahedra 23685\n\nNodes { float[3] Coordinates } @1\n"
+    "TetrahedronData { int[4] Nodes } = Linear(@2)(HxZip,1234)\n\n# Data section follows",
+    _designation + "define Lattice 4 6 8\nParameters {\n    A 1.,\n    B -.5,\n    C 00,\n    D 1 -2 3.5,\n"
+    "    E \"[ Ax , Ay , Az ]\",\n    F   \" padded \",\n    G some thing  ,\n    H {\n    }\n    I { J 1 }\n}\n"
+    "Lattice { float Data } @1\n",
+    "# HyperSurface 0.1 ASCII\nParameters {\n\tInfo \"GMC: 3 colors\"\n}\nMaterials { {\n\tcolor 0.8 0.7 0.06,\n"
+    "\tName \"Yellow\"\n} {\n\tname \"Green\"\n} }\n",
+    _designation + "# 123\ndefine Lattice 4\n",  # the grammar stops at a comment not starting with a letter
+    _designation + "define Lattice 4\nParameters {\n    Multiline \"a\nb\"\n}\nLattice { byte Labels } @1(HxByteRLE,99)\n",
+]
+
+# headers which the tokenizer leaves to the grammar
+_unsupported_headers = [
+    _designation + "define Lattice 4\nParameters {\n    A 1e-5\n}\n",  # exponents
+    _designation + "define Lattice 4\nParameters {\n    A \"x(y)\"\n}\n",  # not a qstring
+    _designation + "define Lattice 4\nParameters {\n    # comment\n    A 1\n}\n",  # comment in a parameter list
+    _designation + "define Lattice 4\nParameters {\n    A\n}\n",  # missing value
+    _designation + "define Lattice 4\nLattice { float Data } @1 junk\n",  # trailing characters
+    _designation + u"define Lattice 4\nParameters {\n    A \"Å\"\n}\n",  # non-ASCII
+]
+
+
+class TestTokenizer(unittest.TestCase):
+    def assertConforms(self, data):
+        """The tokenizer produces the same parsed data as the grammar"""
+        # parsed data contains arrays which do not compare with ==
+        self.assertEqual(repr(tokenizer.parse_header(data)), repr(grammar.parse_header(data, engine='grammar')))
+
+    def test_corpus(self):
+        """Both engines agree on the headers of all test files"""
+        for fn in sorted(os.listdir(TEST_DATA_PATH)):
+            fn = os.path.join(TEST_DATA_PATH, fn)
+            data = grammar.get_header(fn, grammar.detect_format(fn, verbose=False), verbose=False)
+            self.assertConforms(data)
+
+    def test_constructs(self):
+        """Both engines agree on less common constructs"""
+        for data in _headers:
+            self.assertConforms(data)
+
+    def test_fallback(self):
+        """Unsupported headers are parsed by the grammar"""
+        for data in _unsupported_headers:
+            with self.assertRaises(tokenizer.UnsupportedHeader):
+                tokenizer.parse_header(data)
+            self.assertEqual(repr(grammar.parse_header(data)), repr(grammar.parse_header(data, engine='grammar')))
+        with self.assertRaises(ValueError):
+            grammar.parse_header(_headers[0], engine='unknown')
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+tokenizer
+=========
+
+A single-pass, regular-expression based parser for Amira (R) headers.
+
+The EBNF grammar in :py:mod:`ahds.grammar` is general but slow: most of the time spent parsing a header goes
+into ``simpleparse`` and the dispatch methods of :py:class:`ahds.proc.AmiraDispatchProcessor`. This module
+scans the header once, section by section, and produces exactly the same ``parsed_data`` structure for the
+constructs found in practically all files:
+
+*   the designation (first line);
+
+*   comments preceding the array declarations (e.g. ``# CreationDate: ...``);
+
+*   ``define <name> <dims>`` and ``n<name> <dims>`` array declarations;
+
+*   ``Parameters`` (including nested ``Materials``) and dedicated ``Materials`` sections;
+
+*   data definitions e.g. ``Lattice { byte Labels } @1(HxByteRLE,360731)``.
+
+Anything else raises :py:class:`UnsupportedHeader` so that the caller can fall back to the grammar (see
+:py:func:`ahds.grammar.parse_header`). The character classes used below mirror those of the grammar (as
+interpreted by ``simpleparse``) so that both engines agree on where every token ends.
+
+"""
+from __future__ import print_function
+
+import re
+
+import numpy as np
+
+from .proc import _compatibilitymap, materials_from_parameter_lists
+
+# grammar tokens
+_hyphname = r'[A-Za-z_&][-A-Za-z0-9_:]*(?![-A-Za-z0-9_:])'
+_number = r'-?(?:\d+\.?\d*|\.\d+)'
+# xstring in the grammar: a letter followed by any character from ' ' to '\', lowercase letters or '_'
+_xstring = r'[A-Za-z][ -\\_a-z]*'
+
+# only printable ASCII is handled; anything else is left to the grammar
+_unsupported_chars = re.compile(r'[^\t\n\x20-\x7e]')
+_tsn = re.compile(r'[ \t\n]*')
+_line_end = re.compile(r'[ \t]*(?:\n|$)')
+_designations = (
+    re.compile(
+        r'#[ \t]*(?P<filetype>AmiraMesh|HyperSurface|Avizo)[ \t]*(?P<dimension>3D)?[ \t]*'
+        r'(?P<format>BINARY-LITTLE-ENDIAN|BINARY|ASCII)[ \t]*(?P<version>' + _number + r')[ \t]*'
+        r'(?P<extra_format><hxsurface>)?'
+    ),
+    re.compile(
+        r'#[ \t]*(?P<filetype>AmiraMesh|HyperSurface|Avizo)[ \t]*(?P<version>' + _number + r')[ \t]*'
+        r'(?P<format>BINARY-LITTLE-ENDIAN|BINARY|ASCII)'
+    ),
+)
+_comment = re.compile(
+    r'[ \t]*#[ \t]*(?:CreationDate:[ \t]*(?P<date>' + _xstring + r')|(?P<xstring>' + _xstring + r'))'
+)
+_array_declaration = re.compile(
+    r'(?:define[ \t]*(?P<define_name>' + _hyphname + r')|n(?P<n_name>' + _hyphname + r'))[ \t]*'
+    r'(?P<array_dimension>\d+(?:[ \t]+\d+)*)'
+)
+_parameters = re.compile(r'Parameters[ \t]*(?=\{)')
+_materials = re.compile(r'Materials[ \t\n]*(?=\{)')
+_parameter_name = re.compile(r'(?P<name>' + _hyphname + r')(?=[ \t{])[ \t]*')
+_number_seq = re.compile(_number + r'(?:[ \t]+' + _number + r')*')
+_qstring = re.compile(r'"\[*[ $,\-./0-9:;A-Za-z_\n]*\]*"')
+_attribute_xstring = re.compile(_xstring)
+_value_end = re.compile(r',*[ \t\n]*')
+_data_definition = re.compile(
+    r'(?P<array_reference>' + _hyphname + r')[ \t]*\{[ \t]*(?P<data_type>' + _hyphname + r')'
+    r'\[*(?P<data_dimension>\d+)?\]*[ \t]*(?P<data_name>' + _hyphname + r')[ \t]*\}[ \t]*=*[ \t]*'
+    r'(?P<interpolation_method>Linear|Constant|EdgeElem)?\(*@(?P<data_index>\d+)(?!\d)\)*'
+    r'\(*(?P<data_format>HxByteRLE|HxZip)?,*(?P<data_length>\d+)?(?!\d)\)*'
+)
+
+
+class UnsupportedHeader(ValueError):
+    """Raised for headers (or parts thereof) which should be parsed by the grammar"""
+
+
+def _to_number(token):
+    """Convert a number token the same way as the grammar: ints without a decimal point, floats otherwise"""
+    if '.' in token:
+        return float(token)
+    return int(token)
+
+
+def _parse_value(data, pos):
+    """Parse a parameter value starting at ``pos``
+
+    :return tuple result: the value and the position following it
+    """
+    if data.startswith('{', pos):
+        return _parse_parameter_list(data, pos)
+    # inline_parameter_value: a sequence of numbers...
+    match = _number_seq.match(data, pos)
+    if match is not None:
+        numbers = [_to_number(token) for token in match.group(0).split()]
+        if len(numbers) == 1:
+            return numbers[0], match.end()
+        return ['<!?c?!>'] + numbers, match.end()
+    # ...or a quoted string
+    match = _qstring.match(data, pos)
+    if match is not None:
+        return match.group(0).strip(' \t\n\r\f"'), match.end()
+    if data.startswith('"', pos):
+        raise UnsupportedHeader("unsupported quoted string at {}".format(pos))
+    # attribute_value consisting of a single unquoted string which extends to the end of the line
+    match = _attribute_xstring.match(data, pos)
+    if match is not None and (match.end() == len(data) or data[match.end()] in '\n}'):
+        return match.group(0), match.end()
+    raise UnsupportedHeader("unsupported parameter value at {}".format(pos))
+
+
+def _parse_parameter_list(data, pos):
+    """Parse a ``{ ... }`` parameter list starting at ``pos``
+
+    :return tuple result: the list of parameters and the position following the closing brace
+    """
+    pos = _tsn.match(data, pos + 1).end()
+    parameters = list()
+    while True:
+        if data.startswith('}', pos):
+            return parameters, pos + 1
+        match = _parameter_name.match(data, pos)
+        if match is None:
+            raise UnsupportedHeader("unsupported parameter at {}".format(pos))
+        value, pos = _parse_value(data, match.end())
+        # the value must be followed by a separator or the end of the list
+        if pos < len(data) and data[pos] not in ', \t\n}':
+            raise UnsupportedHeader("unsupported parameter value at {}".format(pos))
+        parameters.append({'parameter_name': match.group('name'), 'parameter_value': value})
+        pos = _value_end.match(data, pos).end()
+
+
+def _match_line(regex, data, pos):
+    """Match ``regex`` at ``pos`` provided that the match extends to the end of the line
+
+    :return tuple result: the match (or ``None``) and the position following the line and any blank lines
+    """
+    match = regex.match(data, pos)
+    if match is None:
+        return None, pos
+    end = _line_end.match(data, match.end())
+    if end is None:
+        raise UnsupportedHeader("unsupported trailing characters at {}".format(match.end()))
+    return match, _tsn.match(data, end.end()).end()
+
+
+def parse_header(data):
+    """Parse an Amira (R) header into the same structure as :py:func:`ahds.grammar.parse_header`
+
+    :param str data: the header as returned by :py:func:`ahds.grammar.get_header`
+    :return list parsed_data: structured metadata
+    :raises UnsupportedHeader: if the header contains anything which is not understood
+    """
+    if _unsupported_chars.search(data):
+        raise UnsupportedHeader("header contains non-ASCII or control characters")
+    parsed_data = list()
+    # designation
+    for regex in _designations:
+        match, pos = _match_line(regex, data, 0)
+        if match is not None:
+            break
+    else:
+        raise UnsupportedHeader("unsupported designation")
+    parsed_data.append({'designation': dict(
+        (key, value) for key, value in match.groupdict().items() if value is not None
+    )})
+    # comments
+    while True:
+        match, pos = _match_line(_comment, data, pos)
+        if match is None:
+            break
+        parsed_data.append({'comment': dict(
+            (key, value) for key, value in match.groupdict().items() if value is not None
+        )})
+    # array declarations
+    array_declarations = list()
+    while True:
+        match, pos = _match_line(_array_declaration, data, pos)
+        if match is None:
+            break
+        dimensions = [int(dimension) for dimension in match.group('array_dimension').split()]
+        array_declarations.append({
+            'array_name': match.group('define_name') or match.group('n_name'),
+            'array_dimension': dimensions[0] if len(dimensions) == 1 else np.array(dimensions, dtype=np.int64),
+        })
+    parsed_data.append({'array_declarations': array_declarations})
+    # parameters
+    while True:
+        match = _parameters.match(data, pos)
+        if match is None:
+            break
+        parameters, pos = _parse_parameter_list(data, match.end())
+        parsed_data.append({'parameters': parameters})
+        pos = _tsn.match(data, pos).end()
+    # dedicated materials sections
+    while True:
+        match = _materials.match(data, pos)
+        if match is None:
+            break
+        pos = _tsn.match(data, match.end() + 1).end()
+        parameter_lists = list()
+        while data.startswith('{', pos):
+            parameter_list, pos = _parse_parameter_list(data, pos)
+            parameter_lists.append(parameter_list)
+            pos = _tsn.match(data, pos).end()
+        if not parameter_lists or not data.startswith('}', pos):
+            raise UnsupportedHeader("unsupported Materials section at {}".format(pos))
+        try:
+            parsed_data.append({'materials': materials_from_parameter_lists(parameter_lists)})
+        except (IndexError, KeyError, TypeError):
+            raise UnsupportedHeader("unsupported Materials section at {}".format(pos))
+        pos = _tsn.match(data, pos + 1).end()
+    # data definitions
+    data_definitions = list()
+    while True:
+        match, pos = _match_line(_data_definition, data, pos)
+        if match is None:
+            break
+        data_definition = dict()
+        for key, value in match.groupdict().items():
+            if value is None:
+                continue
+            if key in ('data_dimension', 'data_index', 'data_length'):
+                value = int(value)
+            elif key == 'array_reference':
+                value = _compatibilitymap.get(value, value)
+            data_definition[key] = value
+        data_definitions.append(data_definition)
+    parsed_data.append({'data_definitions': data_definitions})
+    # the grammar ignores whatever follows the data definitions; only comments are accepted here
+    if pos < len(data) and not data.startswith('#', pos):
+        raise UnsupportedHeader("unsupported content at {}".format(pos))
+    return parsed_data
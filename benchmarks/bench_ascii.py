@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+ASCII stream parser benchmark
+=============================
+
+Compares ``np.fromstring(data, sep=...)`` (previously used for ASCII streams) with
+:py:func:`ahds.data_stream.ascii_decode` on a synthetic ASCII vertex stream of ``--values``
+random ``float`` values written three per line as by Amira (R).
+
+::
+
+    python benchmarks/bench_ascii.py --values 3000000 --workers 4
+
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ahds import data_stream  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the ASCII stream parsers')
+    parser.add_argument('--values', type=int, default=3000000, help='number of values [default: 3000000]')
+    parser.add_argument('--workers', type=int, default=None, help='number of threads [default: one per CPU]')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions [default: 3]')
+    return parser.parse_args()
+
+
+def fromstring(data, count):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return np.fromstring(data, dtype=np.float32, sep="\n \t")
+
+
+def main():
+    args = parse_args()
+    values = np.random.RandomState(0).uniform(-1, 1, args.values - args.values % 3).astype(np.float32)
+    data = '\n'.join(
+        '\t{:f} {:f} {:f}'.format(*values[i:i + 3]) for i in range(0, len(values), 3)).encode('ASCII')
+    print("input: {:.1f} MB, {} values".format(len(data) / 1e6, len(values)))
+    parsers = [
+        ('fromstring', fromstring),
+        ('ascii_decode', lambda data, count: data_stream.ascii_decode(data, np.float32, count, workers=args.workers)),
+    ]
+    timings = dict()
+    for name, parser in parsers:
+        timings[name] = min(timeit.repeat(lambda: parser(data, len(values)), number=1, repeat=args.repeat))
+        print("{:>12}: {:8.4f} s ({:8.1f} MB/s)".format(name, timings[name], len(data) / timings[name] / 1e6))
+    print("fromstring/ascii_decode: {:.2f}x".format(timings['fromstring'] / timings['ascii_decode']))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
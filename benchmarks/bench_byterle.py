@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+HxByteRLE decoder benchmark
+===========================
+
+Compares the C-extension decoder (``ahds.decoders``) with the vectorised NumPy fallback on the label
+stream of ``ahds/data/test9.am`` repeated ``--copies`` times (HxByteRLE streams may be concatenated
+at run boundaries once the terminating empty run is dropped).
+
+::
+
+    python benchmarks/bench_byterle.py --copies 20
+
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ahds import AmiraFile, data_stream  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the HxByteRLE decoders')
+    parser.add_argument('--copies', type=int, default=20, help='number of copies of the test stream [default: 20]')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed repetitions [default: 5]')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    fn = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ahds', 'data', 'test9.am')
+    labels = AmiraFile(fn).data_streams.Labels
+    labels.read()
+    offsets, lengths, _ = data_stream._hxbyterle_runs(labels._stream_data)
+    # drop the terminating empty run so that the copies stay aligned on control bytes
+    end = int(offsets[-1]) if len(lengths) and lengths[-1] == 0 else len(labels._stream_data)
+    encoded = labels._stream_data[:end] * args.copies
+    output_size = int(labels.data.size) * args.copies
+    print("input: {:.1f} MB encoded, {:.1f} MB decoded".format(len(encoded) / 1e6, output_size / 1e6))
+    decoders = [('numpy', data_stream.hxbyterle_decode_numpy)]
+    try:
+        from ahds.decoders import byterle_decoder
+        decoders.insert(0, ('C', byterle_decoder))
+    except ImportError:
+        print("C-extension unavailable")
+    timings = dict()
+    for name, decoder in decoders:
+        timings[name] = min(timeit.repeat(lambda: decoder(encoded, output_size), number=1, repeat=args.repeat))
+        print("{:>6}: {:8.4f} s ({:8.1f} MB/s)".format(name, timings[name], output_size / timings[name] / 1e6))
+    if 'C' in timings:
+        print("numpy/C: {:.2f}x".format(timings['numpy'] / timings['C']))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Header parsing benchmark
+========================
+
+Per-file header latency over the files in ``ahds/data`` (or those given on the command line) when the
+grammar is compiled for every file (as previously done by ``grammar.parse_header``), when the compiled
+grammar is reused and when the header is parsed by the fast tokenizer (the default engine).
+
+::
+
+    python benchmarks/bench_header.py --repeat 20
+
+"""
+from __future__ import print_function
+
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ahds import grammar  # noqa: E402
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ahds', 'data')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark header parsing')
+    parser.add_argument('files', nargs='*', help='files to parse [default: ahds/data/*.am and *.surf]')
+    parser.add_argument('--repeat', type=int, default=20, help='number of timed repetitions [default: 20]')
+    return parser.parse_args()
+
+
+def parse_header_compiled_per_call(data):
+    """The previous implementation: compile the grammar for every header"""
+    parser = grammar.Parser(grammar.amira_header_grammar)
+    return parser.parse(data, production='amira', processor=grammar.AmiraDispatchProcessor())[1]
+
+
+def main():
+    args = parse_args()
+    fns = args.files or sorted(glob.glob(os.path.join(DATA_PATH, '*.am')) + glob.glob(os.path.join(DATA_PATH, '*.surf')))
+    headers = list()
+    for fn in fns:
+        try:
+            headers.append((fn, grammar.get_header(fn, grammar.detect_format(fn, verbose=False), verbose=False)))
+        except Exception as e:
+            print("skipping {}: {}".format(fn, e), file=sys.stderr)
+    # compile once outside the timings
+    grammar.parse_header(headers[0][1], engine='grammar')
+    row = "{:<32} {:>8} {:>12} {:>12} {:>14} {:>8}"
+    print(row.format('file', 'bytes', 'before (ms)', 'grammar (ms)', 'tokenizer (ms)', 'speedup'))
+    row = "{:<32} {:>8} {:>12.3f} {:>12.3f} {:>14.3f} {:>7.1f}x"
+    totals = [0, 0, 0]
+    for fn, data in headers:
+        timings = [
+            min(timeit.repeat(lambda: parse(data), number=1, repeat=args.repeat)) for parse in (
+                parse_header_compiled_per_call,
+                lambda data: grammar.parse_header(data, engine='grammar'),
+                lambda data: grammar.parse_header(data, engine='auto'),
+            )
+        ]
+        totals = [total + timing for total, timing in zip(totals, timings)]
+        print(row.format(os.path.basename(fn)[:32], len(data), *[timing * 1e3 for timing in timings] +
+                         [timings[0] / timings[2]]))
+    print(row.format('mean', '', *[total / len(headers) * 1e3 for total in totals] + [totals[0] / totals[2]]))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
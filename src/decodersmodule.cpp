@@ -13,6 +13,10 @@
 #define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION // to avoid complaint
 #include <numpy/arrayobject.h> // the numpy array object definitions
 
+#include <errno.h>
+#include <limits.h>
+#include <stdlib.h>
+
 // typedefs
 typedef unsigned long ulong;
 typedef unsigned char uchar;
@@ -38,15 +42,57 @@ static int myextension_clear(PyObject *m) {
 static struct module_state _state;
 #endif
 
+// return codes of byterle_decode_buffer
+#define BYTERLE_OK 0
+#define BYTERLE_OVERFLOW 1 // the decoded stream does not fit into the output
+#define BYTERLE_TRUNCATED 2 // the input ends in the middle of a run
+
+// the number of encoded bytes of the run beginning with the control byte n
+#define BYTERLE_RUN_SIZE(n) ((n) > 127 ? ((n) & 0x7f) + 1 : 2)
+
+// return codes of ascii_decode_buffer
+#define ASCII_OK 0
+#define ASCII_OVERFLOW 1 // the stream has more values than fit into the output
+#define ASCII_INVALID 2 // a token is not a number of the output type
+#define ASCII_RANGE 3 // a value does not fit into the output type
+#define ASCII_TYPE 4 // the output type is not supported
+
+// the longest token (in characters) accepted as a number
+#define ASCII_TOKEN_MAX 63
+
+// the whitespace separating values in ASCII streams (the same as bytes.split())
+#define IS_ASCII_SPACE(c) ((c) == ' ' || (c) == '\n' || (c) == '\t' || (c) == '\r' || (c) == '\v' || (c) == '\f')
+
 // prototypes
 static PyObject *decoders_byterle_decode(PyObject *, PyObject *);
-static void get_multiple(uchar *, uchar *, ulong, ulong);
-static void set_multiple_diff(uchar *, uchar *, ulong, ulong);
-static void set_multiple_same(uchar *, uchar, ulong, ulong);
+static PyObject *decoders_byterle_decode_into(PyObject *, PyObject *);
+static PyObject *decoders_byterle_run_offsets(PyObject *, PyObject *);
+static PyObject *decoders_ascii_decode_into(PyObject *, PyObject *);
+static PyObject *decoders_ascii_token_count(PyObject *, PyObject *);
+static int byterle_decode_buffer(const uchar *, Py_ssize_t, uchar *, Py_ssize_t, Py_ssize_t *);
+static void byterle_set_error(int, Py_ssize_t, Py_ssize_t);
+static int ascii_decode_buffer(const char *, Py_ssize_t, char, void *, Py_ssize_t, Py_ssize_t *, Py_ssize_t *);
+static int ascii_store(const char *, char, void *, Py_ssize_t);
+static Py_ssize_t ascii_count_tokens(const char *, Py_ssize_t);
+
+// format for a read-only buffer argument
+#if PY_MAJOR_VERSION >= 3
+#define READ_BUFFER_FORMAT "y*"
+#else
+#define READ_BUFFER_FORMAT "s*"
+#endif
 
 // methods in this module
 static PyMethodDef HxMethods[] = {
 	{"byterle_decoder", (PyCFunction)decoders_byterle_decode, METH_VARARGS, "Decode byte RLE stream."},
+	{"byterle_decoder_into", (PyCFunction)decoders_byterle_decode_into, METH_VARARGS,
+	    "Decode byte RLE stream into a writable buffer; returns the number of bytes decoded."},
+	{"byterle_run_offsets", (PyCFunction)decoders_byterle_run_offsets, METH_VARARGS,
+	    "Locate the control bytes of the runs of a byte RLE stream; returns an array of their offsets."},
+	{"ascii_decoder_into", (PyCFunction)decoders_ascii_decode_into, METH_VARARGS,
+	    "Parse whitespace separated numbers into a writable buffer of the given type code; returns the number of values."},
+	{"ascii_token_count", (PyCFunction)decoders_ascii_token_count, METH_VARARGS,
+	    "Count the whitespace separated tokens in a buffer."},
 	{NULL, NULL, 0, NULL}
 };
 
@@ -110,95 +156,363 @@ initdecoders(void)
 static PyObject *
 decoders_byterle_decode(PyObject *self, PyObject *args)
 {
-	ulong input_size, output_size=0;
-	uchar *input;
+	Py_buffer input;
+	ulong output_size=0;
+	Py_ssize_t written=0;
+	int status;
+
+	// Python usage: hx.byterle_decoder(input, output_size)
+	// input may be any object supporting the buffer protocol e.g. bytes, bytearray, memoryview or mmap
+	if (!PyArg_ParseTuple(args, READ_BUFFER_FORMAT "k", &input, &output_size))
+		return NULL;
 
-	// Python usage: hx.byterle_decode(input, output_size)
-	if (!PyArg_ParseTuple(args, "s#k", &input, &input_size, &output_size))
+	// the array owns its memory so that it is released together with the array
+	npy_intp dims[1] = {static_cast<npy_intp>(output_size)};
+	PyObject *output_array = PyArray_SimpleNew(1, dims, NPY_UINT8);
+	if (output_array == NULL) {
+		PyBuffer_Release(&input);
 		return NULL;
+	}
+
+	uchar *output = (uchar *)PyArray_DATA((PyArrayObject *)output_array);
+	Py_BEGIN_ALLOW_THREADS
+	status = byterle_decode_buffer((const uchar *)input.buf, input.len, output, (Py_ssize_t)output_size, &written);
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&input);
+
+	if (status == BYTERLE_OK && written != (Py_ssize_t)output_size)
+		status = BYTERLE_TRUNCATED;
+	if (status != BYTERLE_OK) {
+		Py_DECREF(output_array);
+		byterle_set_error(status, written, (Py_ssize_t)output_size);
+		return NULL;
+	}
+	return output_array;
+}
+
+static PyObject *
+decoders_byterle_decode_into(PyObject *self, PyObject *args)
+{
+	Py_buffer input, output;
+	Py_ssize_t written=0;
+	int status;
+
+	// Python usage: hx.byterle_decoder_into(input, output)
+	// input is any buffer; output is any writable contiguous buffer e.g. a bytearray or a np.uint8 array
+	if (!PyArg_ParseTuple(args, READ_BUFFER_FORMAT "w*", &input, &output))
+		return NULL;
+
+	Py_BEGIN_ALLOW_THREADS
+	status = byterle_decode_buffer((const uchar *)input.buf, input.len, (uchar *)output.buf, output.len, &written);
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&input);
+	PyBuffer_Release(&output);
+
+	// the output must be filled completely; its tail would be left uninitialised otherwise
+	if (status == BYTERLE_OK && written != output.len)
+		status = BYTERLE_TRUNCATED;
+	if (status != BYTERLE_OK) {
+		byterle_set_error(status, written, output.len);
+		return NULL;
+	}
+	return PyLong_FromSsize_t(written);
+}
+
+static PyObject *
+decoders_byterle_run_offsets(PyObject *self, PyObject *args)
+{
+	Py_buffer input;
+	Py_ssize_t i, n, count=0;
+
+	// Python usage: hx.byterle_run_offsets(input)
+	// input is scanned in place (e.g. an mmap or np.memmap) in two passes: the runs are counted and then located
+	if (!PyArg_ParseTuple(args, READ_BUFFER_FORMAT, &input))
+		return NULL;
+	const uchar *data = (const uchar *)input.buf;
+
+	Py_BEGIN_ALLOW_THREADS
+	for (i = 0; i < input.len; count++)
+		i += BYTERLE_RUN_SIZE(data[i]);
+	Py_END_ALLOW_THREADS
+
+	npy_intp dims[1] = {static_cast<npy_intp>(count)};
+	PyObject *offsets_array = PyArray_SimpleNew(1, dims, NPY_INT64);
+	if (offsets_array == NULL) {
+		PyBuffer_Release(&input);
+		return NULL;
+	}
+
+	npy_int64 *offsets = (npy_int64 *)PyArray_DATA((PyArrayObject *)offsets_array);
+	Py_BEGIN_ALLOW_THREADS
+	for (i = 0, n = 0; i < input.len; n++) {
+		offsets[n] = i;
+		i += BYTERLE_RUN_SIZE(data[i]);
+	}
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&input);
+	return offsets_array;
+}
 
-	uchar *output = PyMem_New(uchar, output_size);
-	ulong i=0, j=0;
-	int count=1, repeat=0; // count/repeat: true = 1; false = 0
-	uchar no=0;
-
-	// two state machine that oscillates between getting counts and getting data
-	while (i < input_size) { // while we still have some input
-		if (count) { // get count
-			no = input[i];
-			// determine if this is a repeat or a non-repeat
-			if (no > 127) {
-				no &= 0x7f; // 2's complement
-				count = 0;
-				repeat = 1;
-				i++;
+static int
+byterle_decode_buffer(const uchar *input, Py_ssize_t input_size, uchar *output, Py_ssize_t output_size,
+                      Py_ssize_t *written)
+{
+	/*
+	 * Decode an HxByteRLE stream without touching any Python objects (may run without the GIL)
+	 *
+	 * A control byte n > 127 is followed by (n & 0x7f) literal bytes; a control byte n <= 127 is followed by a
+	 * single byte which is repeated n times.
+	 */
+	Py_ssize_t i=0, j=0;
+	Py_ssize_t no;
+
+	while (i < input_size) {
+		no = input[i++];
+		if (no > 127) { // literal run
+			no &= 0x7f;
+			if (i + no > input_size) {
+				*written = j;
+				return BYTERLE_TRUNCATED;
 			}
-			else {
-				i++;
-				count = 0;
-				repeat = 0;
+			if (j + no > output_size) {
+				*written = j;
+				return BYTERLE_OVERFLOW;
 			}
+			memcpy(output + j, input + i, no);
+			i += no;
 		}
-		else { // get data
-			if (repeat) {
-				if (no > 0) {
-					uchar *value = (uchar *)malloc(no*sizeof(uchar));
-					get_multiple(input, value, i, i+no);
-					repeat = 0;
-					count = 1;
-					set_multiple_diff(output, value, j, j+no);
-					free(value);
-					i += no;
-					j += no;
-				}
+		else if (no > 0) { // repeated run
+			if (i >= input_size) {
+				*written = j;
+				return BYTERLE_TRUNCATED;
 			}
-			else {
-				uchar value;
-				value = input[i];
-				set_multiple_same(output, value, j, j+no);
-				i++;
-				j += no;
-				count = 1;
-				repeat = 0;
+			if (j + no > output_size) {
+				*written = j;
+				return BYTERLE_OVERFLOW;
 			}
+			memset(output + j, input[i], no);
+			i++;
+		}
+		else { // an empty run is the terminator of the stream; its value byte may be absent
+			i++;
 		}
+		j += no;
 	}
-
-	int nd=1;
-	npy_intp dims[1] = {static_cast<npy_intp>(j)};
-	// create a numpy array using the buffer as the data source
-	PyObject *output_array = PyArray_SimpleNewFromData(nd, dims, NPY_UINT8, output);
-	Py_INCREF(output_array); // ... because it will be managed from Python
-	return output_array;
+	*written = j;
+	return BYTERLE_OK;
 }
 
 static void
-get_multiple(uchar *input, uchar *value, ulong start_index, ulong end_index)
+byterle_set_error(int status, Py_ssize_t written, Py_ssize_t output_size)
 {
-	ulong i;
+	if (status == BYTERLE_OVERFLOW)
+		PyErr_Format(PyExc_ValueError, "HxByteRLE stream decodes to more than %zd bytes", output_size);
+	else
+		PyErr_Format(PyExc_ValueError, "HxByteRLE stream decodes to %zd bytes instead of %zd bytes", written,
+		             output_size);
+}
+
+static PyObject *
+decoders_ascii_decode_into(PyObject *self, PyObject *args)
+{
+	Py_buffer input, output;
+	char *typecode;
+	Py_ssize_t item_size, written=0, position=0;
+	int status;
+
+	// Python usage: hx.ascii_decoder_into(input, output, typecode)
+	// typecode is the NumPy type character of the items of output e.g. 'f' for np.float32
+	if (!PyArg_ParseTuple(args, READ_BUFFER_FORMAT "w*s", &input, &output, &typecode))
+		return NULL;
 
-	for (i=0; i < end_index - start_index; i++) {
-		value[i] = input[i + start_index];
+	switch (typecode[0]) {
+		case 'b': case 'B': item_size = sizeof(char); break;
+		case 'h': case 'H': item_size = sizeof(short); break;
+		case 'i': case 'I': item_size = sizeof(int); break;
+		case 'l': case 'L': item_size = sizeof(long); break;
+		case 'q': case 'Q': item_size = sizeof(long long); break;
+		case 'f': item_size = sizeof(float); break;
+		case 'd': item_size = sizeof(double); break;
+		default: item_size = 0;
 	}
+	if (item_size == 0 || typecode[1] != '\0') {
+		PyBuffer_Release(&input);
+		PyBuffer_Release(&output);
+		PyErr_Format(PyExc_ValueError, "unsupported type code for ASCII streams: '%s'", typecode);
+		return NULL;
+	}
+
+	Py_BEGIN_ALLOW_THREADS
+	status = ascii_decode_buffer((const char *)input.buf, input.len, typecode[0], output.buf, output.len / item_size,
+	                             &written, &position);
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&input);
+	PyBuffer_Release(&output);
+
+	switch (status) {
+		case ASCII_OK:
+			return PyLong_FromSsize_t(written);
+		case ASCII_OVERFLOW:
+			PyErr_Format(PyExc_ValueError, "ASCII stream has more than %zd values", written);
+			break;
+		case ASCII_RANGE:
+			PyErr_Format(PyExc_ValueError, "value at byte %zd of ASCII stream is out of range for type '%s'",
+			             position, typecode);
+			break;
+		default:
+			PyErr_Format(PyExc_ValueError, "invalid value at byte %zd of ASCII stream for type '%s'", position,
+			             typecode);
+	}
+	return NULL;
 }
 
-static void
-set_multiple_diff(uchar *output, uchar *value, ulong start_index, ulong end_index)
+static PyObject *
+decoders_ascii_token_count(PyObject *self, PyObject *args)
 {
-	ulong i;
+	Py_buffer input;
+	Py_ssize_t count;
 
-	for (i=0; i < end_index - start_index; i++) {
-		output[i + start_index] = value[i];
-	}
+	// Python usage: hx.ascii_token_count(input)
+	if (!PyArg_ParseTuple(args, READ_BUFFER_FORMAT, &input))
+		return NULL;
+
+	Py_BEGIN_ALLOW_THREADS
+	count = ascii_count_tokens((const char *)input.buf, input.len);
+	Py_END_ALLOW_THREADS
+	PyBuffer_Release(&input);
+
+	return PyLong_FromSsize_t(count);
 }
 
-static void
-set_multiple_same(uchar *output, uchar value, ulong start_index, ulong end_index)
+static int
+ascii_decode_buffer(const char *input, Py_ssize_t input_size, char typecode, void *output, Py_ssize_t output_count,
+                    Py_ssize_t *written, Py_ssize_t *position)
 {
-	ulong i;
+	/*
+	 * Parse whitespace separated numbers without touching any Python objects (may run without the GIL)
+	 *
+	 * Each token is copied into a NUL terminated scratch buffer so that the input need not be terminated and
+	 * strtod/strtoll never read beyond the token. Numbers are parsed in the "C" locale which Python uses unless
+	 * the application changes LC_NUMERIC.
+	 */
+	char token[ASCII_TOKEN_MAX + 1];
+	Py_ssize_t i=0, j=0, start, length;
+	int status;
+
+	while (1) {
+		while (i < input_size && IS_ASCII_SPACE(input[i]))
+			i++;
+		if (i >= input_size)
+			break;
+		start = i;
+		while (i < input_size && !IS_ASCII_SPACE(input[i]))
+			i++;
+		length = i - start;
+		*position = start;
+		if (j >= output_count) {
+			*written = j;
+			return ASCII_OVERFLOW;
+		}
+		if (length > ASCII_TOKEN_MAX) {
+			*written = j;
+			return ASCII_INVALID;
+		}
+		memcpy(token, input + start, length);
+		token[length] = '\0';
+		status = ascii_store(token, typecode, output, j);
+		if (status != ASCII_OK) {
+			*written = j;
+			return status;
+		}
+		j++;
+	}
+	*written = j;
+	return ASCII_OK;
+}
+
+// store a signed integer after checking that it fits into the type
+#define ASCII_STORE_SIGNED(type, min, max) \
+	if (value < (min) || value > (max)) return ASCII_RANGE; \
+	((type *)output)[index] = (type)value; \
+	return ASCII_OK;
+
+// store an unsigned integer after checking that it fits into the type
+#define ASCII_STORE_UNSIGNED(type, max) \
+	if (uvalue > (max)) return ASCII_RANGE; \
+	((type *)output)[index] = (type)uvalue; \
+	return ASCII_OK;
 
-	for (i=start_index; i < end_index; i++) {
-		output[i] = value;
+static int
+ascii_store(const char *token, char typecode, void *output, Py_ssize_t index)
+{
+	/*
+	 * Parse a single NUL terminated token as a number of the given type and store it at output[index]
+	 */
+	char *end;
+	double dvalue;
+	long long value;
+	unsigned long long uvalue;
+
+	errno = 0;
+	switch (typecode) {
+		case 'f':
+		case 'd':
+			dvalue = strtod(token, &end);
+			if (end == token || *end != '\0')
+				return ASCII_INVALID;
+			if (typecode == 'f')
+				((float *)output)[index] = (float)dvalue;
+			else
+				((double *)output)[index] = dvalue;
+			return ASCII_OK;
+		case 'b': case 'h': case 'i': case 'l': case 'q':
+			value = strtoll(token, &end, 10);
+			if (end == token || *end != '\0')
+				return ASCII_INVALID;
+			if (errno == ERANGE)
+				return ASCII_RANGE;
+			switch (typecode) {
+				case 'b': ASCII_STORE_SIGNED(signed char, SCHAR_MIN, SCHAR_MAX)
+				case 'h': ASCII_STORE_SIGNED(short, SHRT_MIN, SHRT_MAX)
+				case 'i': ASCII_STORE_SIGNED(int, INT_MIN, INT_MAX)
+				case 'l': ASCII_STORE_SIGNED(long, LONG_MIN, LONG_MAX)
+				default: ASCII_STORE_SIGNED(long long, LLONG_MIN, LLONG_MAX)
+			}
+		case 'B': case 'H': case 'I': case 'L': case 'Q':
+			// strtoull silently negates negative numbers
+			if (token[0] == '-')
+				return ASCII_RANGE;
+			uvalue = strtoull(token, &end, 10);
+			if (end == token || *end != '\0')
+				return ASCII_INVALID;
+			if (errno == ERANGE)
+				return ASCII_RANGE;
+			switch (typecode) {
+				case 'B': ASCII_STORE_UNSIGNED(unsigned char, UCHAR_MAX)
+				case 'H': ASCII_STORE_UNSIGNED(unsigned short, USHRT_MAX)
+				case 'I': ASCII_STORE_UNSIGNED(unsigned int, UINT_MAX)
+				case 'L': ASCII_STORE_UNSIGNED(unsigned long, ULONG_MAX)
+				default: ASCII_STORE_UNSIGNED(unsigned long long, ULLONG_MAX)
+			}
 	}
+	return ASCII_TYPE;
 }
 
+static Py_ssize_t
+ascii_count_tokens(const char *input, Py_ssize_t input_size)
+{
+	// count the starts of tokens i.e. non-space characters at the start or following a space
+	Py_ssize_t i, count=0;
+	int in_space=1;
+
+	for (i = 0; i < input_size; i++) {
+		if (IS_ASCII_SPACE(input[i])) {
+			in_space = 1;
+		}
+		else {
+			count += in_space;
+			in_space = 0;
+		}
+	}
+	return count;
+}